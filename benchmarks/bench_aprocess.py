@@ -0,0 +1,142 @@
+"""Compare the chunked stdout reader in `CommandRunner.aprocess` against
+the previous readline + `asyncio.wait_for` loop.
+
+Each stream is a child python process which writes a synthetic series
+of HandBrakeCLI progress updates to stdout as fast as it can. Run with
+
+    python benchmarks/bench_aprocess.py [--streams N] [--events N]
+"""
+
+import argparse
+import asyncio
+import asyncio.subprocess as asubprocess
+import subprocess
+import sys
+import time
+from typing import Any, AsyncGenerator
+
+from handbrake.canceller import Canceller
+from handbrake.errors import CancelledError, HandBrakeError
+from handbrake.models.progress import Progress
+from handbrake.runner import ConvertCommandRunner
+
+PROGRESS = """Progress: {{
+    "State": "WORKING",
+    "Working": {{
+        "ETASeconds": 10,
+        "Hours": 0,
+        "Minutes": 0,
+        "Pass": 1,
+        "PassCount": 1,
+        "PassID": -1,
+        "Paused": 0,
+        "Progress": {progress},
+        "Rate": 30.0,
+        "RateAvg": 25.0,
+        "Seconds": 10,
+        "SequenceID": 1
+    }}
+}}
+"""
+
+WRITER = f"""
+import sys
+template = {PROGRESS!r}
+n = int(sys.argv[1])
+out = sys.stdout
+for i in range(n):
+    out.write(template.format(progress=i / n))
+out.flush()
+"""
+
+
+class ReadlineCommandRunner(ConvertCommandRunner):
+    """The per-line reader loop `aprocess` used before chunked reads,
+    including the line-equality object matching"""
+
+    collect: list[bytes] | None = None
+
+    def process_line(self, line: bytes) -> Any:
+        if self.collect is None:
+            if line == b"Progress: {":
+                self.collect = [b"{"]
+            return None
+        if line == b"}":
+            self.collect.append(b"}")
+            res = Progress.model_validate_json(b"\n".join(self.collect))
+            self.collect = None
+            return res
+        self.collect.append(line)
+        return None
+
+    async def aprocess(
+        self,
+        cmd: str,
+        *args: str,
+        cancel: Canceller | None = None,
+    ) -> AsyncGenerator[Any, None]:
+        aproc = await asubprocess.create_subprocess_exec(
+            cmd,
+            *args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        assert aproc.stdout is not None
+        try:
+            while True:
+                if cancel is not None and cancel.is_cancelled():
+                    raise CancelledError
+                try:
+                    line = await asyncio.wait_for(aproc.stdout.readline(), 1)
+                    if not line:
+                        break
+                except asyncio.TimeoutError:
+                    pass
+                else:
+                    o = self.process_line(line.rstrip())
+                    if o is not None:
+                        yield o
+            if (returncode := await aproc.wait()) != 0:
+                raise HandBrakeError(returncode)
+        finally:
+            try:
+                aproc.terminate()
+            except ProcessLookupError:
+                pass
+
+
+async def consume(runner: ConvertCommandRunner, events: int) -> int:
+    count = 0
+    async for _ in runner.aprocess(sys.executable, "-c", WRITER, str(events)):
+        count += 1
+    return count
+
+
+async def run(kind: type[ConvertCommandRunner], streams: int, events: int):
+    results = await asyncio.gather(*(consume(kind(), events) for _ in range(streams)))
+    assert all(r == events for r in results)
+
+
+def bench(kind: type[ConvertCommandRunner], streams: int, events: int):
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    asyncio.run(run(kind, streams, events))
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    print(
+        f"{kind.__name__:24} wall={wall:7.3f}s cpu={cpu:7.3f}s "
+        f"cpu/event={cpu / (streams * events) * 1e6:7.2f}us"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", type=int, default=16)
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+    for kind in (ReadlineCommandRunner, ConvertCommandRunner):
+        bench(kind, args.streams, args.events)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare the default title set decoder in `handbrake.decoding` with
+decoding via orjson and building the models with `model_construct`, and
+with a `LazyTitleSet` from which a single title is read, on a large
+synthetic scan. Run with
+
+    python benchmarks/bench_decode.py [--titles N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+from typing import Any, get_args, get_origin
+
+from pydantic import BaseModel
+
+from handbrake.decoding import pydantic_decoder
+from handbrake.lazy import LazyTitleSet
+from handbrake.models.title import TitleSet
+
+sys.path.insert(0, os.path.dirname(__file__))
+from data import title_set_json  # noqa: E402
+
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+
+def construct(model: type[BaseModel], data: dict[str, Any]) -> Any:
+    values = {}
+    for name, field in model.model_fields.items():
+        value = data[field.alias or name]
+        t = field.annotation
+        if isinstance(t, type) and issubclass(t, BaseModel):
+            value = construct(t, value)
+        elif get_origin(t) is list:
+            (item,) = get_args(t)
+            if isinstance(item, type) and issubclass(item, BaseModel):
+                value = [construct(item, v) for v in value]
+        values[name] = value
+    return model.model_construct(**values)
+
+
+def construct_decoder(model: type[BaseModel], data: memoryview) -> Any:
+    return construct(model, loads(data.tobytes()))
+
+
+def lazy_decoder(model: type[BaseModel], data: memoryview) -> Any:
+    # validate the headers and a single title, as when picking one title
+    # out of a full scan
+    title_set = LazyTitleSet(data.tobytes())
+    return title_set.title_list[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data = memoryview(title_set_json(args.titles))
+    print(f"{args.titles} titles, {len(data) / 1e6:.1f} MB")
+    for decoder in (pydantic_decoder, construct_decoder, lazy_decoder):
+        times = timeit.repeat(
+            lambda: decoder(TitleSet, data), number=1, repeat=args.repeat
+        )
+        print(f"{decoder.__name__:20} {min(times) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Measure the latency of running a short command through the runners with
+each spawn strategy in `handbrake.runner.Spawn`.
+
+By default the command is `true`, so the figures are dominated by the
+cost of spawning and reaping the process; pass `--executable` to time
+`--version` of a real HandBrakeCLI instead. `--rss` grows the parent
+process first, as fork costs grow with the memory of the parent while
+vfork and posix_spawn do not. Run with
+
+    python benchmarks/bench_spawn.py [--count N] [--rss MB] [--executable PATH]
+"""
+
+import argparse
+import asyncio
+import shutil
+import sys
+import time
+from typing import get_args
+
+from handbrake.runner import CommandRunner, Spawn
+
+
+def bench_sync(spawn: Spawn, cmd: list[str], count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        for _ in CommandRunner(spawn=spawn, stderr_limit=0).process(*cmd):
+            pass
+    return (time.perf_counter() - start) / count
+
+
+async def bench_async(spawn: Spawn, cmd: list[str], count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        async for _ in CommandRunner(spawn=spawn, stderr_limit=0).aprocess(*cmd):
+            pass
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--rss", type=int, default=0, help="MB to allocate first")
+    parser.add_argument("--executable", help="time `--version` of this executable")
+    args = parser.parse_args()
+
+    if args.executable is not None:
+        cmd = [args.executable, "--json", "--version"]
+    else:
+        true = shutil.which("true")
+        if true is None:
+            sys.exit("`true` not found, pass --executable")
+        cmd = [true]
+    ballast = bytearray(args.rss * 1024 * 1024)
+    # touch every page so it counts towards the resident size
+    for i in range(0, len(ballast), 4096):
+        ballast[i] = 1
+
+    print(f"{' '.join(cmd)}, {args.count} runs, {args.rss} MB ballast")
+    for spawn in get_args(Spawn):
+        sync = bench_sync(spawn, cmd, args.count)
+        async_ = asyncio.run(bench_async(spawn, cmd, args.count))
+        print(f"{spawn:12} process={sync * 1e6:8.0f}us aprocess={async_ * 1e6:8.0f}us")
+
+
+if __name__ == "__main__":
+    main()
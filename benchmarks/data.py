@@ -0,0 +1,168 @@
+"""Synthetic HandBrakeCLI output shaped like a real Blu-ray scan"""
+
+import json
+from typing import Any
+
+
+def audio(i: int) -> dict[str, Any]:
+    return {
+        "Attributes": {
+            "AltCommentary": False,
+            "Commentary": i == 3,
+            "Default": i == 0,
+            "Normal": True,
+            "Secondary": False,
+            "VisuallyImpaired": False,
+        },
+        "BitRate": 640000,
+        "ChannelCount": 6,
+        "ChannelLayout": 1551,
+        "ChannelLayoutName": "5.1(side)",
+        "Codec": 2048,
+        "CodecName": "AC3",
+        "CodecParam": 86019,
+        "Description": "English (AC3, 5.1 ch, 640 kbps)",
+        "LFECount": 1,
+        "Language": "English",
+        "LanguageCode": "eng" if i % 2 == 0 else "fra",
+        "SampleRate": 48000,
+        "TrackNumber": i + 1,
+    }
+
+
+def subtitle(i: int) -> dict[str, Any]:
+    return {
+        "Attributes": {
+            "4By3": False,
+            "Children": False,
+            "ClosedCaption": False,
+            "Commentary": False,
+            "Default": False,
+            "Forced": False,
+            "Large": False,
+            "Letterbox": False,
+            "Normal": True,
+            "PanScan": False,
+            "Wide": False,
+        },
+        "Format": "bitmap",
+        "Language": "English",
+        "LanguageCode": "eng",
+        "Source": 4,
+        "SourceName": "PGS",
+        "TrackNumber": i + 1,
+    }
+
+
+def duration(seconds: int) -> dict[str, int]:
+    m, s = divmod(seconds, 60)
+    h, m = divmod(m, 60)
+    return {"Hours": h, "Minutes": m, "Seconds": s, "Ticks": seconds * 90000}
+
+
+def title(
+    index: int, audio_count: int = 8, subtitle_count: int = 20, chapters: int = 24
+) -> dict[str, Any]:
+    length = 600 + (index * 397) % 7200
+    return {
+        "AngleCount": 1,
+        "AudioList": [audio(i) for i in range(audio_count)],
+        "ChapterList": [
+            {"Duration": duration(length // chapters), "Name": f"Chapter {c + 1}"}
+            for c in range(chapters)
+        ],
+        "Color": {
+            "BitDepth": 8,
+            "ChromaLocation": 1,
+            "ChromaSubsampling": "4:2:0",
+            "Format": 0,
+            "Matrix": 1,
+            "Primary": 1,
+            "Range": 1,
+            "Transfer": 1,
+        },
+        "Crop": [0, 0, 0, 0],
+        "Duration": duration(length),
+        "FrameRate": {"Den": 1001, "Num": 24000},
+        "Geometry": {"Height": 1080, "PAR": {"Den": 1, "Num": 1}, "Width": 1920},
+        "Index": index,
+        "InterlaceDetected": False,
+        "LooseCrop": [0, 0, 0, 0],
+        "Metadata": {},
+        "Name": "BDMV",
+        "Path": "/mnt/disc",
+        "Playlist": index,
+        "SubtitleList": [subtitle(i) for i in range(subtitle_count)],
+        "Type": 2,
+        "VideoCodec": "h264",
+    }
+
+
+def title_set(titles: int) -> dict[str, Any]:
+    return {
+        "MainFeature": 1,
+        "TitleList": [title(i) for i in range(1, titles + 1)],
+    }
+
+
+def title_set_json(titles: int) -> bytes:
+    """The object which follows `JSON Title Set:` in the output of a scan"""
+    return json.dumps(title_set(titles), indent=4).encode()
+
+
+def working(progress: float) -> dict[str, Any]:
+    return {
+        "State": "WORKING",
+        "Working": {
+            "ETASeconds": 10,
+            "Hours": 0,
+            "Minutes": 0,
+            "Pass": 1,
+            "PassCount": 1,
+            "PassID": -1,
+            "Paused": 0,
+            "Progress": progress,
+            "Rate": 30.0,
+            "RateAvg": 25.0,
+            "Seconds": 10,
+            "SequenceID": 1,
+        },
+    }
+
+
+def scanning(progress: float, title: int, title_count: int) -> dict[str, Any]:
+    return {
+        "State": "SCANNING",
+        "Scanning": {
+            "Preview": 0,
+            "PreviewCount": 10,
+            "Progress": progress,
+            "SequenceID": 0,
+            "Title": title,
+            "TitleCount": title_count,
+        },
+    }
+
+
+def work_done() -> dict[str, Any]:
+    return {"State": "WORKDONE", "WorkDone": {"Error": 0, "SequenceID": 1}}
+
+
+def labelled(label: str, obj: dict[str, Any]) -> bytes:
+    """An object as HandBrakeCLI prints it, following its label"""
+    return f"{label} {json.dumps(obj, indent=4)}\n".encode()
+
+
+def convert_output(events: int) -> bytes:
+    """The stdout of an encode which reports its progress `events` times"""
+    updates = [labelled("Progress:", working(i / events)) for i in range(events)]
+    return b"".join(updates) + labelled("Progress:", work_done())
+
+
+def scan_output(titles: int) -> bytes:
+    """The stdout of a scan of every title on a disc"""
+    updates = [
+        labelled("Progress:", scanning(i / titles, i + 1, titles))
+        for i in range(titles)
+    ]
+    return b"".join(updates) + b"JSON Title Set: " + title_set_json(titles) + b"\n"
@@ -0,0 +1,222 @@
+"""Measure the runners end to end on recorded and synthetic HandBrakeCLI
+output.
+
+Each case replays a file of stdout through `CommandRunner.process` or
+`CommandRunner.aprocess` from a child python process, so spawning, reading,
+framing and validation are all measured, while generating the output is not.
+The cases cover progress-heavy encodes, huge `-t 0` title sets and many
+concurrent streams, plus any files of output recorded from HandBrakeCLI, e.g.
+with
+
+    HandBrakeCLI --json -i /path/to/input -t 0 --scan > scan.txt
+
+Results can be saved and compared against an earlier run, failing if any
+case got slower by more than the threshold:
+
+    python benchmarks/suite.py --output baseline.json
+    python benchmarks/suite.py --compare baseline.json [--threshold 0.15]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from handbrake.runner import CommandRunner, ConvertCommandRunner, ScanCommandRunner
+
+sys.path.insert(0, os.path.dirname(__file__))
+from data import convert_output, scan_output  # noqa: E402
+
+REPLAY = """
+import shutil, sys
+with open(sys.argv[1], "rb") as f:
+    shutil.copyfileobj(f, sys.stdout.buffer, 65536)
+"""
+
+
+@dataclass
+class Case:
+    name: str
+    runner: Callable[[], CommandRunner]
+    output: str
+    streams: int = 1
+    asynchronous: bool = False
+
+
+def replay(path: str) -> list[str]:
+    return [sys.executable, "-c", REPLAY, path]
+
+
+def run_sync(case: Case, path: str) -> int:
+    def consume(_: int) -> int:
+        return sum(1 for _ in case.runner().process(*replay(path)))
+
+    if case.streams == 1:
+        return consume(0)
+    with ThreadPoolExecutor(case.streams) as pool:
+        return sum(pool.map(consume, range(case.streams)))
+
+
+async def run_async(case: Case, path: str) -> int:
+    async def consume() -> int:
+        return len([o async for o in case.runner().aprocess(*replay(path))])
+
+    counts = await asyncio.gather(*(consume() for _ in range(case.streams)))
+    return sum(counts)
+
+
+def measure(case: Case, path: str, repeat: int) -> dict[str, Any]:
+    walls: list[float] = []
+    cpus: list[float] = []
+    objects = 0
+    for _ in range(repeat):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if case.asynchronous:
+            objects = asyncio.run(run_async(case, path))
+        else:
+            objects = run_sync(case, path)
+        walls.append(time.perf_counter() - wall)
+        cpus.append(time.process_time() - cpu)
+    return {
+        "wall": min(walls),
+        "cpu": min(cpus),
+        "objects": objects,
+        "bytes": os.path.getsize(path) * case.streams,
+    }
+
+
+def synthetic_cases(quick: bool) -> tuple[dict[str, bytes], list[Case]]:
+    events = 2000 if quick else 20000
+    titles = 50 if quick else 500
+    streams = 8 if quick else 32
+    stream_events = 500 if quick else 2000
+    outputs = {
+        "convert": convert_output(events),
+        "scan": scan_output(titles),
+        "stream": convert_output(stream_events),
+    }
+    cases = [
+        Case("progress", ConvertCommandRunner, "convert"),
+        Case("progress-async", ConvertCommandRunner, "convert", asynchronous=True),
+        Case(
+            "progress-fast", lambda: ConvertCommandRunner(fast_progress=True), "convert"
+        ),
+        Case(
+            "progress-interval",
+            lambda: ConvertCommandRunner(progress_interval=0.5),
+            "convert",
+        ),
+        Case("scan", ScanCommandRunner, "scan"),
+        Case("scan-async", ScanCommandRunner, "scan", asynchronous=True),
+        Case("scan-lazy", lambda: ScanCommandRunner(lazy=True), "scan"),
+        Case("scan-stream", lambda: ScanCommandRunner(stream=True), "scan"),
+        Case("concurrent", ConvertCommandRunner, "stream", streams=streams),
+        Case(
+            "concurrent-async",
+            ConvertCommandRunner,
+            "stream",
+            streams=streams,
+            asynchronous=True,
+        ),
+    ]
+    return outputs, cases
+
+
+def recorded_cases(paths: list[str]) -> list[Case]:
+    cases = []
+    for path in paths:
+        with open(path, "rb") as f:
+            scan = b"JSON Title Set:" in f.read()
+        kind: type[CommandRunner] = ScanCommandRunner if scan else ConvertCommandRunner
+        name = os.path.splitext(os.path.basename(path))[0]
+        cases.append(Case(f"recorded-{name}", kind, path))
+        cases.append(Case(f"recorded-{name}-async", kind, path, asynchronous=True))
+    return cases
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], metric: str, threshold: float
+) -> bool:
+    """Print the change in each case since the baseline, returning whether
+    any case regressed by more than the threshold"""
+    regressed = False
+    for name, result in results["cases"].items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            print(f"{name:24} (new)")
+            continue
+        ratio = result[metric] / before[metric] if before[metric] > 0 else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{name:24} {before[metric]:8.3f}s -> {result[metric]:8.3f}s "
+            f"({(ratio - 1) * 100:+6.1f}%){flag}"
+        )
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("recorded", nargs="*", help="files of recorded stdout")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="use smaller outputs")
+    parser.add_argument(
+        "-k", dest="only", action="append", help="run cases whose name contains this"
+    )
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="compare against saved results")
+    parser.add_argument("--metric", choices=("cpu", "wall"), default="cpu")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args()
+
+    outputs, cases = synthetic_cases(args.quick)
+    cases += recorded_cases(args.recorded)
+    if args.only:
+        cases = [c for c in cases if any(k in c.name for k in args.only)]
+
+    results: dict[str, Any] = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for key, data in outputs.items():
+            paths[key] = os.path.join(tmp, f"{key}.txt")
+            with open(paths[key], "wb") as f:
+                f.write(data)
+        for case in cases:
+            result = measure(case, paths.get(case.output, case.output), args.repeat)
+            results["cases"][case.name] = result
+            print(
+                f"{case.name:24} wall={result['wall']:8.3f}s "
+                f"cpu={result['cpu']:8.3f}s objects={result['objects']:7} "
+                f"MB={result['bytes'] / 1e6:7.1f}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print()
+        if compare(results, baseline, args.metric, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
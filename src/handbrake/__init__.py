@@ -1,26 +1,83 @@
+import asyncio
 import os
 import shutil
-import subprocess
+import tempfile
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    FIRST_EXCEPTION,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import nullcontext
 from io import TextIOBase
-from typing import Literal
+from itertools import islice
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncGenerator,
+    ContextManager,
+    Generator,
+    Iterable,
+    Literal,
+    Sequence,
+    TypeVar,
+)
 
+from handbrake import probe
+from handbrake.cache import ScanCache
 from handbrake.canceller import Canceller
-from handbrake.models.preset import Preset, PresetGroup, PresetInfo
+from handbrake.decoding import Decoder, get_decoder
+from handbrake.errors import CancelledError
+from handbrake.lazy import LazyTitleSet
+from handbrake.metrics import Metrics
+from handbrake.models.capabilities import Capabilities
+from handbrake.models.preset import Preset, PresetGroup
 from handbrake.models.progress import Progress
 from handbrake.models.title import TitleSet
 from handbrake.models.version import Version
 from handbrake.opts import ConvertOpts, generate_convert_args, generate_scan_args
+from handbrake.parallel import Joiner, ProgressMerger, ffmpeg_join, split_chapters
+from handbrake.profiling import Profiler
 from handbrake.progresshandler import ProgressHandler
+from handbrake.resources import Resources
 from handbrake.runner import (
+    CapabilitiesCommandRunner,
     ConvertCommandRunner,
     PresetCommandRunner,
+    PresetListCommandRunner,
     ScanCommandRunner,
+    Spawn,
     VersionCommandRunner,
 )
+from handbrake.streaming import AsyncTitleIterator, TitleIterator
+
+I = TypeVar("I", bound=str | os.PathLike)
+S = TypeVar("S", TitleSet, LazyTitleSet)
+
+
+def _scan_result(
+    f: "Future[TitleSet] | asyncio.Future[TitleSet]",
+) -> TitleSet | Exception:
+    if (e := f.exception()) is None:
+        return f.result()
+    if isinstance(e, Exception):
+        return e
+    raise e
 
 
 class HandBrake:
-    def __init__(self, executable: str | None = None):
+    def __init__(
+        self,
+        executable: str | None = None,
+        stderr_limit: int = 65536,
+        scan_cache: ScanCache | None = None,
+        decoder: str | Decoder | None = None,
+        metrics: Metrics | None = None,
+        profiler: Profiler | None = None,
+        spawn: Spawn = "default",
+        grace_period: float = 5.0,
+    ):
         """Initialise the HandBrake wrapper
 
         :param executable: path to the HandBrakeCLI executable to
@@ -29,44 +86,106 @@ class HandBrake:
         first valid option: the value of the environment variable
         HANDBRAKECLI, examining the PATH variable for a HandBrakeCLI
         executable and examining the PATH for a handbrakecli
-        executable
+        executable. The executable is resolved to an absolute path
+        once, and a `FileNotFoundError` raised if it does not exist or
+        cannot be executed
+        :param stderr_limit: the number of bytes from the end of the
+        stderr output of each command to keep, which are attached to any
+        `HandBrakeError` raised and kept in `last_stderr`
+        :param scan_cache: if provided, scan results are stored in and
+        served from this cache
+        :param decoder: the decoder used to parse title sets, presets and
+        versions, either a function or the name of a decoder in
+        `handbrake.decoding`. If not provided, the default decoder is used
+        :param metrics: if provided, the throughput and outcome of every
+        conversion are recorded in these metrics
+        :param profiler: if provided, called with a `CommandProfile` of
+        every command run, breaking down where its time went. See
+        `handbrake.profiling.ProfileCollector`
+        :param spawn: how HandBrakeCLI processes are spawned, see
+        `handbrake.runner.Spawn`. "posix_spawn" lowers the cost of
+        starting short commands on platforms where CPython would
+        otherwise fork the whole interpreter
+        :param grace_period: the number of seconds a cancelled or timed
+        out HandBrakeCLI process is given to exit after being asked to
+        terminate, before it is killed
 
         """
+        self.decoder = decoder
+        self.metrics = metrics
+        self.profiler = profiler
+        self.spawn = spawn
+        self.grace_period = grace_period
+        self.stderr_limit = stderr_limit
+        self.scan_cache = scan_cache
+        # the tail of the stderr output of the last command to finish
+        self.last_stderr = b""
+        if executable is None:
+            executable = os.getenv("HANDBRAKECLI") or None
         if executable is not None:
-            self.executable = executable
-        elif e := os.getenv("HANDBRAKECLI"):
-            self.executable = e
-        elif w := shutil.which("HandBrakeCLI"):
-            self.executable = w
-        elif w := shutil.which("handbrakecli"):
-            self.executable = w
+            path = shutil.which(executable)
+            if path is None:
+                raise FileNotFoundError(
+                    f"HandBrakeCLI executable not found: {executable}"
+                )
         else:
-            raise FileNotFoundError("could not find HandBrakeCLI")
+            path = shutil.which("HandBrakeCLI") or shutil.which("handbrakecli")
+            if path is None:
+                raise FileNotFoundError("could not find HandBrakeCLI")
+        self.executable = os.path.abspath(path)
+
+    def _runner_options(self) -> dict[str, Any]:
+        return {
+            "stderr_limit": self.stderr_limit,
+            "grace_period": self.grace_period,
+            "profiler": self.profiler,
+            "spawn": self.spawn,
+            "stderr_handler": self._set_last_stderr,
+        }
 
-    def version(self) -> Version:
+    def _set_last_stderr(self, stderr: bytes):
+        self.last_stderr = stderr
+
+    def version(
+        self, cancel: Canceller | None = None, timeout: float | None = None
+    ) -> Version:
         """Returns the version of HandBrakeCLI
 
+        The version is cached for each executable until the executable
+        file is replaced or modified
+
+        :param cancel: a parameter that allows early termination of the command
+        :param timeout: the number of seconds after which the command is
+        terminated and a `TimeoutError` raised
         :returns: an object holding the handbrake version
         """
-        version: Version | None = None
-        runner = VersionCommandRunner()
+        if (version := probe.lookup(self.executable, "version")) is not None:
+            return version
+        runner = VersionCommandRunner(decoder=self.decoder, **self._runner_options())
         args = ["--json", "--version"]
-        for obj in runner.process(self.executable, *args):
+        for obj in runner.process(
+            self.executable, *args, cancel=cancel, timeout=timeout
+        ):
             if isinstance(obj, Version):
                 version = obj
 
         if version is None:
             raise RuntimeError("version not found")
+        probe.store(self.executable, "version", version)
         return version
 
     async def version_async(self, cancel: Canceller | None = None) -> Version:
         """Asynchronously returns the version of HandBrakeCLI
 
+        The version is cached for each executable until the executable
+        file is replaced or modified
+
         :param cancel: a parameter that allows early termination of the command
         :returns: an object holding the handbrake version
         """
-        version: Version | None = None
-        runner = VersionCommandRunner()
+        if (version := probe.lookup(self.executable, "version")) is not None:
+            return version
+        runner = VersionCommandRunner(decoder=self.decoder, **self._runner_options())
         args = ["--json", "--version"]
         async for obj in runner.aprocess(self.executable, *args, cancel=cancel):
             if isinstance(obj, Version):
@@ -74,8 +193,55 @@ class HandBrake:
 
         if version is None:
             raise RuntimeError("version not found")
+        probe.store(self.executable, "version", version)
         return version
 
+    def capabilities(
+        self, cancel: Canceller | None = None, timeout: float | None = None
+    ) -> Capabilities:
+        """Returns the encoders and options supported by HandBrakeCLI
+
+        The result is cached for each executable until the executable
+        file is replaced or modified
+
+        :param cancel: a parameter that can be used to stop the command
+        :param timeout: the number of seconds to wait for HandBrakeCLI
+        :returns: an object listing the supported encoders and options
+        """
+        if (caps := probe.lookup(self.executable, "capabilities")) is not None:
+            return caps
+        runner = CapabilitiesCommandRunner(**self._runner_options())
+        for _ in runner.process(
+            self.executable, "--help", cancel=cancel, timeout=timeout
+        ):
+            pass
+        caps = runner.finish()
+        probe.store(self.executable, "capabilities", caps)
+        return caps
+
+    async def capabilities_async(self, cancel: Canceller | None = None) -> Capabilities:
+        """Asynchronously returns the encoders and options supported by
+        HandBrakeCLI, see `capabilities`
+
+        :param cancel: a parameter that can be used to stop the command
+        :returns: an object listing the supported encoders and options
+        """
+        if (caps := probe.lookup(self.executable, "capabilities")) is not None:
+            return caps
+        runner = CapabilitiesCommandRunner(**self._runner_options())
+        async for _ in runner.aprocess(self.executable, "--help", cancel=cancel):
+            pass
+        caps = runner.finish()
+        probe.store(self.executable, "capabilities", caps)
+        return caps
+
+    def _track(
+        self, output: str | os.PathLike, progress_handler: ProgressHandler | None
+    ) -> ContextManager[ProgressHandler | None]:
+        if self.metrics is None:
+            return nullcontext(progress_handler)
+        return self.metrics.track(output, progress_handler)
+
     def convert_title(
         self,
         input: str | os.PathLike,
@@ -83,6 +249,10 @@ class HandBrake:
         title: int | Literal["main"],
         opts: ConvertOpts | None = None,
         progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+        resources: Resources | None = None,
     ):
         """Convert a title from the input source
 
@@ -92,13 +262,28 @@ class HandBrake:
         'main' to select the main title
         :param opts: conversion options
         :param progress_handler: a callback function to handle progress updates
+        :param progress_interval: if set, progress updates are coalesced so
+        the handler is called at most once per interval (in seconds), with
+        the final update always delivered
+        :param cancel: a parameter that allows early termination of the command
+        :param timeout: the number of seconds after which the command is
+        terminated and a `TimeoutError` raised
+        :param resources: limits on the CPUs, priority and I/O priority
+        of the HandBrakeCLI process, see `handbrake.resources.Resources`
         """
         args = generate_convert_args(input, output, title, opts)
-        runner = ConvertCommandRunner()
-        for obj in runner.process(self.executable, *args):
-            if isinstance(obj, Progress):
-                if progress_handler is not None:
-                    progress_handler(obj)
+        runner = ConvertCommandRunner(
+            progress_interval=progress_interval,
+            resources=resources,
+            **self._runner_options(),
+        )
+        with self._track(output, progress_handler) as progress_handler:
+            for obj in runner.process(
+                self.executable, *args, cancel=cancel, timeout=timeout
+            ):
+                if isinstance(obj, Progress):
+                    if progress_handler is not None:
+                        progress_handler(obj)
 
     async def convert_title_async(
         self,
@@ -107,7 +292,9 @@ class HandBrake:
         title: int | Literal["main"],
         opts: ConvertOpts | None = None,
         progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
         cancel: Canceller | None = None,
+        resources: Resources | None = None,
     ):
         """Asynchronously convert a title from the input source
 
@@ -117,20 +304,339 @@ class HandBrake:
         'main' to select the main title
         :param opts: conversion options
         :param progress_handler: a callback function to handle progress updates
+        :param progress_interval: if set, progress updates are coalesced so
+        the handler is called at most once per interval (in seconds), with
+        the final update always delivered
         :param cancel: a parameter that allows early termination of the command
+        :param resources: limits on the CPUs, priority and I/O priority
+        of the HandBrakeCLI process, see `handbrake.resources.Resources`
         """
         args = generate_convert_args(input, output, title, opts)
-        runner = ConvertCommandRunner()
+        runner = ConvertCommandRunner(
+            progress_interval=progress_interval,
+            resources=resources,
+            **self._runner_options(),
+        )
+        with self._track(output, progress_handler) as progress_handler:
+            async for obj in runner.aprocess(self.executable, *args, cancel=cancel):
+                if isinstance(obj, Progress):
+                    if progress_handler is not None:
+                        progress_handler(obj)
+
+    def _plan_segments(
+        self,
+        title_set: TitleSet,
+        segments: int,
+        opts: ConvertOpts | None,
+    ) -> tuple[int, list[ConvertOpts], list[float]]:
+        opts = opts or {}
+        if any(k in opts for k in ("chapters", "start_at", "stop_at")):
+            raise ValueError("cannot split a title limited to chapters or times")
+        t = title_set.title_list[0]
+        ranges = split_chapters(t.chapter_list, segments)
+        segment_opts: list[ConvertOpts] = [{**opts, "chapters": r} for r in ranges]
+        weights = [
+            sum(
+                c.duration.to_timedelta().total_seconds()
+                for c in t.chapter_list[first - 1 : last]
+            )
+            for first, last in ranges
+        ]
+        return t.index, segment_opts, weights
+
+    @staticmethod
+    def _segment_paths(
+        output: str | os.PathLike, count: int
+    ) -> tuple[Path, list[Path]]:
+        output = Path(output)
+        parts = Path(tempfile.mkdtemp(prefix=f".{output.name}.", dir=output.parent))
+        return parts, [parts / f"{i:03}{output.suffix}" for i in range(count)]
+
+    @staticmethod
+    def _raise_segment_error(results: Sequence[Any]):
+        # a failing segment cancels its siblings, so raise the failure
+        # rather than the CancelledError of a segment before it
+        errors = [e for e in results if isinstance(e, BaseException)]
+        for e in errors:
+            if not isinstance(e, (CancelledError, asyncio.CancelledError)):
+                raise e
+        if errors:
+            raise errors[0]
+
+    def convert_title_parallel(
+        self,
+        input: str | os.PathLike,
+        output: str | os.PathLike,
+        title: int | Literal["main"],
+        segments: int,
+        opts: ConvertOpts | None = None,
+        progress_handler: ProgressHandler | None = None,
+        joiner: Joiner = ffmpeg_join,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+    ):
+        """Convert a title by splitting it at chapter boundaries into
+        segments of similar length, encoding the segments concurrently and
+        joining them without re-encoding
+
+        A single encode rarely keeps a machine with many cores busy, so
+        this can finish long titles much sooner. Titles without chapters
+        are converted in one piece
+
+        :param input: the input source
+        :param output: the path to write the converted file to
+        :param title: the title to convert, either by integer index or
+        'main' to select the main title
+        :param segments: the number of segments to split the title into,
+        all of which are encoded at the same time. Fewer are used if the
+        title has fewer chapters
+        :param opts: conversion options, which must not select chapters
+        or start and stop times
+        :param progress_handler: a callback function to handle progress
+        updates for the whole title
+        :param joiner: a function which joins the segment files, in order,
+        into the output file. By default ffmpeg's concat demuxer is used
+        :param cancel: a parameter that allows early termination of the command
+        :param timeout: the number of seconds after which the scan and each
+        segment are terminated and a `TimeoutError` raised
+        """
+        title_set = self.scan_titles(input, title, cancel=cancel, timeout=timeout)
+        index, segment_opts, weights = self._plan_segments(title_set, segments, opts)
+        if len(segment_opts) < 2:
+            self.convert_title(
+                input,
+                output,
+                index,
+                opts,
+                progress_handler,
+                cancel=cancel,
+                timeout=timeout,
+            )
+            return
+
+        merger = ProgressMerger(weights, progress_handler)
+        parts_dir, parts = self._segment_paths(output, len(segment_opts))
+        stop = Canceller()
+        if cancel is not None:
+            cancel.add_callback(stop.cancel)
+        try:
+            with ThreadPoolExecutor(len(parts)) as executor:
+                futures = [
+                    executor.submit(
+                        self.convert_title,
+                        input,
+                        part,
+                        index,
+                        o,
+                        merger.segment_handler(i),
+                        cancel=stop,
+                        timeout=timeout,
+                    )
+                    for i, (part, o) in enumerate(zip(parts, segment_opts))
+                ]
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                # stop the other segments as soon as one fails
+                if any(f.exception() is not None for f in done):
+                    stop.cancel()
+                wait(futures)
+                self._raise_segment_error([f.exception() for f in futures])
+            if cancel is not None and cancel.is_cancelled():
+                raise CancelledError
+            joiner(parts, Path(output))
+            merger.done()
+        finally:
+            if cancel is not None:
+                cancel.remove_callback(stop.cancel)
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+    async def convert_title_parallel_async(
+        self,
+        input: str | os.PathLike,
+        output: str | os.PathLike,
+        title: int | Literal["main"],
+        segments: int,
+        opts: ConvertOpts | None = None,
+        progress_handler: ProgressHandler | None = None,
+        joiner: Joiner = ffmpeg_join,
+        cancel: Canceller | None = None,
+    ):
+        """Asynchronously convert a title by splitting it at chapter
+        boundaries and encoding the segments concurrently, see
+        `convert_title_parallel`
+
+        :param input: the input source
+        :param output: the path to write the converted file to
+        :param title: the title to convert, either by integer index or
+        'main' to select the main title
+        :param segments: the number of segments to split the title into,
+        all of which are encoded at the same time. Fewer are used if the
+        title has fewer chapters
+        :param opts: conversion options, which must not select chapters
+        or start and stop times
+        :param progress_handler: a callback function to handle progress
+        updates for the whole title
+        :param joiner: a function which joins the segment files, in order,
+        into the output file, run in a separate thread
+        :param cancel: a parameter that allows early termination of the command
+        """
+        title_set = await self.scan_titles_async(input, title, cancel=cancel)
+        index, segment_opts, weights = self._plan_segments(title_set, segments, opts)
+        if len(segment_opts) < 2:
+            await self.convert_title_async(
+                input, output, index, opts, progress_handler, cancel=cancel
+            )
+            return
+
+        merger = ProgressMerger(weights, progress_handler)
+        parts_dir, parts = self._segment_paths(output, len(segment_opts))
+        stop = Canceller()
+        if cancel is not None:
+            cancel.add_callback(stop.cancel)
+        tasks = [
+            asyncio.create_task(
+                self.convert_title_async(
+                    input,
+                    part,
+                    index,
+                    o,
+                    merger.segment_handler(i),
+                    cancel=stop,
+                )
+            )
+            for i, (part, o) in enumerate(zip(parts, segment_opts))
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            if any(t.exception() is not None for t in done):
+                stop.cancel()
+            self._raise_segment_error(
+                await asyncio.gather(*tasks, return_exceptions=True)
+            )
+            if cancel is not None and cancel.is_cancelled():
+                raise CancelledError
+            await asyncio.to_thread(joiner, parts, Path(output))
+            merger.done()
+        finally:
+            for t in tasks:
+                t.cancel()
+            # wait for the segments to stop writing before removing them
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if cancel is not None:
+                cancel.remove_callback(stop.cancel)
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+    def _load_scan(self, kind: type[S], data: bytes) -> S:
+        if issubclass(kind, LazyTitleSet):
+            return kind(data, self.decoder)
+        return get_decoder(self.decoder)(kind, memoryview(data))
+
+    @staticmethod
+    def _dump_scan(title_set: TitleSet | LazyTitleSet) -> bytes:
+        if isinstance(title_set, LazyTitleSet):
+            return title_set.data
+        return title_set.model_dump_json(by_alias=True).encode()
+
+    @staticmethod
+    def _check_scan(title_set: S | None, title: int | Literal["main", "all"]) -> S:
+        if title_set is None:
+            raise RuntimeError("no titles found")
+        if title != "all" and len(title_set.title_list) == 0:
+            raise RuntimeError("title does not contain specified title")
+        return title_set
+
+    def _scan(
+        self,
+        kind: type[S],
+        input: str | os.PathLike,
+        title: int | Literal["main", "all"],
+        progress_handler: ProgressHandler | None,
+        progress_interval: float | None,
+        cancel: Canceller | None,
+        timeout: float | None,
+        resources: Resources | None = None,
+    ) -> S:
+        args = generate_scan_args(input, title)
+        cache_key: str | None = None
+        if self.scan_cache is not None:
+            repo_hash = self.version(cancel=cancel, timeout=timeout).repo_hash
+            cache_key = self.scan_cache.make_key(input, title, args, repo_hash)
+            if (cached := self.scan_cache.get_json(cache_key)) is not None:
+                return self._load_scan(kind, cached)
+
+        title_set: S | None = None
+        runner = ScanCommandRunner(
+            progress_interval=progress_interval,
+            decoder=self.decoder,
+            lazy=issubclass(kind, LazyTitleSet),
+            resources=resources,
+            **self._runner_options(),
+        )
+        for obj in runner.process(
+            self.executable, *args, cancel=cancel, timeout=timeout
+        ):
+            if isinstance(obj, Progress):
+                if progress_handler is not None:
+                    progress_handler(obj)
+            elif isinstance(obj, kind):
+                title_set = obj
+
+        # check output
+        title_set = self._check_scan(title_set, title)
+        if self.scan_cache is not None and cache_key is not None:
+            self.scan_cache.put_json(cache_key, input, self._dump_scan(title_set))
+        return title_set
+
+    async def _scan_async(
+        self,
+        kind: type[S],
+        input: str | os.PathLike,
+        title: int | Literal["main", "all"],
+        progress_handler: ProgressHandler | None,
+        progress_interval: float | None,
+        cancel: Canceller | None,
+        resources: Resources | None = None,
+    ) -> S:
+        args = generate_scan_args(input, title)
+        cache_key: str | None = None
+        if self.scan_cache is not None:
+            repo_hash = (await self.version_async(cancel=cancel)).repo_hash
+            cache_key = self.scan_cache.make_key(input, title, args, repo_hash)
+            cached = await asyncio.to_thread(self.scan_cache.get_json, cache_key)
+            if cached is not None:
+                return self._load_scan(kind, cached)
+
+        title_set: S | None = None
+        runner = ScanCommandRunner(
+            progress_interval=progress_interval,
+            decoder=self.decoder,
+            lazy=issubclass(kind, LazyTitleSet),
+            resources=resources,
+            **self._runner_options(),
+        )
         async for obj in runner.aprocess(self.executable, *args, cancel=cancel):
             if isinstance(obj, Progress):
                 if progress_handler is not None:
                     progress_handler(obj)
+            elif isinstance(obj, kind):
+                title_set = obj
+
+        # check output
+        title_set = self._check_scan(title_set, title)
+        if self.scan_cache is not None and cache_key is not None:
+            await asyncio.to_thread(
+                self.scan_cache.put_json, cache_key, input, self._dump_scan(title_set)
+            )
+        return title_set
 
     def scan_titles(
         self,
         input: str | os.PathLike,
         title: int | Literal["main", "all"],
         progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+        resources: Resources | None = None,
     ) -> TitleSet:
         """Scans the selected title(s) and returns their details
 
@@ -138,32 +644,35 @@ class HandBrake:
         :param title: the title(s) to scan, either by integer index,
         'main' to select the main title or 'all' to select all title
         :param progress_handler: a callback function to handle progress updates
+        :param progress_interval: if set, progress updates are coalesced so
+        the handler is called at most once per interval (in seconds), with
+        the final update always delivered
+        :param cancel: a parameter that allows early termination of the command
+        :param timeout: the number of seconds after which the command is
+        terminated and a `TimeoutError` raised
+        :param resources: limits on the CPUs, priority and I/O priority
+        of the HandBrakeCLI process, see `handbrake.resources.Resources`
         :return: a `TitleSet` containing the selected title
         """
-
-        args = generate_scan_args(input, title)
-        title_set: TitleSet | None = None
-        runner = ScanCommandRunner()
-        for obj in runner.process(self.executable, *args):
-            if isinstance(obj, Progress):
-                if progress_handler is not None:
-                    progress_handler(obj)
-            elif isinstance(obj, TitleSet):
-                title_set = obj
-
-        # check output
-        if title_set is None:
-            raise RuntimeError("no titles found")
-        if title != "all" and len(title_set.title_list) == 0:
-            raise RuntimeError("title does not contain specified title")
-        return title_set
+        return self._scan(
+            TitleSet,
+            input,
+            title,
+            progress_handler,
+            progress_interval,
+            cancel,
+            timeout,
+            resources,
+        )
 
     async def scan_titles_async(
         self,
         input: str | os.PathLike,
         title: int | Literal["main", "all"],
         progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
         cancel: Canceller | None = None,
+        resources: Resources | None = None,
     ) -> TitleSet:
         """Asynchronously scans the selected title(s) and returns their details
 
@@ -171,35 +680,300 @@ class HandBrake:
         :param title: the title(s) to scan, either by integer index,
         'main' to select the main title or 'all' to select all title
         :param progress_handler: a callback function to handle progress updates
+        :param progress_interval: if set, progress updates are coalesced so
+        the handler is called at most once per interval (in seconds), with
+        the final update always delivered
         :param cancel: A parameter to allow early termination of the command
+        :param resources: limits on the CPUs, priority and I/O priority
+        of the HandBrakeCLI process, see `handbrake.resources.Resources`
         :return: a `TitleSet` containing the selected title
         """
+        return await self._scan_async(
+            TitleSet,
+            input,
+            title,
+            progress_handler,
+            progress_interval,
+            cancel,
+            resources,
+        )
 
+    def scan_titles_lazy(
+        self,
+        input: str | os.PathLike,
+        title: int | Literal["main", "all"],
+        progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+    ) -> LazyTitleSet:
+        """Scans the selected title(s), validating the full details of each
+        title only when it is first accessed. This is much cheaper than
+        `scan_titles` when scanning every title of a disc to pick one
+
+        :param input: the input source
+        :param title: the title(s) to scan, either by integer index,
+        'main' to select the main title or 'all' to select all title
+        :param progress_handler: a callback function to handle progress updates
+        :param progress_interval: if set, progress updates are coalesced so
+        the handler is called at most once per interval (in seconds), with
+        the final update always delivered
+        :param cancel: a parameter that allows early termination of the command
+        :param timeout: the number of seconds after which the command is
+        terminated and a `TimeoutError` raised
+        :return: a `LazyTitleSet` containing the selected title
+        """
+        return self._scan(
+            LazyTitleSet,
+            input,
+            title,
+            progress_handler,
+            progress_interval,
+            cancel,
+            timeout,
+        )
+
+    async def scan_titles_lazy_async(
+        self,
+        input: str | os.PathLike,
+        title: int | Literal["main", "all"],
+        progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+    ) -> LazyTitleSet:
+        """Asynchronously scans the selected title(s), validating the full
+        details of each title only when it is first accessed
+
+        :param input: the input source
+        :param title: the title(s) to scan, either by integer index,
+        'main' to select the main title or 'all' to select all title
+        :param progress_handler: a callback function to handle progress updates
+        :param progress_interval: if set, progress updates are coalesced so
+        the handler is called at most once per interval (in seconds), with
+        the final update always delivered
+        :param cancel: A parameter to allow early termination of the command
+        :return: a `LazyTitleSet` containing the selected title
+        """
+        return await self._scan_async(
+            LazyTitleSet, input, title, progress_handler, progress_interval, cancel
+        )
+
+    def iter_titles(
+        self,
+        input: str | os.PathLike,
+        title: int | Literal["main", "all"],
+        progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+        max_buffer: int | None = 64 * 1024 * 1024,
+    ) -> TitleIterator:
+        """Scans the selected title(s), yielding each title as soon as it
+        has been read rather than collecting the whole title set. Results
+        are not stored in or served from the scan cache
+
+        :param input: the input source
+        :param title: the title(s) to scan, either by integer index,
+        'main' to select the main title or 'all' to select all title
+        :param progress_handler: a callback function to handle progress updates
+        :param progress_interval: if set, progress updates are coalesced so
+        the handler is called at most once per interval (in seconds), with
+        the final update always delivered
+        :param cancel: a parameter that allows early termination of the command
+        :param timeout: the number of seconds after which the command is
+        terminated and a `TimeoutError` raised
+        :param max_buffer: the number of bytes of output which may be
+        buffered while reading a title, beyond which the command is
+        terminated and an `OutputTooLargeError` raised
+        :return: an iterator over the titles, whose `main_feature` is set
+        once iteration has finished
+        """
+        runner = ScanCommandRunner(
+            progress_interval=progress_interval,
+            decoder=self.decoder,
+            stream=True,
+            max_buffer=max_buffer,
+            **self._runner_options(),
+        )
         args = generate_scan_args(input, title)
-        title_set: TitleSet | None = None
-        runner = ScanCommandRunner()
-        async for obj in runner.aprocess(self.executable, *args, cancel=cancel):
-            if isinstance(obj, Progress):
-                if progress_handler is not None:
-                    progress_handler(obj)
-            elif isinstance(obj, TitleSet):
-                title_set = obj
+        return TitleIterator(
+            runner.process(self.executable, *args, cancel=cancel, timeout=timeout),
+            progress_handler,
+        )
 
-        # check output
-        if title_set is None:
-            raise RuntimeError("no titles found")
-        if title != "all" and len(title_set.title_list) == 0:
-            raise RuntimeError("title does not contain specified title")
-        return title_set
+    def iter_titles_async(
+        self,
+        input: str | os.PathLike,
+        title: int | Literal["main", "all"],
+        progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+        max_buffer: int | None = 64 * 1024 * 1024,
+    ) -> AsyncTitleIterator:
+        """Asynchronously scans the selected title(s), yielding each title
+        as soon as it has been read
 
-    def get_preset(self, name: str) -> Preset:
+        :param input: the input source
+        :param title: the title(s) to scan, either by integer index,
+        'main' to select the main title or 'all' to select all title
+        :param progress_handler: a callback function to handle progress updates
+        :param progress_interval: if set, progress updates are coalesced so
+        the handler is called at most once per interval (in seconds), with
+        the final update always delivered
+        :param cancel: A parameter to allow early termination of the command
+        :param max_buffer: the number of bytes of output which may be
+        buffered while reading a title, beyond which the command is
+        terminated and an `OutputTooLargeError` raised
+        :return: an asynchronous iterator over the titles, whose
+        `main_feature` is set once iteration has finished
+        """
+        runner = ScanCommandRunner(
+            progress_interval=progress_interval,
+            decoder=self.decoder,
+            stream=True,
+            max_buffer=max_buffer,
+            **self._runner_options(),
+        )
+        args = generate_scan_args(input, title)
+        return AsyncTitleIterator(
+            runner.aprocess(self.executable, *args, cancel=cancel), progress_handler
+        )
+
+    def scan_many(
+        self,
+        inputs: Iterable[I],
+        title: int | Literal["main", "all"],
+        concurrency: int | None = None,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+    ) -> Generator[tuple[I, TitleSet | Exception], None, None]:
+        """Scan many input sources in parallel, yielding the results as
+        each scan completes
+
+        Inputs are consumed lazily so that only `concurrency` scans are
+        outstanding at any time, and an error scanning one input is
+        yielded in place of its result rather than stopping the others
+
+        :param inputs: the input sources
+        :param title: the title(s) to scan in each input, see `scan_titles`
+        :param concurrency: the maximum number of scans to run at once,
+        defaulting to the number of CPUs
+        :param cancel: a parameter that allows early termination of the scans
+        :param timeout: the number of seconds after which each scan is
+        terminated
+        :returns: pairs of each input with its `TitleSet` or the exception
+        raised while scanning it
+        """
+        concurrency = concurrency or os.cpu_count() or 1
+        it = iter(inputs)
+        stop = Canceller()
+        if cancel is not None:
+            cancel.add_callback(stop.cancel)
+        with ThreadPoolExecutor(concurrency) as executor:
+            pending: dict[Future[TitleSet], I] = {}
+            try:
+                while True:
+                    for input in islice(it, concurrency - len(pending)):
+                        f = executor.submit(
+                            self.scan_titles, input, title, cancel=stop, timeout=timeout
+                        )
+                        pending[f] = input
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        input = pending.pop(f)
+                        yield input, _scan_result(f)
+            finally:
+                # stop outstanding scans if the caller stops early
+                stop.cancel()
+                if cancel is not None:
+                    cancel.remove_callback(stop.cancel)
+
+    async def scan_many_async(
+        self,
+        inputs: Iterable[I],
+        title: int | Literal["main", "all"],
+        concurrency: int | None = None,
+        cancel: Canceller | None = None,
+    ) -> AsyncGenerator[tuple[I, TitleSet | Exception], None]:
+        """Asynchronously scan many input sources in parallel, yielding
+        the results as each scan completes
+
+        :param inputs: the input sources
+        :param title: the title(s) to scan in each input, see `scan_titles`
+        :param concurrency: the maximum number of scans to run at once,
+        defaulting to the number of CPUs
+        :param cancel: a parameter that allows early termination of the scans
+        :returns: pairs of each input with its `TitleSet` or the exception
+        raised while scanning it
+        """
+        concurrency = concurrency or os.cpu_count() or 1
+        it = iter(inputs)
+        pending: dict[asyncio.Task[TitleSet], I] = {}
+        try:
+            while True:
+                for input in islice(it, concurrency - len(pending)):
+                    t = asyncio.create_task(
+                        self.scan_titles_async(input, title, cancel=cancel)
+                    )
+                    pending[t] = input
+                if not pending:
+                    break
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for t in done:
+                    input = pending.pop(t)
+                    yield input, _scan_result(t)
+        finally:
+            for t in pending:
+                t.cancel()
+
+    def get_preset(
+        self,
+        name: str,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+    ) -> Preset:
         """Get the builtin preset with the given name
 
         :param name: the name of the preset to select
+        :param cancel: a parameter that allows early termination of the command
+        :param timeout: the number of seconds after which the command is
+        terminated and a `TimeoutError` raised
+        :returns: a `Preset` object containing the selected preset
+        """
+        preset_list: Preset | None = None
+        runner = PresetCommandRunner(decoder=self.decoder, **self._runner_options())
+        args = [
+            "--json",
+            "-Z",
+            name,
+            "--preset-export",
+            name,
+        ]
+        for obj in runner.process(
+            self.executable, *args, cancel=cancel, timeout=timeout
+        ):
+            if isinstance(obj, Preset):
+                preset_list = obj
+
+        if preset_list is None:
+            raise RuntimeError("no preset list found")
+        return preset_list
+
+    async def get_preset_async(
+        self, name: str, cancel: Canceller | None = None
+    ) -> Preset:
+        """Asynchronously get the builtin preset with the given name
+
+        :param name: the name of the preset to select
+        :param cancel: a parameter that allows early termination of the command
         :returns: a `Preset` object containing the selected preset
         """
         preset_list: Preset | None = None
-        runner = PresetCommandRunner()
+        runner = PresetCommandRunner(decoder=self.decoder, **self._runner_options())
         args = [
             "--json",
             "-Z",
@@ -207,7 +981,7 @@ class HandBrake:
             "--preset-export",
             name,
         ]
-        for obj in runner.process(self.executable, *args):
+        async for obj in runner.aprocess(self.executable, *args, cancel=cancel):
             if isinstance(obj, Preset):
                 preset_list = obj
 
@@ -215,39 +989,33 @@ class HandBrake:
             raise RuntimeError("no preset list found")
         return preset_list
 
-    def list_presets(self) -> list[PresetGroup]:
+    def list_presets(
+        self, cancel: Canceller | None = None, timeout: float | None = None
+    ) -> list[PresetGroup]:
         """List all builtin presets
 
+        :param cancel: a parameter that allows early termination of the command
+        :param timeout: the number of seconds after which the command is
+        terminated and a `TimeoutError` raised
+        :returns: a list of preset groups
+        """
+        runner = PresetListCommandRunner(**self._runner_options())
+        for _ in runner.process(self.executable, "-z", cancel=cancel, timeout=timeout):
+            pass
+        return runner.finish()
+
+    async def list_presets_async(
+        self, cancel: Canceller | None = None
+    ) -> list[PresetGroup]:
+        """Asynchronously list all builtin presets
+
+        :param cancel: a parameter that allows early termination of the command
         :returns: a list of preset groups
         """
-        res: list[PresetGroup] = []
-        curgroup = PresetGroup(name="", presets=[])
-        curpreset = PresetInfo(name="", description="")
-        cmd = [self.executable, "-z"]
-        proc = subprocess.run(cmd, capture_output=True, check=True)
-
-        # the output is of the format
-        # groupA/
-        #     preset 1 name
-        #         the description of the preset
-        #     preset 2 name
-        #         the second description, it can span
-        #         multiple lines
-        # groupB/
-        #     ...
-        for line in proc.stderr.decode().splitlines():
-            if line.endswith("/"):
-                curgroup = PresetGroup(name=line[:-1], presets=[])
-                res.append(curgroup)
-            elif line.startswith("        "):
-                if curpreset.description == "":
-                    curpreset.description = line.strip()
-                else:
-                    curpreset.description += " " + line.strip()
-            elif line.startswith("    "):
-                curpreset = PresetInfo(name=line.strip(), description="")
-                curgroup.presets.append(curpreset)
-        return res
+        runner = PresetListCommandRunner(**self._runner_options())
+        async for _ in runner.aprocess(self.executable, "-z", cancel=cancel):
+            pass
+        return runner.finish()
 
     def load_preset_from_file(self, file: str | os.PathLike | TextIOBase) -> Preset:
         """Load a handbrake preset export into a `Preset` object
@@ -271,3 +1039,24 @@ class HandBrake:
         else:
             with open(file, "w") as f:
                 f.write(preset.model_dump_json(by_alias=True))
+
+    async def load_preset_from_file_async(
+        self, file: str | os.PathLike | TextIOBase
+    ) -> Preset:
+        """Asynchronously load a handbrake preset export into a `Preset`
+        object, reading and parsing the file off the event loop
+
+        :param file: either a filepath or a file-like object to read the preset from
+        :returns: a `Preset` object from the data in the given file
+        """
+        return await asyncio.to_thread(self.load_preset_from_file, file)
+
+    async def save_preset_to_file_async(
+        self, file: str | os.PathLike | TextIOBase, preset: Preset
+    ):
+        """Asynchronously save a handbrake preset to a file, serialising
+        and writing it off the event loop
+
+        :param file: either a filepath or a file-like object to write the preset to
+        """
+        await asyncio.to_thread(self.save_preset_to_file, file, preset)
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Generator, Literal
+
+from handbrake.models.title import TitleSet
+
+
+class ScanCache:
+    """
+    A persistent cache of scan results, stored in an SQLite database
+
+    Entries are keyed on the resolved input path, its size and
+    modification time, the titles and arguments scanned and the
+    HandBrakeCLI build, so a changed input or a different HandBrakeCLI
+    never returns a stale result. When the stored results exceed
+    `max_size` bytes the least recently used entries are evicted
+    """
+
+    def __init__(self, path: str | os.PathLike, max_size: int = 256 * 1024 * 1024):
+        """Open (creating if needed) a scan cache
+
+        :param path: the path of the database file
+        :param max_size: the maximum total size in bytes of the stored
+        scan results
+        """
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS scans (
+                key TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scans_path ON scans (path);
+            CREATE INDEX IF NOT EXISTS scans_last_access ON scans (last_access);
+            """
+        )
+        self._last_access = 0.0
+
+    def _now(self) -> float:
+        # access times must be strictly increasing for the eviction order
+        # to be correct, even with a coarse system clock
+        self._last_access = max(time.time(), self._last_access + 1e-6)
+        return self._last_access
+
+    @staticmethod
+    def make_key(
+        input: str | os.PathLike,
+        title: int | Literal["main", "all"],
+        args: list[str],
+        repo_hash: str,
+    ) -> str:
+        """Create the cache key for a scan
+
+        :param input: the input source
+        :param title: the title selector passed to `scan_titles`
+        :param args: the arguments passed to HandBrakeCLI
+        :param repo_hash: the repo hash of the HandBrakeCLI build
+        """
+        st = os.stat(input)
+        material = [
+            os.path.realpath(input),
+            st.st_size,
+            st.st_mtime_ns,
+            str(title),
+            args,
+            repo_hash,
+        ]
+        return hashlib.sha256(json.dumps(material).encode()).hexdigest()
+
+    def get(self, key: str) -> TitleSet | None:
+        """Return the cached scan result for the key, if any"""
+        data = self.get_json(key)
+        if data is None:
+            return None
+        return TitleSet.model_validate_json(data)
+
+    def get_json(self, key: str) -> bytes | None:
+        """Return the JSON of the cached scan result for the key, if any"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM scans WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE scans SET last_access = ? WHERE key = ?", (self._now(), key)
+            )
+        return row[0]
+
+    def put(self, key: str, input: str | os.PathLike, title_set: TitleSet):
+        """Store a scan result, evicting old entries if the cache is full"""
+        self.put_json(key, input, title_set.model_dump_json(by_alias=True).encode())
+
+    def put_json(self, key: str, input: str | os.PathLike, data: bytes):
+        """Store the JSON of a scan result, evicting old entries if the
+        cache is full"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO scans VALUES (?, ?, ?, ?, ?)",
+                (key, os.path.realpath(input), data, len(data), self._now()),
+            )
+            self._evict()
+
+    def iter_json(self) -> Generator[tuple[str, bytes], None, None]:
+        """Yield the input path and JSON of every cached scan result, in
+        no particular order and without updating their access times"""
+        with self._lock:
+            rows = self._db.execute("SELECT path, data FROM scans").fetchall()
+        yield from rows
+
+    def invalidate(self, input: str | os.PathLike | None = None):
+        """Remove the cached results for an input, or every result if no
+        input is given"""
+        with self._lock:
+            if input is None:
+                self._db.execute("DELETE FROM scans")
+            else:
+                self._db.execute(
+                    "DELETE FROM scans WHERE path = ?", (os.path.realpath(input),)
+                )
+
+    def size(self) -> int:
+        """The total size in bytes of the stored scan results"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM scans"
+            ).fetchone()[0]
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM scans").fetchone()[
+            0
+        ]
+        if total <= self.max_size:
+            return
+        rows = self._db.execute(
+            "SELECT key, size FROM scans ORDER BY last_access"
+        ).fetchall()
+        evict: list[tuple[str]] = []
+        for key, size in rows:
+            if total <= self.max_size:
+                break
+            evict.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM scans WHERE key = ?", evict)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "ScanCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,15 +1,70 @@
+import asyncio
 import threading
+from typing import Callable
 
 
 class Canceller:
+    """
+    A flag which can be set from any thread to cancel a running command.
+    Commands waiting on the canceller are woken as soon as it is set
+    rather than having to poll it
+    """
+
     def __init__(self):
-        self._cancelled = False
+        self._event = threading.Event()
         self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
 
     def cancel(self):
         with self._lock:
-            self._cancelled = True
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
 
     def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until cancelled or the timeout expires
+
+        :returns: whether the canceller was cancelled
+        """
+        return self._event.wait(timeout)
+
+    async def wait_async(self):
+        """Wait until cancelled without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[None] = loop.create_future()
+
+        def wake():
+            if not future.done():
+                future.set_result(None)
+
+        def callback():
+            loop.call_soon_threadsafe(wake)
+
+        self.add_callback(callback)
+        try:
+            await future
+        finally:
+            self.remove_callback(callback)
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Register a function to call once when cancelled; it is called
+        immediately if already cancelled. The callback may be run on any
+        thread"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
         with self._lock:
-            return self._cancelled
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
@@ -0,0 +1,125 @@
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+from urllib.parse import quote
+
+from pydantic import TypeAdapter
+
+from handbrake import HandBrake
+from handbrake.models.preset import Preset, PresetGroup
+
+_groups_adapter = TypeAdapter(list[PresetGroup])
+
+
+class PresetCatalog:
+    """
+    A cache of the builtin presets of a HandBrakeCLI build
+
+    The list of presets is loaded once and each preset is exported the
+    first time it is requested. If `cache_dir` is given, the catalog is
+    also persisted there in a directory per HandBrakeCLI version so it
+    survives restarts
+    """
+
+    def __init__(
+        self,
+        handbrake: HandBrake,
+        cache_dir: str | os.PathLike | None = None,
+        concurrency: int | None = None,
+    ):
+        """Create a catalog
+
+        :param handbrake: the wrapper used to list and export presets
+        :param cache_dir: a directory to persist the catalog in
+        :param concurrency: the maximum number of presets to export at
+        once in `get_presets`, defaulting to the number of CPUs
+        """
+        self.handbrake = handbrake
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._groups: list[PresetGroup] | None = None
+        self._presets: dict[str, Preset] = {}
+
+    def _version_dir(self) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        v = self.handbrake.version()
+        return self.cache_dir / quote(f"{v.version_string}-{v.repo_hash}", safe="")
+
+    def _preset_path(self, name: str) -> Path | None:
+        if (d := self._version_dir()) is None:
+            return None
+        return d / "presets" / (quote(name, safe="") + ".json")
+
+    @staticmethod
+    def _write(path: Path, data: str):
+        # write atomically so concurrent readers never see partial files
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}")
+        tmp.write_text(data)
+        os.replace(tmp, path)
+
+    def list_presets(self) -> list[PresetGroup]:
+        """List all builtin presets, see `HandBrake.list_presets`"""
+        with self._lock:
+            if self._groups is not None:
+                return self._groups
+        path = d / "groups.json" if (d := self._version_dir()) is not None else None
+        if path is not None and path.exists():
+            groups = _groups_adapter.validate_json(path.read_bytes())
+        else:
+            groups = self.handbrake.list_presets()
+            if path is not None:
+                self._write(path, _groups_adapter.dump_json(groups).decode())
+        with self._lock:
+            self._groups = groups
+        return groups
+
+    def names(self) -> list[str]:
+        """The names of all builtin presets"""
+        return [p.name for g in self.list_presets() for p in g.presets]
+
+    def get_preset(self, name: str) -> Preset:
+        """Get the builtin preset with the given name, see
+        `HandBrake.get_preset`"""
+        with self._lock:
+            if (preset := self._presets.get(name)) is not None:
+                return preset
+        path = self._preset_path(name)
+        if path is not None and path.exists():
+            preset = Preset.model_validate_json(path.read_bytes())
+        else:
+            preset = self.handbrake.get_preset(name)
+            if path is not None:
+                self._write(path, preset.model_dump_json(by_alias=True))
+        with self._lock:
+            self._presets[name] = preset
+        return preset
+
+    def get_presets(self, names: Iterable[str]) -> dict[str, Preset]:
+        """Get several builtin presets, exporting those which are not yet
+        cached in parallel
+
+        :param names: the names of the presets to select
+        :returns: a dictionary mapping each name to its preset
+        """
+        names = list(dict.fromkeys(names))
+        with self._lock:
+            missing = [n for n in names if n not in self._presets]
+        if len(missing) > 1:
+            with ThreadPoolExecutor(min(self.concurrency, len(missing))) as executor:
+                list(executor.map(self.get_preset, missing))
+        return {name: self.get_preset(name) for name in names}
+
+    def clear(self):
+        """Forget the cached catalog, both in memory and on disk for the
+        current HandBrakeCLI version"""
+        with self._lock:
+            self._groups = None
+            self._presets.clear()
+        if (d := self._version_dir()) is not None:
+            shutil.rmtree(d, ignore_errors=True)
@@ -0,0 +1,47 @@
+from typing import Callable, TypeVar
+
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+Decoder = Callable[[type[M], memoryview], M]
+
+
+def pydantic_decoder(model: type[M], data: memoryview) -> M:
+    """Decode and validate JSON against a model with pydantic-core"""
+    return model.model_validate_json(data.tobytes())
+
+
+_decoders: dict[str, Decoder] = {
+    "pydantic": pydantic_decoder,
+}
+_default: Decoder = pydantic_decoder
+
+
+def register_decoder(name: str, decoder: Decoder):
+    """Make a decoder available by name, e.g. one built on msgspec. The
+    decoder must return an instance of the model it is given"""
+    _decoders[name] = decoder
+
+
+def unregister_decoder(name: str):
+    """Remove a decoder added with `register_decoder`, raising `KeyError`
+    if there is none with that name"""
+    del _decoders[name]
+
+
+def get_decoder(decoder: str | Decoder | None = None) -> Decoder:
+    """Resolve a decoder name or function, returning the default decoder
+    if none is given"""
+    if decoder is None:
+        return _default
+    if isinstance(decoder, str):
+        return _decoders[decoder]
+    return decoder
+
+
+def set_default_decoder(decoder: str | Decoder):
+    """Set the decoder used for title sets, presets and versions when a
+    runner is not given one explicitly"""
+    global _default
+    _default = get_decoder(decoder)
@@ -1,7 +1,8 @@
 class HandBrakeError(Exception):
-    def __init__(self, return_code: int):
+    def __init__(self, return_code: int, stderr: bytes = b""):
         super().__init__()
         self.return_code = return_code
+        self.stderr = stderr
 
     def __str__(self) -> str:
         return "handbrake exited with return code " + str(self.return_code)
@@ -9,3 +10,11 @@ class HandBrakeError(Exception):
 
 class CancelledError(Exception):
     pass
+
+
+class TimeoutError(CancelledError):
+    pass
+
+
+class OutputTooLargeError(Exception):
+    pass
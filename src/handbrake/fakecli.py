@@ -0,0 +1,460 @@
+"""
+A stand in for HandBrakeCLI which accepts the arguments `HandBrake` passes
+and writes output shaped like the real program's, for exercising the
+spawn, read, parse and cancel paths under load without HandBrakeCLI
+
+Run it with `python -m handbrake.fakecli`, or write a launcher with
+`write_launcher` which can be given to `HandBrake(executable=...)`. The
+behaviour is configured with `FakeConfig`, read from `FAKECLI_*`
+environment variables.
+
+This module only uses the standard library and is run by launchers
+without importing the `handbrake` package, so each fake process starts
+about as quickly as the interpreter does.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, TextIO
+
+PRESETS = {
+    "General": {
+        "Very Fast 1080p30": "Small H.264 video (up to 1080p30) and AAC stereo "
+        "audio, in an MP4 container.",
+        "Fast 1080p30": "H.264 video (up to 1080p30) and AAC stereo audio, in an "
+        "MP4 container.",
+        "HQ 1080p30 Surround": "High quality H.264 video (up to 1080p30), AAC "
+        "stereo audio, and Dolby Digital (AC-3) surround audio, in an MP4 "
+        "container.",
+    },
+    "Matroska": {
+        "H.265 MKV 1080p30": "H.265 video (up to 1080p30) and AAC stereo audio, "
+        "in an MKV container.",
+    },
+}
+VIDEO_ENCODERS = ["svt_av1", "x264", "x265", "mpeg4", "theora"]
+AUDIO_ENCODERS = ["av_aac", "ac3", "eac3", "flac24", "opus", "copy:ac3", "copy"]
+# return code of HandBrakeCLI when the arguments are invalid
+_INVALID_INPUT = 2
+
+
+@dataclass
+class FakeConfig:
+    """
+    The behaviour of the fake executable. Each field is read from the
+    environment variable named after it, e.g. `progress_interval` from
+    `FAKECLI_PROGRESS_INTERVAL`
+    """
+
+    # the runtime in minutes of each title on the fake disc, the longest
+    # being the main feature
+    titles: list[int] = field(default_factory=lambda: [30, 90, 45])
+    # the number of progress updates written during an encode
+    progress_updates: int = 100
+    # the number of seconds between progress updates of an encode
+    progress_interval: float = 0.0
+    # the number of seconds spent scanning each title
+    scan_interval: float = 0.0
+    # the frame rate reported while encoding
+    fps: float = 30.0
+    # the size in bytes of the output file written by an encode
+    output_size: int = 1024
+    # the number of log lines written to stderr with each progress update
+    log_lines: int = 1
+    # if not zero, the return code to fail encodes and scans with after
+    # `fail_after` progress updates
+    fail: int = 0
+    fail_after: int = 0
+    # if set, stop responding (but keep running) after this many progress
+    # updates, until the process is terminated
+    hang_after: int | None = None
+    version: str = "1.8.2"
+
+    @classmethod
+    def from_env(cls, env: dict[str, str] | None = None) -> "FakeConfig":
+        """Read the configuration from environment variables, using the
+        defaults for any which are unset"""
+        if env is None:
+            env = dict(os.environ)
+        config = cls()
+        for name, default in asdict(config).items():
+            value = env.get(f"FAKECLI_{name.upper()}")
+            if value is None or value == "":
+                continue
+            if name == "titles":
+                setattr(config, name, [int(m) for m in value.split(",")])
+            elif name == "hang_after":
+                setattr(config, name, int(value))
+            else:
+                setattr(config, name, type(default)(value))
+        return config
+
+    def to_env(self) -> dict[str, str]:
+        """Return the environment variables holding this configuration"""
+        env = {}
+        for name, value in asdict(self).items():
+            if name == "titles":
+                value = ",".join(str(m) for m in value)
+            elif value is None:
+                value = ""
+            env[f"FAKECLI_{name.upper()}"] = str(value)
+        return env
+
+
+def write_launcher(path: str | os.PathLike, config: FakeConfig | None = None) -> str:
+    """Write an executable script which runs the fake HandBrakeCLI, for
+    passing to `HandBrake(executable=...)`
+
+    The script runs this module's file directly rather than importing the
+    `handbrake` package, so it starts quickly. Environment variables set
+    when it is run override the configuration written into it. Launchers
+    are python scripts with a shebang line, so they cannot be executed
+    directly on Windows
+
+    :param path: where to write the script
+    :param config: the configuration of the fake, or the defaults if not
+    provided
+    :returns: the absolute path of the script
+    """
+    env = (config or FakeConfig()).to_env()
+    script = (
+        f"#!{sys.executable}\n"
+        "import os, runpy\n"
+        f"for name, value in {env!r}.items():\n"
+        "    os.environ.setdefault(name, value)\n"
+        f"runpy.run_path({os.path.abspath(__file__)!r}, run_name='__main__')\n"
+    )
+    with open(path, "w") as f:
+        f.write(script)
+    os.chmod(path, 0o755)
+    return os.path.abspath(path)
+
+
+def _duration(seconds: int) -> dict[str, int]:
+    minutes, seconds_ = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return {
+        "Hours": hours,
+        "Minutes": minutes,
+        "Seconds": seconds_,
+        "Ticks": seconds * 90000,
+    }
+
+
+def _title(index: int, minutes: int) -> dict[str, Any]:
+    # a chapter for every minute, as with `MockTitle`
+    chapters = [
+        {"Duration": _duration(60), "Name": f"Chapter {c + 1}"} for c in range(minutes)
+    ]
+    return {
+        "AngleCount": 1,
+        "AudioList": [
+            {
+                "Attributes": {
+                    "AltCommentary": False,
+                    "Commentary": False,
+                    "Default": True,
+                    "Normal": True,
+                    "Secondary": False,
+                    "VisuallyImpaired": False,
+                },
+                "BitRate": 640000,
+                "ChannelCount": 6,
+                "ChannelLayout": 1551,
+                "ChannelLayoutName": "5.1(side)",
+                "Codec": 2048,
+                "CodecName": "AC3",
+                "CodecParam": 86019,
+                "Description": "English (AC3, 5.1 ch, 640 kbps)",
+                "LFECount": 1,
+                "Language": "English",
+                "LanguageCode": "eng",
+                "SampleRate": 48000,
+                "TrackNumber": 1,
+            }
+        ],
+        "ChapterList": chapters,
+        "Color": {
+            "BitDepth": 8,
+            "ChromaLocation": 1,
+            "ChromaSubsampling": "4:2:0",
+            "Format": 0,
+            "Matrix": 1,
+            "Primary": 1,
+            "Range": 1,
+            "Transfer": 1,
+        },
+        "Crop": [0, 0, 0, 0],
+        "Duration": _duration(minutes * 60),
+        "FrameRate": {"Den": 1001, "Num": 24000},
+        "Geometry": {"Height": 1080, "PAR": {"Den": 1, "Num": 1}, "Width": 1920},
+        "Index": index,
+        "InterlaceDetected": False,
+        "LooseCrop": [0, 0, 0, 0],
+        "Metadata": {},
+        "Name": f"Title {index}",
+        "Path": "fake",
+        "Playlist": index,
+        "SubtitleList": [
+            {
+                "Attributes": {
+                    "4By3": False,
+                    "Children": False,
+                    "ClosedCaption": False,
+                    "Commentary": False,
+                    "Default": False,
+                    "Forced": False,
+                    "Large": False,
+                    "Letterbox": False,
+                    "Normal": True,
+                    "PanScan": False,
+                    "Wide": False,
+                },
+                "Format": "bitmap",
+                "Language": "English",
+                "LanguageCode": "eng",
+                "Source": 4,
+                "SourceName": "PGS",
+                "TrackNumber": 1,
+            }
+        ],
+        "Type": 2,
+        "VideoCodec": "h264",
+    }
+
+
+class FakeHandBrakeCLI:
+    def __init__(self, config: FakeConfig, stdout: TextIO, stderr: TextIO):
+        self.config = config
+        self.stdout = stdout
+        self.stderr = stderr
+        self.updates = 0
+        # the title number of the main feature
+        self.main_feature = (
+            max(range(len(config.titles)), key=config.titles.__getitem__) + 1
+            if config.titles
+            else 0
+        )
+
+    def write_object(self, label: str, obj: Any):
+        prefix = f"{label} " if label else ""
+        self.stdout.write(prefix + json.dumps(obj, indent=4) + "\n")
+        self.stdout.flush()
+
+    def progress(self, state: str, key: str, values: dict[str, Any]):
+        """Write a progress update, then fail or hang if configured to"""
+        if self.config.fail and self.updates >= self.config.fail_after:
+            self.stderr.write(f"fake failure with return code {self.config.fail}\n")
+            self.stderr.flush()
+            sys.exit(self.config.fail)
+        if (
+            self.config.hang_after is not None
+            and self.updates >= self.config.hang_after
+        ):
+            while True:
+                time.sleep(3600)
+        self.write_object("Progress:", {"State": state, key: values})
+        for _ in range(self.config.log_lines):
+            self.stderr.write(f"[{time.strftime('%H:%M:%S')}] {state.lower()}\n")
+        self.stderr.flush()
+        self.updates += 1
+
+    def version(self) -> int:
+        major, minor, point = (int(v) for v in self.config.version.split("."))
+        self.write_object(
+            "Version:",
+            {
+                "Arch": "x86_64",
+                "Name": "HandBrake",
+                "Official": False,
+                "RepoDate": "2024-01-01 00:00:00",
+                "RepoHash": "fake",
+                "System": "Fake",
+                "Type": "release",
+                "Version": {"Major": major, "Minor": minor, "Point": point},
+                "VersionString": self.config.version,
+            },
+        )
+        return 0
+
+    def help(self) -> int:
+        lines = ["Usage: HandBrakeCLI [options] -i <source> -o <destination>", ""]
+        for option in _parser()._actions:
+            line = "   " + ", ".join(option.option_strings)
+            lines.append(line if option.nargs == 0 else line + " <string>")
+            if "--encoder" in option.option_strings:
+                lines += [" " * 30 + e for e in VIDEO_ENCODERS]
+            elif "--aencoder" in option.option_strings:
+                lines += [" " * 30 + e for e in AUDIO_ENCODERS]
+        self.stdout.write("\n".join(lines) + "\n")
+        return 0
+
+    def preset_list(self) -> int:
+        for group, presets in PRESETS.items():
+            self.stderr.write(f"{group}/\n")
+            for name, description in presets.items():
+                self.stderr.write(f"    {name}\n        {description}\n")
+        return 0
+
+    def preset_export(self, name: str) -> int:
+        descriptions = {n: d for p in PRESETS.values() for n, d in p.items()}
+        if name not in descriptions:
+            self.stderr.write(f"Invalid preset {name}\n")
+            return _INVALID_INPUT
+        self.write_object(
+            "",
+            {
+                "PresetList": [
+                    {
+                        "PresetName": name,
+                        "PresetDescription": descriptions[name],
+                        "FileFormat": "av_mp4",
+                        "VideoEncoder": "x264",
+                        "VideoQualitySlider": 22.0,
+                    }
+                ],
+                "VersionMajor": 56,
+                "VersionMicro": 0,
+                "VersionMinor": 0,
+            },
+        )
+        return 0
+
+    def select(self, args: argparse.Namespace) -> list[int] | None:
+        """Return the numbers of the selected titles, or None if the
+        selection is invalid"""
+        if args.main_feature:
+            return [self.main_feature] if self.main_feature else []
+        if args.title is None or args.title == 0:
+            return list(range(1, len(self.config.titles) + 1))
+        if 1 <= args.title <= len(self.config.titles):
+            return [args.title]
+        return None
+
+    def scan(self, args: argparse.Namespace) -> int:
+        selected = self.select(args) or []
+        count = len(self.config.titles)
+        for i in range(count):
+            time.sleep(self.config.scan_interval)
+            self.progress(
+                "SCANNING",
+                "Scanning",
+                {
+                    "Preview": 0,
+                    "PreviewCount": 10,
+                    "Progress": i / count,
+                    "SequenceID": 0,
+                    "Title": i + 1,
+                    "TitleCount": count,
+                },
+            )
+        self.write_object(
+            "JSON Title Set:",
+            {
+                "MainFeature": self.main_feature if selected else -1,
+                "TitleList": [_title(i, self.config.titles[i - 1]) for i in selected],
+            },
+        )
+        return 0
+
+    def convert(self, args: argparse.Namespace) -> int:
+        selected = self.select(args)
+        if selected is None or len(selected) != 1:
+            self.stderr.write("No title found\n")
+            return _INVALID_INPUT
+        n = self.config.progress_updates
+        for i in range(n):
+            time.sleep(self.config.progress_interval)
+            eta = int((n - i) * self.config.progress_interval)
+            self.progress(
+                "WORKING",
+                "Working",
+                {
+                    "ETASeconds": eta,
+                    "Hours": eta // 3600,
+                    "Minutes": eta // 60 % 60,
+                    "Pass": 1,
+                    "PassCount": 1,
+                    "PassID": -1,
+                    "Paused": 0,
+                    "Progress": i / n,
+                    "Rate": self.config.fps,
+                    "RateAvg": self.config.fps,
+                    "Seconds": eta % 60,
+                    "SequenceID": 1,
+                },
+            )
+        with open(args.output, "wb") as f:
+            f.write(b"\0" * self.config.output_size)
+        self.write_object(
+            "Progress:",
+            {"State": "WORKDONE", "WorkDone": {"Error": 0, "SequenceID": 1}},
+        )
+        return 0
+
+    def run(self, args: argparse.Namespace) -> int:
+        if args.help:
+            return self.help()
+        if args.version:
+            return self.version()
+        if args.preset_list:
+            return self.preset_list()
+        if args.preset_export is not None:
+            return self.preset_export(args.preset_export)
+        if args.input is None:
+            self.stderr.write("Missing input device\n")
+            return _INVALID_INPUT
+        if args.scan:
+            return self.scan(args)
+        if args.output is None:
+            self.stderr.write("Missing output file name\n")
+            return _INVALID_INPUT
+        return self.convert(args)
+
+
+def _parser() -> argparse.ArgumentParser:
+    # the options generated by `handbrake.opts` and the `HandBrake` methods
+    parser = argparse.ArgumentParser(prog="HandBrakeCLI", add_help=False)
+    parser.add_argument("-h", "--help", action="store_true")
+    parser.add_argument("--version", action="store_true")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("-i", "--input")
+    parser.add_argument("-o", "--output")
+    parser.add_argument("-t", "--title", type=int)
+    parser.add_argument("--main-feature", action="store_true")
+    parser.add_argument("--scan", action="store_true")
+    parser.add_argument("-z", "--preset-list", action="store_true")
+    parser.add_argument("-Z", "--preset")
+    parser.add_argument("--preset-export")
+    parser.add_argument("--preset-import-file")
+    parser.add_argument("--preset-import-gui", action="store_true")
+    parser.add_argument("--no-dvdnav", action="store_true")
+    parser.add_argument("-c", "--chapters")
+    parser.add_argument("--angle", type=int)
+    parser.add_argument("--previews")
+    parser.add_argument("--start-at-preview", type=int)
+    parser.add_argument("--start-at")
+    parser.add_argument("--stop-at")
+    parser.add_argument("-a", "--audio")
+    parser.add_argument("--all-audio", action="store_true")
+    parser.add_argument("--first-audio", action="store_true")
+    parser.add_argument("-s", "--subtitle")
+    parser.add_argument("--all-subtitles", action="store_true")
+    parser.add_argument("--first-subtitle", action="store_true")
+    parser.add_argument("-e", "--encoder")
+    parser.add_argument("-E", "--aencoder")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parser().parse_args(argv)
+    cli = FakeHandBrakeCLI(FakeConfig.from_env(), sys.stdout, sys.stderr)
+    return cli.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import re
+from typing import Generator, Sequence
+
+from handbrake.errors import OutputTooLargeError
+
+# characters which change the nesting depth or string state of a JSON
+# document, and the characters which can end a string
+_STRUCTURAL = re.compile(rb'[{}"]')
+_STRING_END = re.compile(rb'["\\]')
+# a run of a complete JSON document up to the next bracket, skipping
+# over any strings
+_TO_BRACKET = re.compile(rb'[^][{}"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^][{}"]*)*')
+
+
+def iter_objects(data: bytes, depth: int) -> Generator[tuple[int, int], None, None]:
+    """Yield the start and end offsets of every object opened at the given
+    nesting depth of a complete JSON document, e.g. depth 3 for the
+    elements of an array held by the top level object. The document is
+    only scanned as far as is needed for each object"""
+    level = 0
+    start = -1
+    pos = 0
+    n = len(data)
+    match = _TO_BRACKET.match
+    while True:
+        # the pattern can match an empty run, so always matches
+        m = match(data, pos)
+        pos = m.end() if m else pos
+        if pos >= n:
+            break
+        c = data[pos]
+        if c in b"{[":
+            level += 1
+            if level == depth and c == ord("{"):
+                start = pos
+        elif c in b"}]":
+            if level == depth and start != -1:
+                yield start, pos + 1
+                start = -1
+            level -= 1
+        else:
+            raise ValueError("unterminated string in JSON document")
+        pos += 1
+
+
+class JSONFramer:
+    """
+    Find labelled JSON objects in a stream of command output
+
+    An object starts on a line beginning with one of the labels followed
+    by an opening brace (e.g. `Progress: {`) and ends at the matching
+    closing brace, which may be on the same line or many lines later.
+    Brace and string state is tracked across calls to `feed` so output
+    can be split at arbitrary points.
+
+    Objects with a label in `split` are not buffered whole: each object
+    nested directly inside them (e.g. the titles in a title set) is
+    yielded as soon as it closes and replaced by `0` in the buffer, so
+    only the current element is held in memory. Elements are yielded with
+    the index `len(labels)` plus the position of their label in `split`,
+    followed by what remains of the outer object under its own index.
+    """
+
+    def __init__(
+        self,
+        labels: Sequence[bytes],
+        split: Sequence[bytes] = (),
+        max_size: int | None = None,
+    ):
+        """
+        :param labels: the labels which introduce objects
+        :param split: labels whose nested objects are yielded separately
+        :param max_size: the number of bytes which may be buffered while
+        looking for the end of an object or line, beyond which
+        `OutputTooLargeError` is raised
+        """
+        self.labels = list(labels)
+        self.max_size = max_size
+        self._label_index = {label: i for i, label in enumerate(self.labels)}
+        self._split_index = {
+            self._label_index[label]: len(self.labels) + i
+            for i, label in enumerate(split)
+        }
+        self._start_pattern = re.compile(
+            b"(" + b"|".join(re.escape(label) for label in self.labels) + rb")[ \t]*\{"
+        )
+        self.reset()
+
+    def reset(self):
+        self.buffer = bytearray()
+        # scan position in the buffer; between objects this is always
+        # the start of a line
+        self.pos = 0
+        # start of the current object, or -1 if between objects
+        self.start = -1
+        self.current = -1
+        self.depth = 0
+        self.in_string = False
+        # start of the current element of a split object, or -1
+        self.element = -1
+
+    def _view(self, start: int, end: int) -> memoryview:
+        # slice a view whose parent is released straight away, so the
+        # buffer can be resized once the slice is released
+        with memoryview(self.buffer) as view:
+            return view[start:end]
+
+    def feed(self, chunk: bytes) -> Generator[tuple[int, memoryview], None, None]:
+        """Add a chunk of output and yield the label index and contents
+        of every object it completes
+
+        The yielded memoryview refers to the internal buffer, so it is
+        only valid until the generator is resumed
+        """
+        buf = self.buffer
+        buf += chunk
+        while True:
+            if self.start == -1:
+                if not self._find_start():
+                    break
+            end = self._find_end()
+            if end == -1:
+                break
+            if self.element != -1:
+                with self._view(self.element, end) as obj:
+                    yield self._split_index[self.current], obj
+                buf[self.element : end] = b"0"
+                self.pos = self.element + 1
+                self.element = -1
+                continue
+            with self._view(self.start, end) as obj:
+                yield self.current, obj
+            self.start = -1
+            self.pos = end
+
+        # discard everything before the current scan position or the
+        # start of the current object
+        keep = self.pos if self.start == -1 else self.start
+        if keep > 0:
+            del buf[:keep]
+            self.pos -= keep
+            if self.start != -1:
+                self.start = 0
+                if self.element != -1:
+                    self.element -= keep
+        if self.max_size is not None and len(buf) > self.max_size:
+            raise OutputTooLargeError(
+                f"more than {self.max_size} bytes of output buffered"
+            )
+
+    def _find_start(self) -> bool:
+        buf = self.buffer
+        if not self.labels:
+            self.pos = len(buf)
+            return False
+        while self.pos < len(buf):
+            m = self._start_pattern.match(buf, self.pos)
+            newline = buf.find(b"\n", self.pos)
+            if m is not None:
+                self.current = self._label_index[m.group(1)]
+                self.start = m.end() - 1
+                self.pos = self.start
+                self.depth = 0
+                self.in_string = False
+                return True
+            if newline == -1:
+                # the line might still turn into a label once the rest
+                # of it arrives
+                return False
+            self.pos = newline + 1
+        return False
+
+    def _find_end(self) -> int:
+        buf = self.buffer
+        pos = self.pos
+        while True:
+            if self.in_string:
+                m = _STRING_END.search(buf, pos)
+                if m is None:
+                    break
+                if buf[m.start()] == ord("\\"):
+                    # skip the escaped character, which may not have
+                    # arrived yet
+                    pos = m.end() + 1
+                    continue
+                self.in_string = False
+            else:
+                m = _STRUCTURAL.search(buf, pos)
+                if m is None:
+                    break
+                c = buf[m.start()]
+                if c == ord('"'):
+                    self.in_string = True
+                elif c == ord("{"):
+                    self.depth += 1
+                    if self.depth == 2 and self.current in self._split_index:
+                        self.element = m.start()
+                else:
+                    self.depth -= 1
+                    if self.depth == 0 or (self.depth == 1 and self.element != -1):
+                        self.pos = m.end()
+                        return m.end()
+            pos = m.end()
+
+        self.pos = max(pos, len(buf))
+        return -1
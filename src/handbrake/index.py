@@ -0,0 +1,351 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Callable, Iterable, Union
+
+from pydantic_core import from_json
+
+from handbrake.cache import ScanCache
+from handbrake.models.title import TitleSet
+
+_MAGIC = b"HBTITLEIDX\x00\x01"
+# column data is aligned to this many bytes in saved indexes
+_ALIGN = 8
+
+# the columns of each table, mapping their names to the array typecode
+# they are stored with and a function extracting their value from the
+# JSON of a title, audio track or subtitle track. Columns with a typecode
+# of None hold strings, stored as ids into the index's string table
+_Column = tuple[str | None, Callable[[dict[str, Any]], Any]]
+
+
+def _seconds(d: dict[str, Any]) -> int:
+    return d["Hours"] * 3600 + d["Minutes"] * 60 + d["Seconds"]
+
+
+_TITLE_COLUMNS: dict[str, _Column] = {
+    "index": ("q", lambda t: t["Index"]),
+    "duration": ("q", lambda t: _seconds(t["Duration"])),
+    "width": ("q", lambda t: t["Geometry"]["Width"]),
+    "height": ("q", lambda t: t["Geometry"]["Height"]),
+    "frame_rate": ("d", lambda t: t["FrameRate"]["Num"] / t["FrameRate"]["Den"]),
+    "video_codec": (None, lambda t: t["VideoCodec"]),
+    "name": (None, lambda t: t["Name"]),
+    "playlist": ("q", lambda t: t["Playlist"]),
+    "angle_count": ("q", lambda t: t["AngleCount"]),
+    "chapter_count": ("q", lambda t: len(t["ChapterList"])),
+}
+_AUDIO_COLUMNS: dict[str, _Column] = {
+    "language_code": (None, lambda a: a["LanguageCode"]),
+    "codec_name": (None, lambda a: a["CodecName"]),
+    "channel_count": ("q", lambda a: a["ChannelCount"]),
+    "bit_rate": ("q", lambda a: a["BitRate"]),
+    "sample_rate": ("q", lambda a: a["SampleRate"]),
+    "commentary": ("b", lambda a: a["Attributes"]["Commentary"]),
+}
+_SUBTITLE_COLUMNS: dict[str, _Column] = {
+    "language_code": (None, lambda s: s["LanguageCode"]),
+    "format": (None, lambda s: s["Format"]),
+    "source_name": (None, lambda s: s["SourceName"]),
+    "forced": ("b", lambda s: s["Attributes"]["Forced"]),
+}
+
+# columns linking the tables together, present in every index
+_LINKS: dict[str, dict[str, str]] = {
+    "titles": {"disc": "q"},
+    "audio": {"title": "q"},
+    "subtitles": {"title": "q"},
+}
+_COLUMNS = {
+    "titles": _TITLE_COLUMNS,
+    "audio": _AUDIO_COLUMNS,
+    "subtitles": _SUBTITLE_COLUMNS,
+}
+
+Condition = Any
+Column = Union["array[Any]", memoryview]
+
+
+class TitleIndex:
+    """
+    A compact, queryable index of the titles of many scanned discs
+
+    The fields of every title, audio track and subtitle track are stored
+    in columns backed by `array.array` (or, for an index opened with
+    `load`, by a memory-mapped file), with strings interned in a shared
+    string table. Each column can be wrapped without copying, e.g. with
+    `numpy.frombuffer`, for heavier analysis.
+
+    Titles are identified by their row number in the index. The columns
+    of the title table are `disc` (the name the title set was added
+    with) and those listed in `TitleIndex.COLUMNS["titles"]`; audio and
+    subtitle tracks additionally have a `title` column holding the row
+    of the title they belong to.
+    """
+
+    COLUMNS = {table: list(columns) for table, columns in _COLUMNS.items()}
+
+    def __init__(self):
+        self._mmap: mmap.mmap | None = None
+        self._clear()
+
+    def _clear(self):
+        self.strings: list[str] = []
+        self._string_ids: dict[str, int] = {}
+        self._tables: dict[str, dict[str, Column]] = {}
+        for table, columns in _COLUMNS.items():
+            self._tables[table] = {
+                name: array(typecode) for name, typecode in _LINKS[table].items()
+            }
+            for name, (typecode, _) in columns.items():
+                self._tables[table][name] = array(typecode or "q")
+
+    def __len__(self) -> int:
+        return len(self._tables["titles"]["disc"])
+
+    def _intern(self, s: str) -> int:
+        id = self._string_ids.get(s)
+        if id is None:
+            id = self._string_ids[s] = len(self.strings)
+            self.strings.append(s)
+        return id
+
+    def _writable(self):
+        # copy the columns of a loaded index out of the file before
+        # adding to them
+        if self._mmap is None:
+            return
+        for table in self._tables.values():
+            for name, column in table.items():
+                assert isinstance(column, memoryview)
+                table[name] = array(column.format, column)
+                column.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def _append(self, table: str, data: dict[str, Any], **links: int):
+        columns = self._tables[table]
+        for name, value in links.items():
+            columns[name].append(value)  # type: ignore[union-attr]
+        for name, (typecode, get) in _COLUMNS[table].items():
+            value = get(data)
+            if typecode is None:
+                value = self._intern(value)
+            columns[name].append(value)  # type: ignore[union-attr]
+
+    def add(self, disc: str, titles: Iterable[dict[str, Any]]):
+        """Add titles in the form of their decoded JSON
+
+        :param disc: the name to store the titles under, e.g. the path
+        of the scanned input
+        :param titles: the decoded JSON of each title
+        """
+        self._writable()
+        disc_id = self._intern(disc)
+        for t in titles:
+            row = len(self)
+            self._append("titles", t, disc=disc_id)
+            for a in t["AudioList"]:
+                self._append("audio", a, title=row)
+            for s in t["SubtitleList"]:
+                self._append("subtitles", s, title=row)
+
+    def add_title_set(self, disc: str, title_set: TitleSet):
+        """Add the titles of a scan result
+
+        :param disc: the name to store the titles under
+        :param title_set: the scan result
+        """
+        self.add(disc, title_set.model_dump(by_alias=True)["TitleList"])
+
+    def add_json(self, disc: str, data: bytes | str):
+        """Add the titles of a scan result from its JSON, without building
+        the models
+
+        :param disc: the name to store the titles under
+        :param data: the JSON of the scan result, e.g. as stored in a
+        `ScanCache`
+        """
+        self.add(disc, from_json(data)["TitleList"])
+
+    def add_cache(self, cache: ScanCache):
+        """Add every scan result stored in a scan cache, under the path of
+        its input
+
+        :param cache: the scan cache
+        """
+        for path, data in cache.iter_json():
+            self.add_json(path, data)
+
+    def column(self, name: str, table: str = "titles") -> Column:
+        """Return a column of one of the tables"""
+        return self._tables[table][name]
+
+    def value(self, row: int, name: str, table: str = "titles") -> Any:
+        """Return the value of a column in a row, resolving strings"""
+        value = self._tables[table][name][row]
+        if self._is_string(table, name):
+            return self.strings[value]
+        if _column_typecode(table, name) == "b":
+            return bool(value)
+        return value
+
+    def row(self, row: int, table: str = "titles") -> dict[str, Any]:
+        """Return every column of a row, resolving strings"""
+        return {name: self.value(row, name, table) for name in self._tables[table]}
+
+    def _is_string(self, table: str, name: str) -> bool:
+        return name == "disc" or (
+            name in _COLUMNS[table] and _COLUMNS[table][name][0] is None
+        )
+
+    def _match(
+        self, table: str, rows: Iterable[int], conditions: dict[str, Condition]
+    ) -> list[int]:
+        matched = list(rows)
+        for name, condition in conditions.items():
+            column = self._tables[table][name]
+            if self._is_string(table, name):
+                id = self._string_ids.get(condition)
+                matched = [] if id is None else [i for i in matched if column[i] == id]
+            elif isinstance(condition, tuple):
+                low, high = condition
+                if low is None:
+                    matched = [i for i in matched if column[i] <= high]
+                elif high is None:
+                    matched = [i for i in matched if low <= column[i]]
+                else:
+                    matched = [i for i in matched if low <= column[i] <= high]
+            else:
+                matched = [i for i in matched if column[i] == condition]
+        return matched
+
+    def query(
+        self,
+        rows: Iterable[int] | None = None,
+        audio: dict[str, Condition] | None = None,
+        subtitle: dict[str, Condition] | None = None,
+        **conditions: Condition,
+    ) -> list[int]:
+        """Find the titles matching every condition
+
+        Each condition is on a column of the title table, and is either a
+        value the column must equal or an inclusive `(low, high)` range in
+        which either bound may be None. `audio` and `subtitle` select
+        titles with at least one track matching every condition given for
+        that table, e.g. to find titles between 40 and 60 minutes long
+        with an English AC3 track:
+
+            index.query(
+                duration=(40 * 60, 60 * 60),
+                audio={"language_code": "eng", "codec_name": "AC3"},
+            )
+
+        :param rows: if provided, only these titles are considered, e.g.
+        to refine the result of another query
+        :returns: the rows of the matching titles in ascending order
+        """
+        if rows is None:
+            rows = range(len(self))
+        matched = self._match("titles", rows, conditions)
+        for table, track_conditions in (("audio", audio), ("subtitles", subtitle)):
+            if track_conditions is None:
+                continue
+            column = self._tables[table]["title"]
+            tracks = self._match(table, range(len(column)), track_conditions)
+            titles = {column[i] for i in tracks}
+            matched = [i for i in matched if i in titles]
+        return matched
+
+    def longest(self, rows: Iterable[int] | None = None) -> int | None:
+        """Return the row of the longest title, optionally out of the given
+        rows, or None if there are no titles"""
+        duration = self._tables["titles"]["duration"]
+        if rows is None:
+            rows = range(len(self))
+        return max(rows, key=duration.__getitem__, default=None)
+
+    def save(self, path: str | os.PathLike):
+        """Save the index to a file which can be opened with `load`"""
+        columns: list[tuple[str, str, Column]] = [
+            (table, name, column)
+            for table, table_columns in self._tables.items()
+            for name, column in table_columns.items()
+        ]
+        header: dict[str, Any] = {
+            "byteorder": sys.byteorder,
+            "strings": self.strings,
+            "columns": [],
+        }
+        offset = 0
+        for table, name, column in columns:
+            data = memoryview(column)
+            header["columns"].append([table, name, data.format, len(column), offset])
+            offset += _aligned(data.nbytes)
+        encoded = json.dumps(header).encode()
+        start = _aligned(len(_MAGIC) + 8 + len(encoded))
+        with open(path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<Q", len(encoded)))
+            f.write(encoded)
+            f.write(b"\0" * (start - f.tell()))
+            for _, _, column in columns:
+                data = memoryview(column).cast("B")
+                f.write(data)
+                f.write(b"\0" * (_aligned(len(data)) - len(data)))
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> "TitleIndex":
+        """Open an index saved with `save`. The columns are memory-mapped
+        from the file rather than read into memory, and are copied out
+        only if titles are added to the index"""
+        index = cls()
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("not a title index")
+            (length,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(length))
+            if header["byteorder"] != sys.byteorder:
+                raise ValueError("title index was saved with a different byte order")
+            start = _aligned(len(_MAGIC) + 8 + length)
+            index._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index.strings = header["strings"]
+        index._string_ids = {s: i for i, s in enumerate(index.strings)}
+        with memoryview(index._mmap) as view:
+            for table, name, typecode, length, offset in header["columns"]:
+                itemsize = array(typecode).itemsize
+                data = view[start + offset : start + offset + length * itemsize]
+                index._tables[table][name] = data.cast(typecode)
+        return index
+
+    def close(self):
+        """Release the file backing a loaded index, after which the index
+        is empty"""
+        if self._mmap is None:
+            return
+        for table in self._tables.values():
+            for column in table.values():
+                if isinstance(column, memoryview):
+                    column.release()
+        self._mmap.close()
+        self._mmap = None
+        self._clear()
+
+    def __enter__(self) -> "TitleIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _aligned(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _column_typecode(table: str, name: str) -> str | None:
+    if name in _LINKS[table]:
+        return _LINKS[table][name]
+    return _COLUMNS[table][name][0]
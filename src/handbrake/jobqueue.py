@@ -0,0 +1,493 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Literal, Sequence
+
+from handbrake import HandBrake
+from handbrake.canceller import Canceller
+from handbrake.errors import CancelledError
+from handbrake.models.common import Offset
+from handbrake.opts import ConvertOpts
+
+JobState = Literal["queued", "running", "done", "failed"]
+
+
+@dataclass
+class Job:
+    id: int
+    input: str
+    output: str
+    title: int | Literal["main"]
+    opts: ConvertOpts
+    priority: int
+    state: JobState
+    attempts: int
+    max_attempts: int
+    worker: str | None
+    lease_expires: float | None
+    error: str | None
+
+
+def _dump_opts(opts: ConvertOpts | None) -> str:
+    data: dict[str, Any] = dict(opts or {})
+    for key, value in data.items():
+        if isinstance(value, Offset):
+            value = value.model_dump()
+        elif isinstance(value, (tuple, str, int)):
+            pass
+        else:
+            # iterables of tracks or preset files
+            value = [v if isinstance(v, int) else str(v) for v in value]
+        data[key] = value
+    return json.dumps(data)
+
+
+def _load_opts(data: str) -> ConvertOpts:
+    opts: dict[str, Any] = json.loads(data)
+    for key in ("start_at", "stop_at"):
+        if key in opts:
+            opts[key] = Offset.model_validate(opts[key])
+    for key in ("chapters", "previews"):
+        if isinstance(opts.get(key), list):
+            opts[key] = tuple(opts[key])
+    return ConvertOpts(**opts)  # type: ignore[typeddict-item]
+
+
+class JobQueue:
+    """
+    A persistent queue of convert jobs, stored in an SQLite database which
+    can be shared by worker processes
+
+    A worker leases a job for `lease_duration` seconds and must renew the
+    lease with `heartbeat` while it works on it. Jobs whose lease expires,
+    because their worker crashed or the machine rebooted, are returned to
+    the queue, until they have been attempted `max_attempts` times. Jobs
+    are taken in order of descending priority, then in the order they
+    were enqueued
+    """
+
+    def __init__(self, path: str | os.PathLike, lease_duration: float = 60.0):
+        """Open (creating if needed) a job queue
+
+        :param path: the path of the database file
+        :param lease_duration: the number of seconds a worker may hold a
+        job without renewing its lease
+        """
+        self.path = path
+        self.lease_duration = lease_duration
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._db.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                input TEXT NOT NULL,
+                output TEXT NOT NULL,
+                title TEXT NOT NULL,
+                opts TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                worker TEXT,
+                lease_expires REAL,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS jobs_next ON jobs (state, priority, id);
+            """
+        )
+
+    def _job(self, row: Sequence[Any]) -> Job:
+        title = json.loads(row[3])
+        return Job(row[0], row[1], row[2], title, _load_opts(row[4]), *row[5:])
+
+    def enqueue(
+        self,
+        input: str | os.PathLike,
+        output: str | os.PathLike,
+        title: int | Literal["main"],
+        opts: ConvertOpts | None = None,
+        priority: int = 0,
+        max_attempts: int = 3,
+    ) -> int:
+        """Add a convert job to the queue
+
+        :param input: the input source
+        :param output: the path to write the converted file to
+        :param title: the title to convert, see `HandBrake.convert_title`
+        :param opts: conversion options
+        :param priority: jobs with a higher priority are taken first
+        :param max_attempts: the number of times the job is attempted
+        before it is marked as failed
+        :returns: the id of the job
+        """
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (input, output, title, opts, priority, state, "
+                "max_attempts) VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (
+                    os.fspath(input),
+                    os.fspath(output),
+                    json.dumps(title),
+                    _dump_opts(opts),
+                    priority,
+                    max_attempts,
+                ),
+            )
+        assert cursor.lastrowid is not None
+        return cursor.lastrowid
+
+    def _expire(self, now: float):
+        # return jobs whose lease has run out to the queue, or fail them
+        # if they have no attempts left
+        self._db.execute(
+            "UPDATE jobs SET state = CASE WHEN attempts < max_attempts "
+            "THEN 'queued' ELSE 'failed' END, worker = NULL, "
+            "lease_expires = NULL, error = 'lease expired' "
+            "WHERE state = 'running' AND lease_expires < ?",
+            (now,),
+        )
+
+    def lease(self, worker: str) -> Job | None:
+        """Take the next job from the queue, or return None if the queue
+        is empty
+
+        :param worker: an identifier of the worker taking the job
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._expire(now)
+                row = self._db.execute(
+                    "SELECT id FROM jobs WHERE state = 'queued' "
+                    "ORDER BY priority DESC, id LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET state = 'running', worker = ?, "
+                        "lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                        (worker, now + self.lease_duration, row[0]),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return None if row is None else self.get(row[0])
+
+    def heartbeat(self, id: int, worker: str) -> bool:
+        """Renew the lease on a job, returning False if the worker no
+        longer holds it"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_expires = ? "
+                "WHERE id = ? AND worker = ? AND state = 'running'",
+                (time.time() + self.lease_duration, id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, id: int, worker: str) -> bool:
+        """Mark a leased job as done, returning False if the worker no
+        longer holds it"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = 'done', lease_expires = NULL, error = NULL "
+                "WHERE id = ? AND worker = ? AND state = 'running'",
+                (id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, id: int, worker: str, error: str) -> bool:
+        """Record that a leased job failed, returning it to the queue if
+        it has attempts left. Returns False if the worker no longer holds
+        the job"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = CASE WHEN attempts < max_attempts "
+                "THEN 'queued' ELSE 'failed' END, worker = NULL, "
+                "lease_expires = NULL, error = ? "
+                "WHERE id = ? AND worker = ? AND state = 'running'",
+                (error, id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def release(self, id: int, worker: str) -> bool:
+        """Return a leased job to the queue without using up an attempt,
+        e.g. because its worker was stopped. Returns False if the worker no
+        longer holds the job"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = 'queued', attempts = attempts - 1, "
+                "worker = NULL, lease_expires = NULL "
+                "WHERE id = ? AND worker = ? AND state = 'running'",
+                (id, worker),
+            )
+        return cursor.rowcount == 1
+
+    def retry(self, id: int) -> bool:
+        """Return a failed job to the queue with a fresh set of attempts,
+        returning False if the job has not failed"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET state = 'queued', attempts = 0 "
+                "WHERE id = ? AND state = 'failed'",
+                (id,),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, id: int) -> Job | None:
+        """Return the job with the given id, if any"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (id,)).fetchone()
+        return None if row is None else self._job(row)
+
+    def jobs(self, state: JobState | None = None) -> list[Job]:
+        """Return every job, or every job in the given state, in the order
+        they would be taken from the queue"""
+        query = "SELECT * FROM jobs"
+        params: tuple[Any, ...] = ()
+        if state is not None:
+            query += " WHERE state = ?"
+            params = (state,)
+        with self._lock:
+            rows = self._db.execute(
+                query + " ORDER BY priority DESC, id", params
+            ).fetchall()
+        return [self._job(row) for row in rows]
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of jobs in each state"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+            ).fetchall()
+        counts = {state: 0 for state in ("queued", "running", "done", "failed")}
+        counts.update(rows)
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def work(
+    queue: JobQueue,
+    handbrake: HandBrake,
+    worker: str | None = None,
+    poll_interval: float = 1.0,
+    stop: Canceller | None = None,
+    exit_when_empty: bool = False,
+):
+    """Take jobs from the queue and convert them until stopped
+
+    :param queue: the job queue
+    :param handbrake: the `HandBrake` instance used to convert jobs
+    :param worker: an identifier of the worker, by default made from the
+    host name and process id
+    :param poll_interval: the number of seconds to wait before checking
+    an empty queue again
+    :param stop: a parameter that stops the worker, cancelling the job it
+    is working on and returning it to the queue
+    :param exit_when_empty: if set, return once the queue is empty rather
+    than waiting for more jobs
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or Canceller()
+    while not stop.is_cancelled():
+        job = queue.lease(worker)
+        if job is None:
+            if exit_when_empty or stop.wait(poll_interval):
+                return
+            continue
+
+        # renew the lease while converting, stopping the conversion if
+        # the lease is lost
+        cancel = Canceller()
+        stop.add_callback(cancel.cancel)
+        done = threading.Event()
+
+        def heartbeat(id: int = job.id, worker: str = worker):
+            while not done.wait(queue.lease_duration / 3):
+                if not queue.heartbeat(id, worker):
+                    cancel.cancel()
+                    return
+
+        beat = threading.Thread(target=heartbeat, daemon=True)
+        beat.start()
+        try:
+            handbrake.convert_title(
+                job.input, job.output, job.title, job.opts, cancel=cancel
+            )
+        except CancelledError as e:
+            if stop.is_cancelled():
+                queue.release(job.id, worker)
+            else:
+                queue.fail(job.id, worker, f"{type(e).__name__}: {e}")
+        except Exception as e:
+            queue.fail(job.id, worker, f"{type(e).__name__}: {e}")
+        else:
+            queue.complete(job.id, worker)
+        finally:
+            done.set()
+            beat.join()
+            stop.remove_callback(cancel.cancel)
+
+
+def _work_process(
+    path: str | os.PathLike,
+    executable: str | None,
+    lease_duration: float,
+    poll_interval: float,
+    exit_when_empty: bool,
+):
+    # stop on SIGTERM so the current job is released and HandBrakeCLI
+    # terminated. The canceller is set from another thread as the handler
+    # may interrupt the main thread while it holds the canceller's lock
+    stop = Canceller()
+    signal.signal(
+        signal.SIGTERM,
+        lambda signum, frame: threading.Thread(target=stop.cancel).start(),
+    )
+    with JobQueue(path, lease_duration) as queue:
+        work(
+            queue,
+            HandBrake(executable),
+            poll_interval=poll_interval,
+            stop=stop,
+            exit_when_empty=exit_when_empty,
+        )
+
+
+def run_workers(
+    path: str | os.PathLike,
+    processes: int,
+    executable: str | None = None,
+    lease_duration: float = 60.0,
+    poll_interval: float = 1.0,
+    exit_when_empty: bool = False,
+):
+    """Run worker processes taking jobs from a queue, returning once they
+    have all exited
+
+    :param path: the path of the job queue database
+    :param processes: the number of worker processes to run
+    :param executable: the HandBrakeCLI executable, see `HandBrake`
+    :param lease_duration: the number of seconds a worker may hold a job
+    without renewing its lease
+    :param poll_interval: the number of seconds to wait before checking
+    an empty queue again
+    :param exit_when_empty: if set, each worker exits once the queue is
+    empty rather than waiting for more jobs
+    """
+    workers = [
+        multiprocessing.Process(
+            target=_work_process,
+            args=(path, executable, lease_duration, poll_interval, exit_when_empty),
+        )
+        for _ in range(processes)
+    ]
+    for w in workers:
+        w.start()
+    try:
+        for w in workers:
+            w.join()
+    finally:
+        # workers return the jobs they hold to the queue when terminated
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+                w.join()
+
+
+def main(argv: Sequence[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m handbrake.jobqueue",
+        description="Manage a persistent queue of HandBrake convert jobs",
+    )
+    parser.add_argument("database", help="path of the job queue database")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="add a convert job")
+    enqueue.add_argument("input")
+    enqueue.add_argument("output")
+    enqueue.add_argument("-t", "--title", default="main", help="title index or main")
+    enqueue.add_argument("-Z", "--preset")
+    enqueue.add_argument("--preset-import-file", action="append", dest="preset_files")
+    enqueue.add_argument("-p", "--priority", type=int, default=0)
+    enqueue.add_argument("--max-attempts", type=int, default=3)
+
+    list_ = commands.add_parser("list", help="list jobs")
+    list_.add_argument("--state", choices=["queued", "running", "done", "failed"])
+
+    retry = commands.add_parser("retry", help="requeue a failed job")
+    retry.add_argument("id", type=int)
+
+    work_ = commands.add_parser("work", help="run worker processes")
+    work_.add_argument("-j", "--processes", type=int, default=1)
+    work_.add_argument("--executable", help="path of HandBrakeCLI")
+    work_.add_argument("--lease", type=float, default=60.0)
+    work_.add_argument(
+        "--exit-when-empty", action="store_true", help="stop once the queue is empty"
+    )
+
+    args = parser.parse_args(argv)
+    if args.command == "work":
+        run_workers(
+            args.database,
+            args.processes,
+            args.executable,
+            lease_duration=args.lease,
+            exit_when_empty=args.exit_when_empty,
+        )
+        return
+
+    with JobQueue(args.database) as queue:
+        if args.command == "enqueue":
+            opts = ConvertOpts()
+            if args.preset:
+                opts["preset"] = args.preset
+            if args.preset_files:
+                opts["preset_files"] = args.preset_files
+            title: int | Literal["main"] = (
+                "main" if args.title == "main" else int(args.title)
+            )
+            id = queue.enqueue(
+                args.input,
+                args.output,
+                title,
+                opts,
+                args.priority,
+                args.max_attempts,
+            )
+            print(id)
+        elif args.command == "list":
+            for job in queue.jobs(args.state):
+                line = f"{job.id}\t{job.state}\t{job.priority}\t{job.attempts}/"
+                line += f"{job.max_attempts}\t{job.input}\t{job.output}"
+                if job.error:
+                    line += f"\t{job.error}"
+                print(line)
+        elif args.command == "retry":
+            if not queue.retry(args.id):
+                sys.exit(f"job {args.id} has not failed")
+
+
+if __name__ == "__main__":
+    main()
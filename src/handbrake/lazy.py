@@ -0,0 +1,80 @@
+from typing import Iterator, Sequence, overload
+
+from handbrake.decoding import Decoder, get_decoder
+from handbrake.framer import iter_objects
+from handbrake.models.title import Title, TitleHeader, TitleSet, TitleSetHeader
+
+
+class LazyTitleList(Sequence[Title]):
+    """
+    A list of titles which keeps the raw JSON of each title and only
+    validates it into a `Title` the first time it is accessed
+    """
+
+    def __init__(self, data: bytes, count: int, decoder: Decoder):
+        self._data = data
+        self._decoder = decoder
+        self._titles: list[Title | None] = [None] * count
+        # offsets of the titles in the data, found as far as the last
+        # title accessed
+        self._spans: list[tuple[int, int]] = []
+        self._scanner: Iterator[tuple[int, int]] = iter_objects(data, 3)
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    @overload
+    def __getitem__(self, index: int) -> Title: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Title]: ...
+
+    def __getitem__(self, index: int | slice) -> Title | list[Title]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        title = self._titles[index]
+        if title is None:
+            index = range(len(self))[index]
+            while len(self._spans) <= index:
+                span = next(self._scanner, None)
+                if span is None:
+                    raise ValueError("title list does not match its headers")
+                self._spans.append(span)
+            start, end = self._spans[index]
+            with memoryview(self._data) as view:
+                title = self._decoder(Title, view[start:end])
+            self._titles[index] = title
+        return title
+
+    def is_loaded(self, index: int) -> bool:
+        """Return whether the title at the index has been validated"""
+        return self._titles[index] is not None
+
+
+class LazyTitleSet:
+    """
+    A scan result which validates only the main feature and the index and
+    duration of each title up front, with the full details of a title
+    validated when it is first accessed through `title_list`
+    """
+
+    def __init__(self, data: bytes, decoder: str | Decoder | None = None):
+        """Create a lazy title set from the JSON of a scan result
+
+        :param data: the JSON of the title set
+        :param decoder: the decoder used to parse the title set, see
+        `handbrake.decoding`
+        """
+        decode = get_decoder(decoder)
+        with memoryview(data) as view:
+            header = decode(TitleSetHeader, view)
+        self.data = data
+        self.main_feature = header.main_feature
+        self.headers: list[TitleHeader] = header.title_list
+        self.title_list = LazyTitleList(data, len(self.headers), decode)
+
+    def to_title_set(self) -> TitleSet:
+        """Validate every title and return them as a `TitleSet`"""
+        return TitleSet(
+            main_feature=self.main_feature, title_list=list(self.title_list)
+        )
@@ -0,0 +1,234 @@
+import asyncio
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Generator
+
+from handbrake.errors import CancelledError, HandBrakeError
+from handbrake.models.progress import Progress
+from handbrake.progresshandler import ProgressHandler
+
+if TYPE_CHECKING:
+    from handbrake.jobqueue import JobQueue
+
+# upper bounds in seconds of the job duration histogram buckets
+DURATION_BUCKETS = (60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0, 14400.0)
+
+
+@dataclass
+class MetricsSnapshot:
+    jobs_started: int
+    jobs_completed: int
+    jobs_cancelled: int
+    # failures keyed by the return code of HandBrakeCLI, or None for
+    # errors other than a `HandBrakeError`
+    failures: dict[int | None, int]
+    bytes_written: int
+    # the current frame rate of each running job, keyed by output path
+    job_fps: dict[str, float]
+    # the total number of seconds spent on finished jobs, and the number
+    # of finished jobs falling into each `DURATION_BUCKETS` bucket
+    duration_sum: float
+    duration_buckets: list[int]
+
+    @property
+    def fps(self) -> float:
+        """The combined frame rate of every running job"""
+        return sum(self.job_fps.values())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metrics:
+    """
+    Record the throughput and outcome of convert jobs, for reading in
+    process with `snapshot` or exporting in the Prometheus text format
+
+    Pass an instance to `HandBrake` to record every conversion it runs,
+    or wrap conversions with `track`
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = 0
+        self._completed = 0
+        self._cancelled = 0
+        self._failures: dict[int | None, int] = {}
+        self._bytes_written = 0
+        self._fps: dict[str, float] = {}
+        self._duration_sum = 0.0
+        self._duration_buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self._queues: list["JobQueue"] = []
+
+    @contextmanager
+    def track(
+        self, output: str | os.PathLike, progress_handler: ProgressHandler | None
+    ) -> Generator[ProgressHandler, None, None]:
+        """Record a convert job for the duration of the block, yielding a
+        progress handler which records its frame rate before calling the
+        given handler
+
+        :param output: the path of the job's output, which identifies it
+        and whose size is added to the bytes written when it finishes
+        :param progress_handler: a handler to pass progress updates on to
+        """
+        job = os.fspath(output)
+
+        def handler(p: Progress):
+            if p.working is not None:
+                with self._lock:
+                    self._fps[job] = p.working.rate
+            if progress_handler is not None:
+                progress_handler(p)
+
+        with self._lock:
+            self._started += 1
+            self._fps[job] = 0.0
+        start = time.monotonic()
+        try:
+            yield handler
+        except BaseException as e:
+            with self._lock:
+                if isinstance(e, (CancelledError, asyncio.CancelledError)):
+                    self._cancelled += 1
+                else:
+                    code = e.return_code if isinstance(e, HandBrakeError) else None
+                    self._failures[code] = self._failures.get(code, 0) + 1
+            raise
+        else:
+            try:
+                size = os.path.getsize(output)
+            except OSError:
+                size = 0
+            with self._lock:
+                self._completed += 1
+                self._bytes_written += size
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self._fps.pop(job, None)
+                self._duration_sum += elapsed
+                self._duration_buckets[bisect_left(DURATION_BUCKETS, elapsed)] += 1
+
+    def watch_queue(self, queue: "JobQueue"):
+        """Include the number of jobs in each state of a job queue in the
+        exported metrics"""
+        self._queues.append(queue)
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Return the current values of the metrics"""
+        with self._lock:
+            return MetricsSnapshot(
+                jobs_started=self._started,
+                jobs_completed=self._completed,
+                jobs_cancelled=self._cancelled,
+                failures=dict(self._failures),
+                bytes_written=self._bytes_written,
+                job_fps=dict(self._fps),
+                duration_sum=self._duration_sum,
+                duration_buckets=list(self._duration_buckets),
+            )
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text exposition format"""
+        s = self.snapshot()
+        lines = [
+            "# HELP handbrake_jobs_started_total Convert jobs started.",
+            "# TYPE handbrake_jobs_started_total counter",
+            f"handbrake_jobs_started_total {s.jobs_started}",
+            "# HELP handbrake_jobs_completed_total Convert jobs completed.",
+            "# TYPE handbrake_jobs_completed_total counter",
+            f"handbrake_jobs_completed_total {s.jobs_completed}",
+            "# HELP handbrake_jobs_cancelled_total Convert jobs cancelled.",
+            "# TYPE handbrake_jobs_cancelled_total counter",
+            f"handbrake_jobs_cancelled_total {s.jobs_cancelled}",
+            "# HELP handbrake_jobs_failed_total Convert jobs failed, by return code.",
+            "# TYPE handbrake_jobs_failed_total counter",
+        ]
+        for code, count in sorted(s.failures.items(), key=lambda f: str(f[0])):
+            label = "other" if code is None else str(code)
+            lines.append(
+                f'handbrake_jobs_failed_total{{return_code="{label}"}} {count}'
+            )
+        lines += [
+            "# HELP handbrake_bytes_written_total Bytes of output written.",
+            "# TYPE handbrake_bytes_written_total counter",
+            f"handbrake_bytes_written_total {s.bytes_written}",
+            "# HELP handbrake_jobs_running Convert jobs running.",
+            "# TYPE handbrake_jobs_running gauge",
+            f"handbrake_jobs_running {len(s.job_fps)}",
+            "# HELP handbrake_fps Combined frame rate of the running jobs.",
+            "# TYPE handbrake_fps gauge",
+            f"handbrake_fps {s.fps}",
+            "# HELP handbrake_job_fps Frame rate of each running job.",
+            "# TYPE handbrake_job_fps gauge",
+        ]
+        for job, fps in sorted(s.job_fps.items()):
+            lines.append(f'handbrake_job_fps{{output="{_escape(job)}"}} {fps}')
+        lines += [
+            "# HELP handbrake_job_duration_seconds Duration of finished jobs.",
+            "# TYPE handbrake_job_duration_seconds histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(
+            [*(str(b) for b in DURATION_BUCKETS), "+Inf"], s.duration_buckets
+        ):
+            cumulative += count
+            lines.append(
+                f'handbrake_job_duration_seconds_bucket{{le="{bound}"}} {cumulative}'
+            )
+        lines += [
+            f"handbrake_job_duration_seconds_sum {s.duration_sum}",
+            f"handbrake_job_duration_seconds_count {cumulative}",
+        ]
+        if self._queues:
+            lines += [
+                "# HELP handbrake_queue_jobs Jobs in a job queue, by state.",
+                "# TYPE handbrake_queue_jobs gauge",
+            ]
+            for queue in self._queues:
+                path = _escape(os.fspath(queue.path))
+                for state, count in queue.counts().items():
+                    lines.append(
+                        f'handbrake_queue_jobs{{queue="{path}",state="{state}"}} {count}'
+                    )
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | os.PathLike):
+        """Write the metrics to a file, e.g. for the node exporter's
+        textfile collector. The file is replaced atomically"""
+        tmp = f"{os.fspath(path)}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve the metrics over HTTP from a background thread, returning
+        the server so it can be stopped with `shutdown`
+
+        :param port: the port to listen on, or 0 to pick a free port
+        :param host: the address to listen on
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
@@ -1,15 +1,18 @@
 import asyncio
 import json
+import math
 import os
 from dataclasses import dataclass
 from datetime import timedelta
 from io import TextIOBase
 from os import PathLike
-from time import sleep
+from time import monotonic, sleep
 from typing import Iterable, Literal
 
 from handbrake import HandBrake
 from handbrake.canceller import Canceller
+from handbrake.lazy import LazyTitleSet
+from handbrake.models.capabilities import Capabilities
 from handbrake.models.common import Duration, Fraction
 from handbrake.models.preset import Preset, PresetGroup
 from handbrake.models.progress import (
@@ -18,10 +21,19 @@ from handbrake.models.progress import (
     ProgressWorkDone,
     ProgressWorking,
 )
-from handbrake.models.title import Color, Geometry, Title, TitleSet
+from handbrake.models.title import (
+    Chapter,
+    Color,
+    Geometry,
+    Title,
+    TitleSet,
+    TitleSetSummary,
+)
 from handbrake.models.version import Version, VersionIdentifier
 from handbrake.opts import ConvertOpts
 from handbrake.progresshandler import ProgressHandler
+from handbrake.resources import Resources
+from handbrake.streaming import AsyncTitleIterator, TitleIterator
 
 
 class DictJSONEncoder(json.JSONEncoder):
@@ -29,16 +41,50 @@ class DictJSONEncoder(json.JSONEncoder):
         return o.__dict__
 
 
+def coalesce_progress(
+    progress_handler: ProgressHandler | None, interval: float | None
+) -> ProgressHandler | None:
+    """Wrap a progress handler so it is called at most once per interval,
+    mirroring the coalescing done by the real command runners"""
+    if progress_handler is None or interval is None:
+        return progress_handler
+    last = -math.inf
+
+    def handler(p: Progress):
+        nonlocal last
+        now = monotonic()
+        if now - last >= interval or p.state == "WORKDONE":
+            last = now
+            progress_handler(p)
+
+    return handler
+
+
 @dataclass
 class MockTitle:
     index: int
     runtime: timedelta
 
+    def get_chapters(self) -> list[Chapter]:
+        # a chapter for every minute of the runtime
+        chapters: list[Chapter] = []
+        remaining = self.runtime
+        while remaining > timedelta(0):
+            duration = min(remaining, timedelta(minutes=1))
+            chapters.append(
+                Chapter(
+                    duration=Duration.from_timedelta(duration),
+                    name=f"Chapter {len(chapters) + 1}",
+                )
+            )
+            remaining -= duration
+        return chapters
+
     def get_title(self) -> Title:
         return Title(
             angle_count=1,
             audio_list=[],
-            chapter_list=[],
+            chapter_list=self.get_chapters(),
             color=Color(
                 bit_depth=-1,
                 chroma_location=-1,
@@ -81,12 +127,16 @@ class MockHandBrake(HandBrake):
             for i, m in enumerate(title_runtime_minutes, 1)
         ]
         self.touch = touch
+        self.last_stderr = b""
         self.main_title = max(
             range(len(self.titles)),
             key=lambda i: self.titles[i].runtime,
         )
 
-    def version(self) -> Version:
+    def version(
+        self, cancel: Canceller | None = None, timeout: float | None = None
+    ) -> Version:
+        _ = cancel, timeout
         return Version(
             arch="Python",
             name="HandBrake (mock)",
@@ -113,6 +163,16 @@ class MockHandBrake(HandBrake):
             version_string="0.0.0",
         )
 
+    def capabilities(
+        self, cancel: Canceller | None = None, timeout: float | None = None
+    ) -> Capabilities:
+        _ = cancel, timeout
+        return Capabilities(video_encoders=[], audio_encoders=[], options=[])
+
+    async def capabilities_async(self, cancel: Canceller | None = None) -> Capabilities:
+        _ = cancel
+        return Capabilities(video_encoders=[], audio_encoders=[], options=[])
+
     def convert_title(
         self,
         input: str | os.PathLike,
@@ -120,7 +180,13 @@ class MockHandBrake(HandBrake):
         title: int | Literal["main"],
         opts: ConvertOpts | None = None,
         progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+        resources: Resources | None = None,
     ):
+        _ = timeout, resources
+        progress_handler = coalesce_progress(progress_handler, progress_interval)
         if title == "main":
             t = self.titles[self.main_title]
         else:
@@ -136,6 +202,8 @@ class MockHandBrake(HandBrake):
                 json.dump(d, f)
         for i in range(total):
             sleep(self.convert_factor)
+            if cancel and cancel.is_cancelled():
+                return
             if progress_handler is not None:
                 pw = ProgressWorking(
                     ETASeconds=int(self.convert_factor * (total - i)),
@@ -163,8 +231,12 @@ class MockHandBrake(HandBrake):
         title: int | Literal["main"],
         opts: ConvertOpts | None = None,
         progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
         cancel: Canceller | None = None,
+        resources: Resources | None = None,
     ):
+        _ = resources
+        progress_handler = coalesce_progress(progress_handler, progress_interval)
         if title == "main":
             t = self.titles[self.main_title]
         else:
@@ -207,8 +279,13 @@ class MockHandBrake(HandBrake):
         input: str | PathLike,
         title: int | Literal["main", "all"],
         progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+        resources: Resources | None = None,
     ) -> TitleSet:
-        _ = input
+        _ = input, timeout, resources
+        progress_handler = coalesce_progress(progress_handler, progress_interval)
         if title == 0 or title == "all":
             main_feature = self.main_title + 1
             titles = [t for t in self.titles]
@@ -225,6 +302,8 @@ class MockHandBrake(HandBrake):
             total = int(t.runtime.total_seconds())
             for p in range(total):
                 sleep(self.scan_factor)
+                if cancel and cancel.is_cancelled():
+                    return TitleSet(main_feature=0, title_list=[])
                 if progress_handler is not None:
                     ps = ProgressScanning(
                         preview=0,
@@ -247,9 +326,12 @@ class MockHandBrake(HandBrake):
         input: str | PathLike,
         title: int | Literal["main", "all"],
         progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
         cancel: Canceller | None = None,
+        resources: Resources | None = None,
     ) -> TitleSet:
-        _ = input
+        _ = input, resources
+        progress_handler = coalesce_progress(progress_handler, progress_interval)
         if title == 0 or title == "all":
             main_feature = self.main_title + 1
             titles = [t for t in self.titles]
@@ -285,11 +367,96 @@ class MockHandBrake(HandBrake):
             title_list=[t.get_title() for t in titles],
         )
 
-    def get_preset(self, name: str) -> Preset:
-        _ = name
+    def scan_titles_lazy(
+        self,
+        input: str | PathLike,
+        title: int | Literal["main", "all"],
+        progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+    ) -> LazyTitleSet:
+        title_set = self.scan_titles(
+            input, title, progress_handler, progress_interval, cancel, timeout
+        )
+        return LazyTitleSet(title_set.model_dump_json(by_alias=True).encode())
+
+    async def scan_titles_lazy_async(
+        self,
+        input: str | PathLike,
+        title: int | Literal["main", "all"],
+        progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+    ) -> LazyTitleSet:
+        title_set = await self.scan_titles_async(
+            input, title, progress_handler, progress_interval, cancel
+        )
+        return LazyTitleSet(title_set.model_dump_json(by_alias=True).encode())
+
+    def iter_titles(
+        self,
+        input: str | PathLike,
+        title: int | Literal["main", "all"],
+        progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+        max_buffer: int | None = 64 * 1024 * 1024,
+    ) -> TitleIterator:
+        _ = max_buffer
+        title_set = self.scan_titles(
+            input, title, progress_handler, progress_interval, cancel, timeout
+        )
+        summary = TitleSetSummary(main_feature=title_set.main_feature)
+        return TitleIterator(o for o in [*title_set.title_list, summary])
+
+    def iter_titles_async(
+        self,
+        input: str | PathLike,
+        title: int | Literal["main", "all"],
+        progress_handler: ProgressHandler | None = None,
+        progress_interval: float | None = None,
+        cancel: Canceller | None = None,
+        max_buffer: int | None = 64 * 1024 * 1024,
+    ) -> AsyncTitleIterator:
+        _ = max_buffer
+
+        async def objects():
+            title_set = await self.scan_titles_async(
+                input, title, progress_handler, progress_interval, cancel
+            )
+            for t in title_set.title_list:
+                yield t
+            yield TitleSetSummary(main_feature=title_set.main_feature)
+
+        return AsyncTitleIterator(objects())
+
+    def get_preset(
+        self,
+        name: str,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+    ) -> Preset:
+        _ = name, cancel, timeout
+        return Preset(version_major=0, version_minor=0, version_micro=0, preset_list=[])
+
+    async def get_preset_async(
+        self, name: str, cancel: Canceller | None = None
+    ) -> Preset:
+        _ = name, cancel
         return Preset(version_major=0, version_minor=0, version_micro=0, preset_list=[])
 
-    def list_presets(self) -> list[PresetGroup]:
+    def list_presets(
+        self, cancel: Canceller | None = None, timeout: float | None = None
+    ) -> list[PresetGroup]:
+        _ = cancel, timeout
+        return []
+
+    async def list_presets_async(
+        self, cancel: Canceller | None = None
+    ) -> list[PresetGroup]:
+        _ = cancel
         return []
 
     def load_preset_from_file(self, file: str | PathLike | TextIOBase) -> Preset:
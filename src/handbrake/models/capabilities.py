@@ -0,0 +1,12 @@
+from handbrake.models.common import HandBrakeModel
+
+
+class Capabilities(HandBrakeModel):
+    video_encoders: list[str]
+    audio_encoders: list[str]
+    options: list[str]
+
+    def supports_option(self, option: str) -> bool:
+        """Whether HandBrakeCLI accepts the given long option, e.g.
+        `--preset-export`"""
+        return option in self.options
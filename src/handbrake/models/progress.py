@@ -1,7 +1,23 @@
+import json
+from typing import Any
+
 from pydantic import Field
 
 from handbrake.models.common import HandBrakeModel
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+def _loads(data: bytes | bytearray | memoryview) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
 
 class ProgressScanning(HandBrakeModel):
     preview: int
@@ -57,3 +73,58 @@ class Progress(HandBrakeModel):
         elif self.state == "WORKDONE":
             return "done"
         return ""
+
+
+class FastProgress:
+    """
+    A lightweight progress update holding only the most commonly read
+    fields, decoded straight from the JSON without pydantic validation.
+    The JSON is parsed with orjson when it is installed, e.g. through the
+    `fast` extra. The full `Progress` model can be obtained with `to_model`
+    """
+
+    __slots__ = ("state", "percent", "rate_avg", "eta_seconds", "_data", "_model")
+
+    def __init__(
+        self,
+        state: str,
+        percent: float,
+        rate_avg: float,
+        eta_seconds: int,
+        data: dict[str, Any],
+    ):
+        self.state = state
+        self.percent = percent
+        self.rate_avg = rate_avg
+        self.eta_seconds = eta_seconds
+        self._data = data
+        self._model: Progress | None = None
+
+    @classmethod
+    def from_json(cls, data: bytes | bytearray | memoryview) -> "FastProgress":
+        d = _loads(data)
+        rate_avg = 0.0
+        eta_seconds = 0
+        if (scanning := d.get("Scanning")) is not None:
+            percent = scanning["Progress"] * 100
+        elif (working := d.get("Working")) is not None:
+            percent = working["Progress"] * 100
+            rate_avg = working["RateAvg"]
+            eta_seconds = working["ETASeconds"]
+        elif d.get("WorkDone") is not None:
+            percent = 100
+        else:
+            percent = 0
+        return cls(d["State"], percent, rate_avg, eta_seconds, d)
+
+    def to_model(self) -> Progress:
+        """Validate the full progress update, caching the result"""
+        if self._model is None:
+            self._model = Progress.model_validate(self._data)
+        return self._model
+
+    def __repr__(self) -> str:
+        return (
+            f"FastProgress(state={self.state!r}, percent={self.percent!r}, "
+            f"rate_avg={self.rate_avg!r}, eta_seconds={self.eta_seconds!r})"
+        )
@@ -101,3 +101,17 @@ class Title(HandBrakeModel):
 class TitleSet(HandBrakeModel):
     main_feature: int
     title_list: list[Title]
+
+
+class TitleHeader(HandBrakeModel):
+    duration: Duration
+    index: int
+
+
+class TitleSetHeader(HandBrakeModel):
+    main_feature: int
+    title_list: list[TitleHeader]
+
+
+class TitleSetSummary(HandBrakeModel):
+    main_feature: int
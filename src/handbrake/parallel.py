@@ -0,0 +1,150 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from bisect import bisect_left
+from itertools import accumulate
+from pathlib import Path
+from typing import Callable, Sequence
+
+from handbrake.models.progress import Progress, ProgressWorkDone, ProgressWorking
+from handbrake.models.title import Chapter
+from handbrake.progresshandler import ProgressHandler
+
+Joiner = Callable[[Sequence[Path], Path], None]
+
+
+def split_chapters(chapters: Sequence[Chapter], segments: int) -> list[tuple[int, int]]:
+    """Split a title's chapters into at most `segments` contiguous ranges
+    of roughly equal duration
+
+    :param chapters: the chapters of the title
+    :param segments: the number of ranges to split the chapters into
+    :returns: the first and last chapter (counting from 1) of each range
+    """
+    n = len(chapters)
+    segments = min(segments, n)
+    if segments < 1:
+        return []
+    ends = list(accumulate(c.duration.to_timedelta().total_seconds() for c in chapters))
+    ranges: list[tuple[int, int]] = []
+    first = 0
+    for k in range(1, segments):
+        # end the range at the chapter boundary closest to the ideal cut,
+        # leaving at least one chapter for this and every later range
+        target = ends[-1] * k / segments
+        j = bisect_left(ends, target)
+        if j > 0 and (j == n or target - ends[j - 1] < ends[j] - target):
+            j -= 1
+        j = min(max(j, first), n - (segments - k) - 1)
+        ranges.append((first + 1, j + 1))
+        first = j + 1
+    ranges.append((first + 1, n))
+    return ranges
+
+
+def ffmpeg_join(parts: Sequence[Path], output: Path):
+    """Join encoded segments into one file with ffmpeg's concat demuxer,
+    copying the streams without re-encoding them"""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg is needed to join segments, or pass a joiner")
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".txt", dir=output.parent, delete=False
+    ) as f:
+        for part in parts:
+            escaped = str(part.resolve()).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        subprocess.run(
+            [
+                ffmpeg,
+                "-hide_banner",
+                "-loglevel",
+                "error",
+                "-y",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                f.name,
+                "-map",
+                "0",
+                "-c",
+                "copy",
+                str(output),
+            ],
+            check=True,
+            capture_output=True,
+        )
+    finally:
+        os.unlink(f.name)
+
+
+class ProgressMerger:
+    """
+    Combine the progress updates of concurrently encoded segments into a
+    single stream of updates for the whole title, weighting each segment
+    by its duration
+    """
+
+    def __init__(self, weights: Sequence[float], handler: ProgressHandler | None):
+        total = sum(weights) or 1
+        self.weights = [w / total for w in weights]
+        self.handler = handler
+        self._progress = [0.0] * len(weights)
+        self._working: list[ProgressWorking | None] = [None] * len(weights)
+        self._lock = threading.Lock()
+
+    def segment_handler(self, i: int) -> ProgressHandler:
+        """Return the progress handler for the i-th segment"""
+
+        def handler(p: Progress):
+            with self._lock:
+                if p.working is not None:
+                    self._progress[i] = p.working.progress
+                    self._working[i] = p.working
+                elif p.state == "WORKDONE":
+                    self._progress[i] = 1.0
+                    self._working[i] = None
+                else:
+                    return
+                if self.handler is not None:
+                    self.handler(self._merge())
+
+        return handler
+
+    def _merge(self) -> Progress:
+        working = [w for w in self._working if w is not None]
+        progress = sum(p * w for p, w in zip(self._progress, self.weights))
+        eta = max((w.eta_seconds for w in working), default=0)
+        hours, rest = divmod(eta, 3600)
+        return Progress(
+            working=ProgressWorking(
+                ETASeconds=eta,
+                hours=hours,
+                minutes=rest // 60,
+                Pass=1,
+                pass_count=1,
+                PassID=1,
+                paused=0,
+                progress=progress,
+                rate=sum(w.rate for w in working),
+                rate_avg=sum(w.rate_avg for w in working),
+                seconds=rest % 60,
+                SequenceID=0,
+            ),
+            state="WORKING",
+        )
+
+    def done(self):
+        """Deliver the final update once the segments have been joined"""
+        if self.handler is not None:
+            self.handler(
+                Progress(
+                    work_done=ProgressWorkDone(error=0, SequenceID=0),
+                    state="WORKDONE",
+                )
+            )
@@ -0,0 +1,192 @@
+import asyncio
+import os
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Generator,
+    Generic,
+    Literal,
+    TypeVar,
+)
+
+from handbrake import HandBrake
+from handbrake.canceller import Canceller
+from handbrake.errors import CancelledError
+from handbrake.models.progress import Progress
+from handbrake.models.title import TitleSet
+from handbrake.opts import ConvertOpts
+
+T = TypeVar("T")
+
+
+class PoolJob(Generic[T]):
+    """
+    A job submitted to a `HandBrakePool`. Awaiting the job returns its
+    result, and `progress` streams its progress updates
+    """
+
+    def __init__(self, progress_buffer: int):
+        self.canceller = Canceller()
+        self.future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._progress: asyncio.Queue[Progress | None] = asyncio.Queue(
+            progress_buffer + 1
+        )
+        self._task: asyncio.Task | None = None
+        # the future is handed out to awaiters, so cancelling one of them
+        # (e.g. through asyncio.wait_for) must also stop HandBrakeCLI
+        self.future.add_done_callback(self._on_done)
+
+    def __await__(self) -> Generator[Any, None, T]:
+        return self.future.__await__()
+
+    def cancel(self):
+        """Cancel the job, terminating HandBrakeCLI if it is running"""
+        self.canceller.cancel()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    async def progress(self) -> AsyncIterator[Progress]:
+        """Yield progress updates until the job finishes. If updates are
+        not consumed quickly enough the oldest are dropped"""
+        while (p := await self._progress.get()) is not None:
+            yield p
+
+    def _on_done(self, future: asyncio.Future[T]):
+        if future.cancelled():
+            self.canceller.cancel()
+
+    def _on_progress(self, p: Progress):
+        # keep one slot free for the end of stream marker
+        if self._progress.qsize() >= self._progress.maxsize - 1:
+            self._progress.get_nowait()
+        self._progress.put_nowait(p)
+
+    def _finish(self):
+        if self._progress.full():
+            self._progress.get_nowait()
+        self._progress.put_nowait(None)
+
+
+class HandBrakePool:
+    """
+    Run convert and scan jobs on a `HandBrake` instance, with at most
+    `max_concurrency` HandBrakeCLI processes running at once. Jobs must
+    be submitted from within a running event loop
+    """
+
+    def __init__(
+        self,
+        handbrake: HandBrake,
+        max_concurrency: int | None = None,
+        progress_interval: float | None = None,
+        progress_buffer: int = 64,
+    ):
+        """Create a pool
+
+        :param handbrake: the wrapper used to run jobs
+        :param max_concurrency: the maximum number of jobs to run at
+        once, defaulting to the number of CPUs
+        :param progress_interval: passed to each job to coalesce its
+        progress updates
+        :param progress_buffer: the number of unconsumed progress updates
+        kept for each job
+        """
+        self.handbrake = handbrake
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        self.progress_interval = progress_interval
+        self.progress_buffer = progress_buffer
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._jobs: set[PoolJob] = set()
+        self._closed = False
+
+    def submit_convert(
+        self,
+        input: str | os.PathLike,
+        output: str | os.PathLike,
+        title: int | Literal["main"],
+        opts: ConvertOpts | None = None,
+    ) -> PoolJob[None]:
+        """Queue a title conversion, see `HandBrake.convert_title_async`"""
+        return self._submit(
+            lambda job: self.handbrake.convert_title_async(
+                input,
+                output,
+                title,
+                opts,
+                progress_handler=job._on_progress,
+                progress_interval=self.progress_interval,
+                cancel=job.canceller,
+            )
+        )
+
+    def submit_scan(
+        self,
+        input: str | os.PathLike,
+        title: int | Literal["main", "all"],
+    ) -> PoolJob[TitleSet]:
+        """Queue a title scan, see `HandBrake.scan_titles_async`"""
+        return self._submit(
+            lambda job: self.handbrake.scan_titles_async(
+                input,
+                title,
+                progress_handler=job._on_progress,
+                progress_interval=self.progress_interval,
+                cancel=job.canceller,
+            )
+        )
+
+    def _submit(self, fn: Callable[[PoolJob[T]], Awaitable[T]]) -> PoolJob[T]:
+        if self._closed:
+            raise RuntimeError("pool has been shut down")
+        job: PoolJob[T] = PoolJob(self.progress_buffer)
+        job._task = asyncio.create_task(self._run(job, fn))
+        self._jobs.add(job)
+        return job
+
+    async def _run(self, job: PoolJob[T], fn: Callable[[PoolJob[T]], Awaitable[T]]):
+        try:
+            async with self._semaphore:
+                if job.canceller.is_cancelled():
+                    raise CancelledError
+                result = await fn(job)
+            if job.canceller.is_cancelled():
+                raise CancelledError
+            if not job.future.done():
+                job.future.set_result(result)
+        except asyncio.CancelledError:
+            job.canceller.cancel()
+            job.future.cancel()
+            raise
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        finally:
+            job._finish()
+            self._jobs.discard(job)
+
+    @property
+    def jobs(self) -> list[PoolJob]:
+        """The jobs which are queued or running"""
+        return list(self._jobs)
+
+    async def shutdown(self, cancel: bool = False):
+        """Stop accepting jobs and wait for the remaining ones to finish
+
+        :param cancel: cancel queued and running jobs instead of waiting
+        for them to complete
+        """
+        self._closed = True
+        jobs = list(self._jobs)
+        if cancel:
+            for job in jobs:
+                job.cancel()
+        await asyncio.gather(*(job._task for job in jobs if job._task is not None))
+
+    async def __aenter__(self) -> "HandBrakePool":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.shutdown(cancel=exc_type is not None)
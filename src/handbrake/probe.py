@@ -0,0 +1,75 @@
+import os
+import re
+import shutil
+import threading
+from typing import Any
+
+from handbrake.models.capabilities import Capabilities
+
+# results of probing each executable, keyed on the executable path and
+# the kind of probe, along with the fingerprint of the executable they
+# were taken from
+_lock = threading.Lock()
+_results: dict[tuple[str, str], tuple[tuple[int, int, int], Any]] = {}
+
+
+def fingerprint(executable: str) -> tuple[int, int, int] | None:
+    """Identify the file behind an executable path, so a replaced or
+    upgraded binary can be detected"""
+    path = shutil.which(executable) or executable
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def lookup(executable: str, kind: str) -> Any:
+    """Return the cached probe result for the executable, or None if
+    there is none or the executable has changed since it was taken"""
+    fp = fingerprint(executable)
+    with _lock:
+        entry = _results.get((executable, kind))
+    if fp is None or entry is None or entry[0] != fp:
+        return None
+    return entry[1]
+
+
+def store(executable: str, kind: str, result: Any):
+    if (fp := fingerprint(executable)) is None:
+        return
+    with _lock:
+        _results[(executable, kind)] = (fp, result)
+
+
+def clear():
+    """Forget every cached probe result"""
+    with _lock:
+        _results.clear()
+
+
+_OPTION = re.compile(r"^\s+(?:-\w,\s+)?(--[\w-]+)", re.MULTILINE)
+_LIST_ITEM = re.compile(r"^\s{20,}([\w:.-]+)\s*$")
+
+
+def _list_after(lines: list[str], option: str) -> list[str]:
+    for i, line in enumerate(lines):
+        if re.match(rf"^\s+(?:-\w,\s+)?{option}\s", line):
+            items: list[str] = []
+            for item in lines[i + 1 :]:
+                if (m := _LIST_ITEM.match(item)) is None:
+                    break
+                items.append(m.group(1))
+            return items
+    return []
+
+
+def parse_help(text: str) -> Capabilities:
+    """Extract the supported options and encoders from the output of
+    `HandBrakeCLI --help`"""
+    lines = text.splitlines()
+    return Capabilities(
+        video_encoders=_list_after(lines, "--encoder"),
+        audio_encoders=_list_after(lines, "--aencoder"),
+        options=sorted(set(_OPTION.findall(text))),
+    )
@@ -0,0 +1,116 @@
+import shlex
+import sys
+import threading
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Callable, TextIO
+
+# commands longer than this are truncated in reports
+_COMMAND_WIDTH = 120
+
+
+@dataclass
+class CommandProfile:
+    """
+    Where the time went while running one command, in seconds, along with
+    counters of the output read
+
+    `read` is the time spent waiting for stdout after the first chunk
+    arrived, `frame` the time spent finding objects in the output and
+    `consumer` the time the consumer of the runner (e.g. a progress
+    handler) held on to each converted object before asking for the next.
+    `convert` and `objects` are keyed by the name of the processor
+    """
+
+    command: list[str]
+    spawn: float = 0.0
+    first_byte: float | None = None
+    read: float = 0.0
+    frame: float = 0.0
+    convert: dict[str, float] = field(default_factory=dict)
+    consumer: float = 0.0
+    # from the end of stdout until the process has been reaped
+    wait: float = 0.0
+    total: float = 0.0
+    bytes: int = 0
+    chunks: int = 0
+    lines: int = 0
+    objects: dict[str, int] = field(default_factory=dict)
+    # objects dropped by a processor without being converted
+    dropped: dict[str, int] = field(default_factory=dict)
+    returncode: int | None = None
+    error: str | None = None
+
+    def __post_init__(self):
+        self._start = perf_counter()
+        self._mark = self._start
+
+    def _lap(self) -> float:
+        """Return the time since the last lap and start a new one"""
+        now = perf_counter()
+        elapsed = now - self._mark
+        self._mark = now
+        return elapsed
+
+    def _finish(self, error: BaseException | None):
+        self.total = perf_counter() - self._start
+        if error is not None:
+            self.error = type(error).__name__
+
+
+Profiler = Callable[[CommandProfile], None]
+
+
+class ProfileCollector:
+    """
+    A profiler which keeps the profile of every command run, and prints a
+    breakdown of each with `report`
+    """
+
+    def __init__(self):
+        self.profiles: list[CommandProfile] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, profile: CommandProfile):
+        with self._lock:
+            self.profiles.append(profile)
+
+    def clear(self):
+        with self._lock:
+            self.profiles = []
+
+    def report(self, file: TextIO | None = None):
+        """Print a per-command breakdown of the collected profiles
+
+        :param file: the file to print to, stderr if not provided
+        """
+        if file is None:
+            file = sys.stderr
+        with self._lock:
+            profiles = list(self.profiles)
+        for p in profiles:
+            outcome = p.error or f"exit {p.returncode}"
+            command = shlex.join(p.command)
+            if len(command) > _COMMAND_WIDTH:
+                command = command[: _COMMAND_WIDTH - 3] + "..."
+            print(f"{command}  [{outcome}]", file=file)
+            phases = [("spawn", p.spawn)]
+            if p.first_byte is not None:
+                phases.append(("first byte", p.first_byte))
+            phases += [("read", p.read), ("frame", p.frame)]
+            for name, seconds in p.convert.items():
+                phases.append((f"convert {name}", seconds))
+            phases += [("consumer", p.consumer), ("wait", p.wait)]
+            phases.append(("other", p.total - sum(s for _, s in phases)))
+            phases.append(("total", p.total))
+            for name, seconds in phases:
+                share = seconds / p.total * 100 if p.total > 0 else 0.0
+                print(f"  {name:<24} {seconds:10.6f}s {share:6.1f}%", file=file)
+            print(f"  {p.bytes} bytes in {p.chunks} chunks, {p.lines} lines", file=file)
+            for name in {**p.objects, **p.dropped}:
+                converted = p.objects.get(name, 0)
+                dropped = p.dropped.get(name, 0)
+                print(
+                    f"  {name}: {converted} objects converted, {dropped} dropped",
+                    file=file,
+                )
@@ -0,0 +1,88 @@
+import os
+import shutil
+import subprocess
+from typing import Iterable, Literal, TypedDict
+
+IONiceClass = Literal["realtime", "best-effort", "idle"]
+
+_IONICE_CLASSES = {"realtime": 1, "best-effort": 2, "idle": 3}
+# the period in microseconds used when writing a CPU quota to cpu.max
+_CPU_PERIOD = 100000
+
+
+class Resources(TypedDict, total=False):
+    """
+    Limits on the resources a HandBrakeCLI process may use, applied to
+    the process as soon as it has been spawned
+
+    `cpu_affinity` restricts the process to the given CPUs and `nice`
+    sets its scheduling priority (Linux only, and POSIX respectively).
+    `ionice` sets its I/O scheduling class and, for the realtime and
+    best-effort classes, the priority level within it from 0 (highest)
+    to 7, with the `ionice` utility on Linux. `cgroup` is the path of an
+    existing cgroup v2 directory the process is moved into; if
+    `cpu_quota` is also given, the number of CPUs the cgroup may use is
+    first written to its `cpu.max`
+    """
+
+    cpu_affinity: Iterable[int]
+    nice: int
+    ionice: IONiceClass | tuple[IONiceClass, int]
+    cgroup: str | os.PathLike
+    cpu_quota: float
+
+
+def _threads(pid: int) -> list[int]:
+    # scheduling attributes on Linux are per thread, and only threads
+    # started after a change inherit it
+    try:
+        return [int(tid) for tid in os.listdir(f"/proc/{pid}/task")]
+    except OSError:
+        return [pid]
+
+
+def apply_resources(pid: int, resources: Resources):
+    """Apply resource limits to a running process
+
+    :param pid: the id of the process
+    :param resources: the limits to apply
+    """
+    cgroup = resources.get("cgroup")
+    quota = resources.get("cpu_quota")
+    if quota is not None and cgroup is None:
+        raise ValueError("a cpu_quota requires a cgroup to apply it to")
+    if cgroup is not None:
+        if quota is not None:
+            with open(os.path.join(cgroup, "cpu.max"), "w") as f:
+                f.write(f"{int(quota * _CPU_PERIOD)} {_CPU_PERIOD}")
+        with open(os.path.join(cgroup, "cgroup.procs"), "w") as f:
+            f.write(str(pid))
+
+    if (cpus := resources.get("cpu_affinity")) is not None:
+        if not hasattr(os, "sched_setaffinity"):
+            raise OSError("CPU affinity is not supported on this platform")
+        cpus = set(cpus)
+        for tid in _threads(pid):
+            os.sched_setaffinity(tid, cpus)
+
+    if (nice := resources.get("nice")) is not None:
+        if not hasattr(os, "setpriority"):
+            raise OSError("nice is not supported on this platform")
+        for tid in _threads(pid):
+            os.setpriority(os.PRIO_PROCESS, tid, nice)
+
+    if (ionice := resources.get("ionice")) is not None:
+        executable = shutil.which("ionice")
+        if executable is None:
+            raise OSError("ionice is not available on this platform")
+        if isinstance(ionice, tuple):
+            cls, level = ionice
+            args = ["-c", str(_IONICE_CLASSES[cls]), "-n", str(level)]
+        else:
+            args = ["-c", str(_IONICE_CLASSES[ionice])]
+        subprocess.run(
+            [executable, *args, "-p", *(str(tid) for tid in _threads(pid))],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
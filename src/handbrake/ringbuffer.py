@@ -0,0 +1,40 @@
+class RingBuffer:
+    """
+    A fixed-size byte buffer which keeps only the most recently written
+    data, so memory use is constant however much is written to it
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._pos = 0
+        self._full = False
+
+    def write(self, data: bytes):
+        n = len(data)
+        if self.capacity == 0 or n == 0:
+            return
+        if n >= self.capacity:
+            self._buffer[:] = data[n - self.capacity :]
+            self._pos = 0
+            self._full = True
+            return
+        end = self._pos + n
+        if end <= self.capacity:
+            self._buffer[self._pos : end] = data
+        else:
+            split = self.capacity - self._pos
+            self._buffer[self._pos :] = data[:split]
+            self._buffer[: n - split] = data[split:]
+        if end >= self.capacity:
+            self._full = True
+        self._pos = end % self.capacity
+
+    def getvalue(self) -> bytes:
+        """Return the buffered data, oldest first"""
+        if not self._full:
+            return bytes(self._buffer[: self._pos])
+        return bytes(self._buffer[self._pos :] + self._buffer[: self._pos])
+
+    def __len__(self) -> int:
+        return self.capacity if self._full else self._pos
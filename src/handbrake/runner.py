@@ -1,74 +1,305 @@
 import asyncio
 import asyncio.subprocess as asubprocess
+import math
+import os
+import re
+import selectors
 import subprocess
-from typing import Any, AsyncGenerator, Callable, Generator, Generic, TypeVar
+import sys
+import threading
+import time
+from typing import (
+    IO,
+    Any,
+    AsyncGenerator,
+    Callable,
+    Generator,
+    Generic,
+    Literal,
+    TypeVar,
+)
+
+from pydantic import BaseModel
 
 from handbrake.canceller import Canceller
-from handbrake.errors import CancelledError, HandBrakeError
-from handbrake.models.preset import Preset
-from handbrake.models.progress import Progress
-from handbrake.models.title import TitleSet
+from handbrake.decoding import Decoder, get_decoder, pydantic_decoder
+from handbrake.errors import CancelledError, HandBrakeError, TimeoutError
+from handbrake.framer import JSONFramer
+from handbrake.lazy import LazyTitleSet
+from handbrake.models.capabilities import Capabilities
+from handbrake.models.preset import Preset, PresetGroup, PresetInfo
+from handbrake.models.progress import FastProgress, Progress
+from handbrake.models.title import Title, TitleSet, TitleSetSummary
 from handbrake.models.version import Version
+from handbrake.probe import parse_help
+from handbrake.profiling import CommandProfile, Profiler
+from handbrake.resources import Resources, apply_resources
+from handbrake.ringbuffer import RingBuffer
 
 T = TypeVar("T")
+M = TypeVar("M", bound=BaseModel)
+
+_WORKDONE = re.compile(rb'"State"\s*:\s*"WORKDONE"')
+
+# how commands are spawned: "default" closes every inherited file
+# descriptor in the child, which CPython does after a vfork on Linux;
+# "posix_spawn" leaves descriptors marked inheritable open, which lets
+# CPython use posix_spawn on platforms where it would otherwise fork,
+# e.g. macOS. posix_spawn is only used for an executable given as a path
+Spawn = Literal["default", "posix_spawn"]
+
+
+def spawn_options(spawn: Spawn) -> dict[str, Any]:
+    """The keyword arguments to `subprocess.Popen` (and
+    `asyncio.create_subprocess_exec`) selecting a spawn strategy"""
+    if spawn == "posix_spawn":
+        return {"close_fds": False}
+    return {}
+
+
+class _Waker:
+    """A pipe which lets another thread wake a selector"""
+
+    def __init__(self):
+        self.fd, self._write_fd = os.pipe()
+        os.set_blocking(self._write_fd, False)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def wake(self):
+        with self._lock:
+            if not self._closed:
+                try:
+                    os.write(self._write_fd, b"\0")
+                except BlockingIOError:
+                    pass
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            os.close(self.fd)
+            os.close(self._write_fd)
 
 
 class OutputProcessor(Generic[T]):
     """
-    Match the beginning and end of an object in command output and
+    Identify an object in command output by the label preceding it and
     convert it to a model
+
+    If an element processor is given, each object nested directly inside
+    the labelled object is passed to it as soon as it has been read,
+    rather than buffering the whole object, and the converter is given
+    what remains with each element replaced by `0`
     """
 
     def __init__(
         self,
-        start_line: tuple[bytes, bytes],
-        end_line: tuple[bytes, bytes],
-        converter: Callable[[bytes], T],
+        label: bytes,
+        converter: Callable[[memoryview], T],
+        elements: "OutputProcessor | None" = None,
     ):
-        self.start_line = start_line
-        self.end_line = end_line
+        self.label = label
         self.converter = converter
+        self.elements = elements
 
-    def match_start(self, line: bytes) -> bytes | None:
-        if line == self.start_line[0]:
-            return self.start_line[1]
-        return None
-
-    def match_end(self, line: bytes) -> bytes | None:
-        if line == self.end_line[0]:
-            return self.end_line[1]
-        return None
+    def accept(self, data: memoryview) -> bool:
+        """Whether the object should be converted, or dropped without
+        being parsed"""
+        _ = data
+        return True
 
-    def convert(self, data: bytes) -> T:
+    def convert(self, data: memoryview) -> T:
         return self.converter(data)
 
 
+def model_converter(
+    model: type[M], decoder: str | Decoder | None = None
+) -> Callable[[memoryview], M]:
+    """Create a converter which decodes the JSON of an object into a
+    model, using the default decoder if none is given"""
+    decode = get_decoder(decoder)
+
+    def convert(data: memoryview) -> M:
+        return decode(model, data)
+
+    return convert
+
+
+class ProgressProcessor(OutputProcessor[Progress | FastProgress]):
+    """
+    Convert progress updates, optionally coalescing them so at most one
+    is converted every `interval` seconds. Updates arriving in between
+    are dropped before they are parsed, except for the final WORKDONE
+    update which is always converted. If `fast` is set, updates are
+    converted to `FastProgress` rather than validated as `Progress`
+    """
+
+    def __init__(self, interval: float | None = None, fast: bool = False):
+        converter: Callable[[memoryview], Progress | FastProgress]
+        if fast:
+            converter = FastProgress.from_json
+        else:
+            converter = model_converter(Progress, pydantic_decoder)
+        super().__init__(b"Progress:", converter)
+        self.interval = interval
+        self.last = -math.inf
+
+    def accept(self, data: memoryview) -> bool:
+        if self.interval is None:
+            return True
+        now = time.monotonic()
+        if now - self.last >= self.interval or _WORKDONE.search(data):
+            self.last = now
+            return True
+        return False
+
+
 class CommandRunner:
-    def __init__(self, *processors: OutputProcessor):
-        self.processors = processors
-        self.current_processor: OutputProcessor | None = None
-        self.collect: list[bytes] = []
-
-    def process_line(self, line: bytes) -> Any:
-        if self.current_processor is None:
-            # attempt to start a processor
-            for processor in self.processors:
-                c = processor.match_start(line)
-                if c is not None:
-                    self.current_processor = processor
-                    self.collect = [c]
-                    return
+    def __init__(
+        self,
+        *processors: OutputProcessor,
+        chunk_size: int = 65536,
+        grace_period: float = 5.0,
+        stderr_limit: int = 65536,
+        max_buffer: int | None = None,
+        profiler: Profiler | None = None,
+        spawn: Spawn = "default",
+        resources: Resources | None = None,
+        stderr_handler: Callable[[bytes], None] | None = None,
+    ):
+        # objects nested in split objects are reported after the labels
+        self.processors = list(processors)
+        self.processors += [p.elements for p in processors if p.elements is not None]
+        # the names processors are reported under when profiling
+        names = [p.label.decode().rstrip(":") or "object" for p in processors]
+        self.names = names + [
+            f"{name} element"
+            for name, p in zip(names, processors)
+            if p.elements is not None
+        ]
+        self.framer = JSONFramer(
+            [p.label for p in processors],
+            split=[p.label for p in processors if p.elements is not None],
+            max_size=max_buffer,
+        )
+        self.chunk_size = chunk_size
+        self.grace_period = grace_period
+        self.stderr_limit = stderr_limit
+        # the tail of the stderr output of the last command run
+        self.stderr = RingBuffer(stderr_limit)
+        # if set, called with a profile of each command run
+        self.profiler = profiler
+        self.spawn = spawn
+        # limits applied to each process as soon as it is spawned
+        self.resources = resources
+        # if set, called with the tail of stderr once each command exits,
+        # whether or not it succeeded
+        self.stderr_handler = stderr_handler
+
+    def process_chunk(self, chunk: bytes) -> Generator[Any, None, None]:
+        """Feed a chunk of output to the framer and convert every object
+        it completes"""
+        for i, data in self.framer.feed(chunk):
+            processor = self.processors[i]
+            if processor.accept(data):
+                yield processor.convert(data)
+
+    def _process_chunk_profiled(
+        self, chunk: bytes, profile: CommandProfile
+    ) -> Generator[Any, None, None]:
+        """Counterpart to `process_chunk` which records where the time
+        goes, from the arrival of the chunk to the consumer returning
+        from each object"""
+        elapsed = profile._lap()
+        if profile.first_byte is None:
+            profile.first_byte = elapsed
         else:
-            # attempt to end the current processor
-            c = self.current_processor.match_end(line)
-            if c is not None:
-                self.collect.append(c)
-                res = self.current_processor.convert(b"\n".join(self.collect))
-                self.current_processor = None
-                self.collect = []
-                return res
-            # append line to current collect
-            self.collect.append(line)
+            profile.read += elapsed
+        profile.bytes += len(chunk)
+        profile.chunks += 1
+        profile.lines += chunk.count(b"\n")
+        for i, data in self.framer.feed(chunk):
+            profile.frame += profile._lap()
+            processor = self.processors[i]
+            name = self.names[i]
+            if processor.accept(data):
+                obj = processor.convert(data)
+                profile.convert[name] = profile.convert.get(name, 0.0) + profile._lap()
+                profile.objects[name] = profile.objects.get(name, 0) + 1
+                yield obj
+                profile.consumer += profile._lap()
+            else:
+                profile.convert[name] = profile.convert.get(name, 0.0) + profile._lap()
+                profile.dropped[name] = profile.dropped.get(name, 0) + 1
+        profile.frame += profile._lap()
+
+    def _start_profile(self, cmd: str, args: tuple[str, ...]) -> CommandProfile | None:
+        if self.profiler is None:
+            return None
+        return CommandProfile([cmd, *args])
+
+    def _finish_profile(
+        self, profile: CommandProfile | None, error: BaseException | None
+    ):
+        if profile is None or self.profiler is None:
+            return
+        profile._finish(error)
+        self.profiler(profile)
+
+    def _finish_stderr(self):
+        if self.stderr_handler is not None:
+            self.stderr_handler(self.stderr.getvalue())
+
+    def process_stderr(self, chunk: bytes):
+        """Handle a chunk of stderr output"""
+        self.stderr.write(chunk)
+
+    def _reset(self) -> int:
+        """Reset per-command state, returning how stderr should be
+        captured"""
+        self.framer.reset()
+        self.stderr = RingBuffer(self.stderr_limit)
+        return subprocess.PIPE if self.stderr_limit > 0 else subprocess.DEVNULL
+
+    async def _drain_stderr(self, stream: asyncio.StreamReader):
+        while chunk := await stream.read(self.chunk_size):
+            self.process_stderr(chunk)
+
+    async def _aterminate(self, aproc: asubprocess.Process):
+        """Ask the process to terminate, killing it if it has not exited
+        after the grace period, and reap it"""
+        if aproc.returncode is not None:
+            return
+        try:
+            aproc.terminate()
+            try:
+                await asyncio.wait_for(aproc.wait(), self.grace_period)
+            except asyncio.TimeoutError:
+                aproc.kill()
+                await aproc.wait()
+        except ProcessLookupError:
+            pass
+
+    def _terminate(self, proc: subprocess.Popen):
+        """Synchronous counterpart to `_aterminate`"""
+        if proc.poll() is not None:
+            return
+        try:
+            proc.terminate()
+            try:
+                proc.wait(self.grace_period)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        except ProcessLookupError:
+            pass
+
+    async def _watch_cancel(self, aproc: asubprocess.Process, cancel: Canceller):
+        await cancel.wait_async()
+        # wake the reader straight away, then stop the process
+        if aproc.stdout is not None:
+            aproc.stdout.set_exception(CancelledError())
+        await self._aterminate(aproc)
 
     async def aprocess(
         self,
@@ -76,120 +307,356 @@ class CommandRunner:
         *args: str,
         cancel: Canceller | None = None,
     ) -> AsyncGenerator[Any, None]:
+        stderr = self._reset()
+        profile = self._start_profile(cmd, args)
         aproc = await asubprocess.create_subprocess_exec(
             cmd,
             *args,
             stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
+            stderr=stderr,
+            **spawn_options(self.spawn),
         )
+        if profile is not None:
+            profile.spawn = profile._lap()
+        error: BaseException | None = None
+        watcher: asyncio.Task | None = None
+        if cancel is not None:
+            watcher = asyncio.create_task(self._watch_cancel(aproc, cancel))
+        drainer: asyncio.Task | None = None
+        if aproc.stderr is not None:
+            drainer = asyncio.create_task(self._drain_stderr(aproc.stderr))
         try:
             if aproc.stdout is None:
                 raise ValueError
+            if self.resources:
+                await asyncio.to_thread(apply_resources, aproc.pid, self.resources)
 
-            # slurp output while running
-            while True:
-                if cancel is not None and cancel.is_cancelled():
-                    raise CancelledError
-                try:
-                    # get a whole line; if this returns empty then output has finished
-                    line = await asyncio.wait_for(aproc.stdout.readline(), 1)
-                    if not line:
-                        break
-                except asyncio.TimeoutError:
-                    pass
+            # slurp output in large chunks while running; an empty read
+            # means output has finished
+            while chunk := await aproc.stdout.read(self.chunk_size):
+                if profile is None:
+                    for o in self.process_chunk(chunk):
+                        yield o
                 else:
-                    o = self.process_line(line.rstrip())
-                    if o is not None:
+                    for o in self._process_chunk_profiled(chunk, profile):
                         yield o
 
+            if cancel is not None and cancel.is_cancelled():
+                raise CancelledError
+
+            returncode = await aproc.wait()
+            if drainer is not None:
+                await drainer
+            if profile is not None:
+                profile.wait = profile._lap()
+                profile.returncode = returncode
+
             # raise error on nonzero return code
-            if (returncode := await aproc.wait()) != 0:
-                raise HandBrakeError(returncode)
+            if returncode != 0:
+                raise HandBrakeError(returncode, self.stderr.getvalue())
 
+        except BaseException as e:
+            error = e
+            raise
         finally:
+            if watcher is not None:
+                watcher.cancel()
+            if drainer is not None:
+                drainer.cancel()
             # ensure program is terminated on exit
+            await self._aterminate(aproc)
+            self._finish_stderr()
+            self._finish_profile(profile, error)
+
+    def _read_selector(
+        self,
+        proc: subprocess.Popen,
+        cancel: Canceller | None,
+        deadline: float | None,
+    ) -> Generator[bytes, None, None]:
+        """Read chunks of stdout while draining stderr, waiting on a
+        selector so that a cancellation or the deadline interrupts the
+        wait"""
+        assert proc.stdout is not None
+        fd = proc.stdout.fileno()
+        waker = _Waker() if cancel is not None else None
+        with selectors.DefaultSelector() as sel:
+            sel.register(fd, selectors.EVENT_READ)
+            if proc.stderr is not None:
+                sel.register(proc.stderr.fileno(), selectors.EVENT_READ)
+            if cancel is not None and waker is not None:
+                sel.register(waker.fd, selectors.EVENT_READ)
+                cancel.add_callback(waker.wake)
             try:
-                aproc.terminate()
-            except ProcessLookupError:
-                pass
+                # stop once stdout and stderr have both been closed
+                while len(sel.get_map()) > (1 if waker is not None else 0):
+                    timeout = None
+                    if deadline is not None:
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            raise TimeoutError
+                    ready = sel.select(timeout)
+                    if cancel is not None and cancel.is_cancelled():
+                        raise CancelledError
+                    for key, _ in ready:
+                        if waker is not None and key.fd == waker.fd:
+                            continue
+                        chunk = os.read(key.fd, self.chunk_size)
+                        if not chunk:
+                            sel.unregister(key.fd)
+                        elif key.fd == fd:
+                            yield chunk
+                        else:
+                            self.process_stderr(chunk)
+            finally:
+                if cancel is not None and waker is not None:
+                    cancel.remove_callback(waker.wake)
+                    waker.close()
+
+    def _read_watchdog(
+        self,
+        proc: subprocess.Popen,
+        cancel: Canceller | None,
+        deadline: float | None,
+    ) -> Generator[bytes, None, None]:
+        """Read chunks of stdout with blocking reads, draining stderr on
+        another thread and using a watchdog thread to stop the process on
+        cancellation or at the deadline. Used where pipes cannot be
+        waited on with a selector"""
+        assert proc.stdout is not None
+        fd = proc.stdout.fileno()
+        wake = threading.Event()
+        finished = threading.Event()
+        reason: list[CancelledError] = []
 
-    def process(self, cmd: str, *args: str) -> Generator[Any, None, None]:
+        def watch():
+            timeout = None if deadline is None else deadline - time.monotonic()
+            timed_out = not wake.wait(timeout)
+            if finished.is_set():
+                return
+            if cancel is not None and cancel.is_cancelled():
+                reason.append(CancelledError())
+            elif timed_out:
+                reason.append(TimeoutError())
+            else:
+                return
+            # stopping the process closes stdout, which ends the read
+            self._terminate(proc)
+
+        def drain(stderr: IO[bytes]):
+            while chunk := os.read(stderr.fileno(), self.chunk_size):
+                self.process_stderr(chunk)
+
+        if cancel is not None:
+            cancel.add_callback(wake.set)
+        if cancel is not None or deadline is not None:
+            threading.Thread(target=watch, daemon=True).start()
+        drainer = None
+        if proc.stderr is not None:
+            drainer = threading.Thread(target=drain, args=(proc.stderr,), daemon=True)
+            drainer.start()
+        try:
+            while chunk := os.read(fd, self.chunk_size):
+                yield chunk
+            if drainer is not None:
+                drainer.join()
+        finally:
+            finished.set()
+            wake.set()
+            if cancel is not None:
+                cancel.remove_callback(wake.set)
+        if reason:
+            raise reason[0]
+
+    def process(
+        self,
+        cmd: str,
+        *args: str,
+        cancel: Canceller | None = None,
+        timeout: float | None = None,
+    ) -> Generator[Any, None, None]:
         # create process with pipes to output
+        stderr = self._reset()
+        profile = self._start_profile(cmd, args)
         proc = subprocess.Popen(
             [cmd, *args],
             stdout=subprocess.PIPE,
-            stderr=subprocess.DEVNULL,
+            stderr=stderr,
+            **spawn_options(self.spawn),
         )
         if proc.stdout is None:
             raise ValueError
+        if profile is not None:
+            profile.spawn = profile._lap()
+        error: BaseException | None = None
 
+        deadline = None if timeout is None else time.monotonic() + timeout
+        read = self._read_watchdog if sys.platform == "win32" else self._read_selector
         try:
-            # slurp stdout line-by-line
-            while True:
-                stdout = proc.stdout.readline()
-                if len(stdout) == 0 and proc.poll() is not None:
-                    break
-                o = self.process_line(stdout.rstrip())
-                if o is not None:
-                    yield o
-
-            # slurp the remaining output
-            lines = proc.stdout.read()
-            for line in lines.splitlines():
-                o = self.process_line(line.rstrip())
-                if o is not None:
-                    yield o
+            if self.resources:
+                apply_resources(proc.pid, self.resources)
+            # slurp stdout in chunks of whatever is available
+            for chunk in read(proc, cancel, deadline):
+                if profile is None:
+                    for o in self.process_chunk(chunk):
+                        yield o
+                else:
+                    yield from self._process_chunk_profiled(chunk, profile)
+            proc.wait()
+            if profile is not None:
+                profile.wait = profile._lap()
+                profile.returncode = proc.returncode
 
             # raise error on nonzero return code
             if proc.returncode != 0:
-                raise HandBrakeError(proc.returncode)
+                raise HandBrakeError(proc.returncode, self.stderr.getvalue())
+        except BaseException as e:
+            error = e
+            raise
         finally:
-            try:
-                proc.terminate()
-            except ProcessLookupError:
-                pass
+            self._terminate(proc)
+            self._finish_stderr()
+            self._finish_profile(profile, error)
 
 
 class VersionCommandRunner(CommandRunner):
-    def __init__(self):
-        processor = OutputProcessor(
-            (b"Version: {", b"{"),
-            (b"}", b"}"),
-            Version.model_validate_json,
-        )
-        super().__init__(processor)
+    def __init__(self, decoder: str | Decoder | None = None, **kwargs: Any):
+        processor = OutputProcessor(b"Version:", model_converter(Version, decoder))
+        super().__init__(processor, **kwargs)
 
 
 class ConvertCommandRunner(CommandRunner):
-    def __init__(self):
-        processor = OutputProcessor(
-            (b"Progress: {", b"{"),
-            (b"}", b"}"),
-            Progress.model_validate_json,
-        )
-        super().__init__(processor)
+    def __init__(
+        self,
+        progress_interval: float | None = None,
+        fast_progress: bool = False,
+        **kwargs: Any,
+    ):
+        processor = ProgressProcessor(progress_interval, fast_progress)
+        super().__init__(processor, **kwargs)
 
 
 class ScanCommandRunner(CommandRunner):
-    def __init__(self):
-        progress_processor = OutputProcessor(
-            (b"Progress: {", b"{"),
-            (b"}", b"}"),
-            Progress.model_validate_json,
-        )
-        titleset_processor = OutputProcessor(
-            (b"JSON Title Set: {", b"{"),
-            (b"}", b"}"),
-            TitleSet.model_validate_json,
-        )
-        super().__init__(progress_processor, titleset_processor)
+    def __init__(
+        self,
+        progress_interval: float | None = None,
+        fast_progress: bool = False,
+        decoder: str | Decoder | None = None,
+        lazy: bool = False,
+        stream: bool = False,
+        **kwargs: Any,
+    ):
+        progress_processor = ProgressProcessor(progress_interval, fast_progress)
+        titleset_processor: OutputProcessor[TitleSet | LazyTitleSet | TitleSetSummary]
+        if stream:
+            # yield each title as it is read, then the main feature
+            titleset_processor = OutputProcessor(
+                b"JSON Title Set:",
+                model_converter(TitleSetSummary, decoder),
+                elements=OutputProcessor(b"", model_converter(Title, decoder)),
+            )
+        elif lazy:
+            titleset_processor = OutputProcessor(
+                b"JSON Title Set:", lambda data: LazyTitleSet(data.tobytes(), decoder)
+            )
+        else:
+            titleset_processor = OutputProcessor(
+                b"JSON Title Set:", model_converter(TitleSet, decoder)
+            )
+        super().__init__(progress_processor, titleset_processor, **kwargs)
 
 
 class PresetCommandRunner(CommandRunner):
-    def __init__(self):
-        processor = OutputProcessor(
-            (b"{", b"{"),
-            (b"}", b"}"),
-            Preset.model_validate_json,
-        )
-        super().__init__(processor)
+    def __init__(self, decoder: str | Decoder | None = None, **kwargs: Any):
+        processor = OutputProcessor(b"", model_converter(Preset, decoder))
+        super().__init__(processor, **kwargs)
+
+
+class PresetListCommandRunner(CommandRunner):
+    """
+    Parse the list of builtin presets which `HandBrakeCLI -z` writes to
+    stderr, line by line as it arrives
+    """
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.groups: list[PresetGroup] = []
+        self._group = PresetGroup(name="", presets=[])
+        self._preset = PresetInfo(name="", description="")
+        self._partial = bytearray()
+
+    def _reset(self) -> int:
+        super()._reset()
+        self.groups = []
+        self._group = PresetGroup(name="", presets=[])
+        self._preset = PresetInfo(name="", description="")
+        self._partial = bytearray()
+        # stderr must always be captured as it holds the output
+        return subprocess.PIPE
+
+    def process_stderr(self, chunk: bytes):
+        super().process_stderr(chunk)
+        self._partial += chunk
+        *lines, rest = self._partial.split(b"\n")
+        for line in lines:
+            self.process_preset_line(line.decode(errors="replace").rstrip("\r"))
+        self._partial = rest
+
+    def process_preset_line(self, line: str):
+        # the output is of the format
+        # groupA/
+        #     preset 1 name
+        #         the description of the preset
+        #     preset 2 name
+        #         the second description, it can span
+        #         multiple lines
+        # groupB/
+        #     ...
+        if line.endswith("/"):
+            self._group = PresetGroup(name=line[:-1], presets=[])
+            self.groups.append(self._group)
+        elif line.startswith("        "):
+            if self._preset.description == "":
+                self._preset.description = line.strip()
+            else:
+                self._preset.description += " " + line.strip()
+        elif line.startswith("    "):
+            self._preset = PresetInfo(name=line.strip(), description="")
+            self._group.presets.append(self._preset)
+
+    def finish(self) -> list[PresetGroup]:
+        """Parse any unterminated final line and return the preset groups"""
+        if self._partial:
+            self.process_preset_line(self._partial.decode(errors="replace"))
+            self._partial = bytearray()
+        return self.groups
+
+
+class CapabilitiesCommandRunner(CommandRunner):
+    """
+    Collect the output of `HandBrakeCLI --help`, which is plain text
+    rather than JSON. Only the last `stderr_limit` bytes of stderr are kept
+    """
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.output = bytearray()
+
+    def _reset(self) -> int:
+        self.output = bytearray()
+        return super()._reset()
+
+    def process_chunk(self, chunk: bytes) -> Generator[Any, None, None]:
+        self.output += chunk
+        yield from super().process_chunk(chunk)
+
+    def _process_chunk_profiled(
+        self, chunk: bytes, profile: CommandProfile
+    ) -> Generator[Any, None, None]:
+        self.output += chunk
+        yield from super()._process_chunk_profiled(chunk, profile)
+
+    def finish(self) -> Capabilities:
+        """Parse the options and encoders from the collected output"""
+        text = (bytes(self.output) + self.stderr.getvalue()).decode(errors="replace")
+        return parse_help(text)
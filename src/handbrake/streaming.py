@@ -0,0 +1,89 @@
+from typing import Any, AsyncGenerator, Generator
+
+from handbrake.models.progress import Progress
+from handbrake.models.title import Title, TitleSetSummary
+from handbrake.progresshandler import ProgressHandler
+
+
+class TitleIterator:
+    """
+    Iterate over the titles of a scan as each one is read from the
+    command output. `main_feature` is set once iteration has finished,
+    and closing the iterator early stops the scan
+    """
+
+    def __init__(
+        self,
+        objects: Generator[Any, None, None],
+        progress_handler: ProgressHandler | None = None,
+    ):
+        self._objects = objects
+        self._progress_handler = progress_handler
+        self.main_feature: int | None = None
+
+    def __iter__(self) -> "TitleIterator":
+        return self
+
+    def __next__(self) -> Title:
+        for obj in self._objects:
+            if isinstance(obj, Title):
+                return obj
+            if isinstance(obj, Progress):
+                if self._progress_handler is not None:
+                    self._progress_handler(obj)
+            elif isinstance(obj, TitleSetSummary):
+                self.main_feature = obj.main_feature
+        if self.main_feature is None:
+            raise RuntimeError("no titles found")
+        raise StopIteration
+
+    def close(self):
+        """Stop the scan if it is still running"""
+        self._objects.close()
+
+    def __enter__(self) -> "TitleIterator":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class AsyncTitleIterator:
+    """
+    Asynchronous counterpart to `TitleIterator`
+    """
+
+    def __init__(
+        self,
+        objects: AsyncGenerator[Any, None],
+        progress_handler: ProgressHandler | None = None,
+    ):
+        self._objects = objects
+        self._progress_handler = progress_handler
+        self.main_feature: int | None = None
+
+    def __aiter__(self) -> "AsyncTitleIterator":
+        return self
+
+    async def __anext__(self) -> Title:
+        async for obj in self._objects:
+            if isinstance(obj, Title):
+                return obj
+            if isinstance(obj, Progress):
+                if self._progress_handler is not None:
+                    self._progress_handler(obj)
+            elif isinstance(obj, TitleSetSummary):
+                self.main_feature = obj.main_feature
+        if self.main_feature is None:
+            raise RuntimeError("no titles found")
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        """Stop the scan if it is still running"""
+        await self._objects.aclose()
+
+    async def __aenter__(self) -> "AsyncTitleIterator":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
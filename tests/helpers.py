@@ -1,3 +1,4 @@
+import sys
 from pathlib import Path
 
 from handbrake.models.preset import Preset
@@ -135,3 +136,48 @@ sample_preset = Preset(
     version_micro=0,
     version_minor=0,
 )
+
+
+def progress_blob(progress: float, state: str = "WORKING") -> str:
+    """Render a progress update the way HandBrakeCLI prints it"""
+    if state == "WORKDONE":
+        body = '    "WorkDone": {\n        "Error": 0,\n        "SequenceID": 1\n    }'
+    else:
+        body = (
+            '    "Working": {\n'
+            '        "ETASeconds": 10,\n'
+            '        "Hours": 0,\n'
+            '        "Minutes": 0,\n'
+            '        "Pass": 1,\n'
+            '        "PassCount": 1,\n'
+            '        "PassID": -1,\n'
+            '        "Paused": 0,\n'
+            f'        "Progress": {progress},\n'
+            '        "Rate": 30.0,\n'
+            '        "RateAvg": 25.0,\n'
+            '        "Seconds": 10,\n'
+            '        "SequenceID": 1\n'
+            "    }"
+        )
+    return f'Progress: {{\n    "State": "{state}",\n{body}\n}}\n'
+
+
+def python_command(script: str) -> list[str]:
+    """A command which runs the given python script, used to stand in
+    for HandBrakeCLI"""
+    return [sys.executable, "-c", script]
+
+
+def echo_command(output: str, returncode: int = 0) -> list[str]:
+    """A command which writes the given text to stdout and exits"""
+    return python_command(
+        f"import sys; sys.stdout.write({output!r}); sys.exit({returncode})"
+    )
+
+
+def fake_executable(path: Path, script: str) -> str:
+    """Write a python script to the given path which can be run directly
+    as a stand in for HandBrakeCLI"""
+    path.write_text(f"#!{sys.executable}\n{script}")
+    path.chmod(0o755)
+    return str(path)
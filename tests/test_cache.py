@@ -0,0 +1,68 @@
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from handbrake.cache import ScanCache
+from handbrake.mock import MockTitle
+from handbrake.models.title import TitleSet
+
+
+def make_title_set(n: int) -> TitleSet:
+    return TitleSet(
+        main_feature=1,
+        title_list=[MockTitle(i, timedelta(minutes=i)).get_title() for i in range(n)],
+    )
+
+
+def test_round_trip(tmp_path: Path):
+    source = tmp_path / "source.mkv"
+    source.write_bytes(b"video")
+    title_set = make_title_set(3)
+    with ScanCache(tmp_path / "cache.db") as cache:
+        key = ScanCache.make_key(source, "all", ["--scan"], "abc")
+        assert cache.get(key) is None
+        cache.put(key, source, title_set)
+        assert cache.get(key) == title_set
+
+
+def test_key_changes(tmp_path: Path):
+    source = tmp_path / "source.mkv"
+    source.write_bytes(b"video")
+    key = ScanCache.make_key(source, "all", ["--scan"], "abc")
+    assert key == ScanCache.make_key(str(source), "all", ["--scan"], "abc")
+    assert key != ScanCache.make_key(source, 1, ["--scan"], "abc")
+    assert key != ScanCache.make_key(source, "all", ["--scan"], "def")
+    st = source.stat()
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert key != ScanCache.make_key(source, "all", ["--scan"], "abc")
+
+
+def test_lru_eviction(tmp_path: Path):
+    source = tmp_path / "source.mkv"
+    source.write_bytes(b"video")
+    entry_size = len(make_title_set(1).model_dump_json(by_alias=True))
+    with ScanCache(tmp_path / "cache.db", max_size=entry_size * 2) as cache:
+        for key in ["a", "b"]:
+            cache.put(key, source, make_title_set(1))
+        # touch "a" so that "b" is the least recently used
+        assert cache.get("a") is not None
+        cache.put("c", source, make_title_set(1))
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        assert cache.size() == entry_size * 2
+
+
+def test_invalidate(tmp_path: Path):
+    a = tmp_path / "a.mkv"
+    b = tmp_path / "b.mkv"
+    a.write_bytes(b"a")
+    b.write_bytes(b"b")
+    with ScanCache(tmp_path / "cache.db") as cache:
+        cache.put("a", a, make_title_set(1))
+        cache.put("b", b, make_title_set(1))
+        cache.invalidate(a)
+        assert cache.get("a") is None
+        assert cache.get("b") is not None
+        cache.invalidate()
+        assert cache.get("b") is None
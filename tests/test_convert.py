@@ -1,11 +1,20 @@
+import asyncio
+import json
+import sys
+import time
+from datetime import timedelta
 from pathlib import Path
+from typing import Sequence
 
 import pytest
 
 from handbrake import HandBrake
+from handbrake.errors import CancelledError, HandBrakeError, TimeoutError
+from handbrake.mock import MockHandBrake, MockTitle
 from handbrake.models.progress import Progress
+from handbrake.parallel import split_chapters
 
-from .helpers import sample_preset, sample_video_path
+from .helpers import fake_executable, progress_blob, sample_preset, sample_video_path
 
 
 def test_convert_title(tmp_path: Path):
@@ -45,3 +54,127 @@ async def test_convert_title_async(tmp_path: Path):
     )
     assert len(progress) > 0
     assert progress[-1].state == "WORKDONE"
+
+
+def concat(parts: Sequence[Path], output: Path):
+    output.write_text("\n".join(p.read_text() for p in parts))
+
+
+def test_split_chapters():
+    chapters = MockTitle(1, timedelta(minutes=10)).get_chapters()
+    assert split_chapters(chapters, 3) == [(1, 3), (4, 7), (8, 10)]
+    assert split_chapters(chapters, 20) == [(i, i) for i in range(1, 11)]
+    assert split_chapters(chapters[:1], 4) == [(1, 1)]
+    assert split_chapters([], 4) == []
+
+
+def test_convert_title_parallel(tmp_path: Path):
+    h = MockHandBrake([3, 8], touch=True, scan_factor=0.0001, convert_factor=0.0001)
+    progress: list[Progress] = []
+    output = tmp_path / "output.mkv"
+    h.convert_title_parallel(
+        "input", output, "main", 3, progress_handler=progress.append, joiner=concat
+    )
+    segments = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [s["chapters"] for s in segments] == [[1, 3], [4, 5], [6, 8]]
+    assert all(s["title"] == 2 for s in segments)
+    # only the output remains
+    assert list(tmp_path.iterdir()) == [output]
+    assert progress[-1].state == "WORKDONE"
+    assert progress[-2].percent == pytest.approx(100)
+
+
+@pytest.mark.asyncio
+async def test_convert_title_parallel_async(tmp_path: Path):
+    h = MockHandBrake([3, 8], touch=True, scan_factor=0.0001, convert_factor=0.0001)
+    output = tmp_path / "output.mkv"
+    await h.convert_title_parallel_async("input", output, 1, 2, joiner=concat)
+    segments = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [s["chapters"] for s in segments] == [[1, 2], [3, 3]]
+    assert list(tmp_path.iterdir()) == [output]
+
+
+def test_convert_title_parallel_failure(tmp_path: Path):
+    def fail(parts: Sequence[Path], output: Path):
+        raise RuntimeError("join failed")
+
+    h = MockHandBrake([3], touch=True, scan_factor=0.0001, convert_factor=0.0001)
+    with pytest.raises(RuntimeError):
+        h.convert_title_parallel("input", tmp_path / "output.mkv", 1, 3, joiner=fail)
+    assert list(tmp_path.iterdir()) == []
+    with pytest.raises(ValueError):
+        h.convert_title_parallel(
+            "input", tmp_path / "output.mkv", 1, 3, {"chapters": 1}, joiner=concat
+        )
+
+
+class SegmentFailingHandBrake(MockHandBrake):
+    """Fails every segment after the first, and raises CancelledError
+    from cancelled conversions as HandBrake does"""
+
+    def convert_title(self, input, output, title, opts=None, *args, **kwargs):
+        if opts and opts["chapters"][0] > 1:
+            raise HandBrakeError(3)
+        super().convert_title(input, output, title, opts, *args, **kwargs)
+        if kwargs["cancel"].is_cancelled():
+            raise CancelledError
+
+    async def convert_title_async(
+        self, input, output, title, opts=None, *args, **kwargs
+    ):
+        if opts and opts["chapters"][0] > 1:
+            await asyncio.sleep(0.01)
+            raise HandBrakeError(3)
+        await super().convert_title_async(input, output, title, opts, *args, **kwargs)
+        if kwargs["cancel"].is_cancelled():
+            raise CancelledError
+
+
+def test_convert_title_parallel_segment_failure(tmp_path: Path):
+    h = SegmentFailingHandBrake([6], touch=True, scan_factor=0.0001)
+    with pytest.raises(HandBrakeError) as e:
+        h.convert_title_parallel("input", tmp_path / "output.mkv", 1, 3)
+    assert e.value.return_code == 3
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_convert_title_parallel_async_segment_failure(tmp_path: Path):
+    h = SegmentFailingHandBrake([6], touch=True, scan_factor=0.0001)
+    with pytest.raises(HandBrakeError) as e:
+        await h.convert_title_parallel_async("input", tmp_path / "output.mkv", 1, 3)
+    assert e.value.return_code == 3
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a shebang script")
+def test_convert_title_last_stderr(tmp_path: Path):
+    script = (
+        "import sys\n"
+        "sys.stderr.write('encoded 10 frames\\n')\n"
+        f"sys.stdout.write({progress_blob(1, 'WORKDONE')!r})\n"
+        "sys.exit(any(a.endswith('bad.mkv') for a in sys.argv))\n"
+    )
+    h = HandBrake(fake_executable(tmp_path / "HandBrakeCLI", script))
+    assert h.last_stderr == b""
+    h.convert_title("in", tmp_path / "out.mkv", 1)
+    assert h.last_stderr == b"encoded 10 frames\n"
+    h.last_stderr = b""
+    with pytest.raises(HandBrakeError) as e:
+        h.convert_title("in", tmp_path / "bad.mkv", 1)
+    assert h.last_stderr == e.value.stderr == b"encoded 10 frames\n"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires SIGTERM")
+def test_convert_title_grace_period(tmp_path: Path):
+    script = (
+        "import signal, time\n"
+        "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+        "time.sleep(30)\n"
+    )
+    exe = fake_executable(tmp_path / "HandBrakeCLI", script)
+    h = HandBrake(exe, grace_period=0.2)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        h.convert_title("in", tmp_path / "out.mkv", 1, timeout=0.5)
+    assert time.monotonic() - start < 4
@@ -0,0 +1,56 @@
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+from handbrake import HandBrake, decoding
+from handbrake.cache import ScanCache
+from handbrake.fakecli import FakeConfig, write_launcher
+from handbrake.mock import MockTitle
+from handbrake.models.title import TitleSet
+from handbrake.runner import ScanCommandRunner
+
+from .helpers import echo_command
+
+
+def test_custom_decoder():
+    title_set = TitleSet(
+        main_feature=1, title_list=[MockTitle(1, timedelta(minutes=5)).get_title()]
+    )
+    output = "JSON Title Set: " + title_set.model_dump_json(by_alias=True) + "\n"
+    decoded: list[type] = []
+
+    def decoder(model, data):
+        decoded.append(model)
+        return decoding.pydantic_decoder(model, data)
+
+    decoding.register_decoder("recording", decoder)
+    try:
+        runner = ScanCommandRunner(decoder="recording")
+        assert list(runner.process(*echo_command(output))) == [title_set]
+        assert decoded == [TitleSet]
+    finally:
+        decoding.unregister_decoder("recording")
+    with pytest.raises(KeyError):
+        decoding.get_decoder("recording")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a shebang script")
+def test_custom_decoder_cached_scan(tmp_path: Path):
+    decoded: list[type] = []
+
+    def decoder(model, data):
+        decoded.append(model)
+        return decoding.pydantic_decoder(model, data)
+
+    exe = write_launcher(tmp_path / "HandBrakeCLI", FakeConfig(titles=[5, 10]))
+    source = tmp_path / "source.mkv"
+    source.write_bytes(b"video")
+    with ScanCache(tmp_path / "cache.db") as cache:
+        h = HandBrake(exe, scan_cache=cache, decoder=decoder)
+        title_set = h.scan_titles(source, "all")
+        assert decoded.count(TitleSet) == 1
+        # served from the cache, still through the decoder
+        assert h.scan_titles(source, "all") == title_set
+        assert decoded.count(TitleSet) == 2
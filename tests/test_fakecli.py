@@ -0,0 +1,116 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from handbrake import HandBrake, probe
+from handbrake.canceller import Canceller
+from handbrake.errors import CancelledError, HandBrakeError, TimeoutError
+from handbrake.fakecli import FakeConfig, write_launcher
+from handbrake.models.progress import Progress
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="requires a shebang script"
+)
+
+
+def fake(tmp_path: Path, **config) -> HandBrake:
+    return HandBrake(write_launcher(tmp_path / "HandBrakeCLI", FakeConfig(**config)))
+
+
+def test_config_env_round_trip():
+    config = FakeConfig(titles=[5, 10], fps=12.5, hang_after=3)
+    assert FakeConfig.from_env(config.to_env()) == config
+    assert FakeConfig.from_env({}) == FakeConfig()
+
+
+def test_launcher_relative_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    exe = write_launcher("HandBrakeCLI", FakeConfig(version="1.7.3"))
+    assert exe == str(tmp_path / "HandBrakeCLI")
+    probe.clear()
+    assert HandBrake(exe).version().version_string == "1.7.3"
+
+
+def test_metadata(tmp_path: Path):
+    probe.clear()
+    h = fake(tmp_path, version="1.7.3")
+    assert h.version().version_string == "1.7.3"
+    caps = h.capabilities()
+    assert "x265" in caps.video_encoders
+    assert caps.supports_option("--preset-export")
+    groups = h.list_presets()
+    assert [g.name for g in groups] == ["General", "Matroska"]
+    preset = h.get_preset("Fast 1080p30")
+    assert preset.preset_list[0]["PresetName"] == "Fast 1080p30"
+    with pytest.raises(HandBrakeError):
+        h.get_preset("Made Up")
+
+
+def test_scan(tmp_path: Path):
+    h = fake(tmp_path, titles=[10, 60, 20])
+    progress: list[Progress] = []
+    title_set = h.scan_titles("disc", "all", progress_handler=progress.append)
+    assert [t.index for t in title_set.title_list] == [1, 2, 3]
+    assert title_set.main_feature == 2
+    assert len(progress) == 3 and progress[0].state == "SCANNING"
+    main = h.scan_titles("disc", "main")
+    assert [t.duration.minutes for t in main.title_list] == [0]
+    assert main.title_list[0].duration.hours == 1
+    assert len(h.scan_titles("disc", 3).title_list[0].chapter_list) == 20
+    assert [t.index for t in h.iter_titles("disc", "all")] == [1, 2, 3]
+
+
+def test_convert(tmp_path: Path):
+    h = fake(tmp_path, progress_updates=20, output_size=100)
+    progress: list[Progress] = []
+    h.convert_title("disc", tmp_path / "out.mkv", 1, progress_handler=progress.append)
+    assert len(progress) == 21
+    assert progress[-1].state == "WORKDONE"
+    assert (tmp_path / "out.mkv").stat().st_size == 100
+    with pytest.raises(HandBrakeError) as e:
+        h.convert_title("disc", tmp_path / "out.mkv", 9)
+    assert e.value.return_code == 2
+
+
+def test_failure(tmp_path: Path):
+    h = fake(tmp_path, fail=3, fail_after=5)
+    progress: list[Progress] = []
+    with pytest.raises(HandBrakeError) as e:
+        h.convert_title(
+            "disc", tmp_path / "out.mkv", 1, progress_handler=progress.append
+        )
+    assert e.value.return_code == 3
+    assert b"fake failure" in e.value.stderr
+    assert len(progress) == 5
+
+
+def test_hang(tmp_path: Path):
+    h = fake(tmp_path, hang_after=2)
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        h.convert_title("disc", tmp_path / "out.mkv", 1, timeout=0.5)
+    assert time.monotonic() - start < 5
+
+
+@pytest.mark.asyncio
+async def test_cancel_async(tmp_path: Path):
+    h = fake(tmp_path, progress_interval=0.01, progress_updates=10000)
+    cancel = Canceller()
+    asyncio.get_running_loop().call_later(0.3, cancel.cancel)
+    with pytest.raises(CancelledError):
+        await h.convert_title_async("disc", tmp_path / "out.mkv", 1, cancel=cancel)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_async(tmp_path: Path):
+    h = fake(tmp_path, progress_updates=50)
+    await asyncio.gather(
+        *(
+            h.convert_title_async("disc", tmp_path / f"{i}.mkv", "main")
+            for i in range(8)
+        )
+    )
+    assert all((tmp_path / f"{i}.mkv").exists() for i in range(8))
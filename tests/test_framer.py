@@ -0,0 +1,75 @@
+import pytest
+
+from handbrake.errors import OutputTooLargeError
+from handbrake.framer import JSONFramer, iter_objects
+
+
+def frame(framer: JSONFramer, *chunks: bytes) -> list[tuple[int, bytes]]:
+    return [(i, data.tobytes()) for c in chunks for i, data in framer.feed(c)]
+
+
+def test_multiline_object():
+    framer = JSONFramer([b"Progress:", b"JSON Title Set:"])
+    output = b'[12:00:00] starting\nJSON Title Set: {\n    "A": 1\n}\nlog\n'
+    assert frame(framer, output) == [(1, b'{\n    "A": 1\n}')]
+
+
+def test_compact_object():
+    framer = JSONFramer([b"Progress:"])
+    output = b'Progress: {"State": "WORKING", "Working": {"Progress": 0.5}}\n'
+    assert frame(framer, output) == [
+        (0, b'{"State": "WORKING", "Working": {"Progress": 0.5}}')
+    ]
+
+
+def test_braces_in_strings():
+    framer = JSONFramer([b"Version:"])
+    output = b'Version: {"Name": "a}\\"{b", "X": {}}\n'
+    assert frame(framer, output) == [(0, b'{"Name": "a}\\"{b", "X": {}}')]
+
+
+def test_split_across_chunks():
+    output = b'noise\nProgress: {"Name": "a}\\"{b", "X": {"Y": 1}}\n' * 3
+    # split at every possible position, including inside the label and
+    # between a backslash and the character it escapes
+    for size in range(1, 12):
+        chunks = [output[i : i + size] for i in range(0, len(output), size)]
+        framer = JSONFramer([b"Progress:"])
+        objs = frame(framer, *chunks)
+        assert objs == [(0, b'{"Name": "a}\\"{b", "X": {"Y": 1}}')] * 3
+        assert len(framer.buffer) == 0
+
+
+def test_label_must_start_line():
+    framer = JSONFramer([b"Progress:"])
+    output = b'log line mentioning Progress: {"A": 1}\nProgress: {"B": 2}\n'
+    assert frame(framer, output) == [(0, b'{"B": 2}')]
+
+
+def test_iter_objects():
+    data = b'{"A": [{"B": "}{"}, {"C": [{}, "\\"{"]}], "D": {"E": {}}}'
+    spans = iter_objects(data, 3)
+    assert [data[s:e] for s, e in spans] == [
+        b'{"B": "}{"}',
+        b'{"C": [{}, "\\"{"]}',
+        b"{}",
+    ]
+    assert [data[s:e] for s, e in iter_objects(data, 2)] == [b'{"E": {}}']
+
+
+def test_split_elements():
+    framer = JSONFramer([b"JSON Title Set:"], split=[b"JSON Title Set:"])
+    output = b'JSON Title Set: {"A": 1, "L": [{"B": {"C": "}"}}, {"D": 2}]}\n'
+    # feed a byte at a time to check elements are dropped from the buffer
+    assert frame(framer, *(output[i : i + 1] for i in range(len(output)))) == [
+        (1, b'{"B": {"C": "}"}}'),
+        (1, b'{"D": 2}'),
+        (0, b'{"A": 1, "L": [0, 0]}'),
+    ]
+
+
+def test_max_size():
+    framer = JSONFramer([b"Progress:"], max_size=16)
+    frame(framer, b"Progress: {}\n" * 4)
+    with pytest.raises(OutputTooLargeError):
+        frame(framer, b'Progress: {"A": "' + b"x" * 16)
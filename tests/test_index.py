@@ -0,0 +1,98 @@
+from datetime import timedelta
+from pathlib import Path
+
+from handbrake.cache import ScanCache
+from handbrake.index import TitleIndex
+from handbrake.mock import MockTitle
+from handbrake.models.title import Audio, AudioAttributes, TitleSet
+
+
+def audio(language_code: str, codec_name: str) -> Audio:
+    return Audio(
+        attributes=AudioAttributes(
+            alt_commentary=False,
+            commentary=False,
+            default=False,
+            normal=True,
+            secondary=False,
+            visually_impaired=False,
+        ),
+        bit_rate=640000,
+        channel_count=6,
+        channel_layout=1551,
+        channel_layout_name="5.1(side)",
+        codec=2048,
+        codec_name=codec_name,
+        codec_param=0,
+        description="",
+        LFECount=1,
+        language="",
+        language_code=language_code,
+        sample_rate=48000,
+    )
+
+
+def make_title_set(minutes: list[int], tracks: list[list[Audio]]) -> TitleSet:
+    titles = []
+    for i, (m, a) in enumerate(zip(minutes, tracks), 1):
+        title = MockTitle(i, timedelta(minutes=m)).get_title()
+        titles.append(title.model_copy(update={"audio_list": a}))
+    return TitleSet(main_feature=1, title_list=titles)
+
+
+english_ac3 = audio("eng", "AC3")
+french_ac3 = audio("fra", "AC3")
+english_aac = audio("eng", "AAC")
+disc_a = make_title_set([45, 90, 55], [[english_ac3], [english_ac3], [english_aac]])
+disc_b = make_title_set([50, 2], [[french_ac3, english_ac3], []])
+
+
+def build() -> TitleIndex:
+    index = TitleIndex()
+    index.add_title_set("a", disc_a)
+    index.add_json("b", disc_b.model_dump_json(by_alias=True))
+    return index
+
+
+def check(index: TitleIndex):
+    assert len(index) == 5
+    longest = index.longest()
+    assert longest is not None
+    assert index.value(longest, "duration") == 90 * 60
+    rows = index.query(
+        duration=(40 * 60, 60 * 60),
+        audio={"language_code": "eng", "codec_name": "AC3"},
+    )
+    assert [(index.value(i, "disc"), index.value(i, "index")) for i in rows] == [
+        ("a", 1),
+        ("b", 1),
+    ]
+    assert index.query(rows, disc="b") == [3]
+    assert index.query(audio={"language_code": "deu"}) == []
+    assert index.query(duration=(None, 10 * 60)) == [4]
+    assert index.row(4)["name"] == "Title 2"
+    assert index.value(0, "commentary", "audio") is False
+
+
+def test_query():
+    check(build())
+
+
+def test_save_load(tmp_path: Path):
+    build().save(tmp_path / "titles.idx")
+    with TitleIndex.load(tmp_path / "titles.idx") as index:
+        check(index)
+        # adding to a loaded index copies it out of the file
+        index.add_title_set("c", disc_b)
+        assert len(index) == 7
+        assert index.query(disc="c") == [5, 6]
+
+
+def test_add_cache(tmp_path: Path):
+    source = tmp_path / "source.mkv"
+    source.write_bytes(b"video")
+    with ScanCache(tmp_path / "cache.db") as cache:
+        cache.put(ScanCache.make_key(source, "all", [], "abc"), source, disc_a)
+        index = TitleIndex()
+        index.add_cache(cache)
+    assert index.query(disc=str(source.resolve())) == [0, 1, 2]
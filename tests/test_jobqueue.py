@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from handbrake import HandBrake
+from handbrake.canceller import Canceller
+from handbrake.jobqueue import JobQueue, _work_process, main, work
+from handbrake.mock import MockHandBrake
+from handbrake.models.common import Offset
+
+from .helpers import fake_executable, progress_blob
+
+
+def test_priority_and_opts(tmp_path: Path):
+    with JobQueue(tmp_path / "jobs.db") as queue:
+        low = queue.enqueue("a", "a.mkv", 1)
+        high = queue.enqueue(
+            "b",
+            "b.mkv",
+            "main",
+            {"chapters": (1, 3), "start_at": Offset(count=5, unit="seconds")},
+            priority=5,
+        )
+        job = queue.lease("w1")
+        assert job is not None and job.id == high
+        assert job.title == "main"
+        assert job.opts == {
+            "chapters": (1, 3),
+            "start_at": Offset(count=5, unit="seconds"),
+        }
+        assert queue.complete(job.id, "w1")
+        job = queue.lease("w1")
+        assert job is not None and job.id == low
+        assert queue.lease("w1") is None
+        assert [j.state for j in queue.jobs()] == ["done", "running"]
+
+
+def test_expired_lease_is_requeued(tmp_path: Path):
+    with JobQueue(tmp_path / "jobs.db", lease_duration=0.05) as queue:
+        id = queue.enqueue("a", "a.mkv", 1, max_attempts=2)
+        assert queue.lease("dead") is not None
+        time.sleep(0.1)
+        job = queue.lease("alive")
+        assert job is not None and job.id == id and job.attempts == 2
+        # the first worker has lost its lease
+        assert not queue.heartbeat(id, "dead")
+        assert not queue.complete(id, "dead")
+        assert queue.heartbeat(id, "alive")
+        time.sleep(0.1)
+        assert queue.lease("alive") is None
+        job = queue.get(id)
+        assert job is not None and job.state == "failed"
+        assert job.error == "lease expired"
+        assert queue.retry(id)
+        assert queue.lease("alive") is not None
+
+
+def test_work(tmp_path: Path):
+    h = MockHandBrake([1, 2], touch=True, convert_factor=0.0001)
+    with JobQueue(tmp_path / "jobs.db") as queue:
+        good = queue.enqueue("a", tmp_path / "a.mkv", 2)
+        bad = queue.enqueue("b", tmp_path / "b.mkv", 5, max_attempts=2)
+        work(queue, h, exit_when_empty=True)
+        assert (tmp_path / "a.mkv").exists()
+        states = {j.id: (j.state, j.attempts) for j in queue.jobs()}
+        assert states == {good: ("done", 1), bad: ("failed", 2)}
+
+
+def test_stopped_worker_releases_job(tmp_path: Path):
+    executable = fake_executable(
+        tmp_path / "HandBrakeCLI", "import time\ntime.sleep(60)\n"
+    )
+    with JobQueue(tmp_path / "jobs.db") as queue:
+        id = queue.enqueue("a", tmp_path / "a.mkv", 1, max_attempts=1)
+        stop = Canceller()
+        worker = threading.Thread(
+            target=work, args=(queue, HandBrake(executable)), kwargs={"stop": stop}
+        )
+        worker.start()
+        deadline = time.monotonic() + 10
+        while (job := queue.get(id)) is not None and job.state != "running":
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        stop.cancel()
+        worker.join(10)
+        assert not worker.is_alive()
+        job = queue.get(id)
+        assert job is not None
+        assert (job.state, job.attempts, job.worker) == ("queued", 0, None)
+        assert queue.lease("w1") is not None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires SIGTERM")
+def test_terminated_worker_releases_job(tmp_path: Path):
+    pid_file = tmp_path / "HandBrakeCLI.pid"
+    script = (
+        "import os, pathlib, time\n"
+        f"pathlib.Path({str(pid_file)!r}).write_text(str(os.getpid()))\n"
+        "time.sleep(60)\n"
+    )
+    executable = fake_executable(tmp_path / "HandBrakeCLI", script)
+    db = tmp_path / "jobs.db"
+    with JobQueue(db) as queue:
+        id = queue.enqueue("a", tmp_path / "a.mkv", 1, max_attempts=1)
+        worker = multiprocessing.Process(
+            target=_work_process, args=(db, executable, 60.0, 0.05, False)
+        )
+        worker.start()
+        deadline = time.monotonic() + 10
+        while not pid_file.exists() or not pid_file.read_text():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        worker.terminate()
+        worker.join(10)
+        assert worker.exitcode == 0
+        job = queue.get(id)
+        assert job is not None
+        assert (job.state, job.attempts, job.worker) == ("queued", 0, None)
+    # HandBrakeCLI was terminated along with the worker
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_cli(tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+    script = (
+        "import sys\n"
+        "open(sys.argv[sys.argv.index('-o') + 1], 'w').close()\n"
+        f"sys.stdout.write({progress_blob(1, 'WORKDONE')!r})\n"
+    )
+    executable = fake_executable(tmp_path / "HandBrakeCLI", script)
+    db = str(tmp_path / "jobs.db")
+    for i in range(4):
+        main([db, "enqueue", "in", str(tmp_path / f"{i}.mkv"), "-t", "1"])
+    assert capsys.readouterr().out.split() == ["1", "2", "3", "4"]
+    main([db, "list", "--state", "queued"])
+    assert len(capsys.readouterr().out.splitlines()) == 4
+    main([db, "work", "-j", "2", "--executable", executable, "--exit-when-empty"])
+    for i in range(4):
+        assert (tmp_path / f"{i}.mkv").exists()
+    with JobQueue(db) as queue:
+        assert all(j.state == "done" for j in queue.jobs())
@@ -0,0 +1,103 @@
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from handbrake import HandBrake
+from handbrake.errors import CancelledError, HandBrakeError
+from handbrake.jobqueue import JobQueue
+from handbrake.metrics import Metrics
+from handbrake.models.progress import Progress
+
+from .helpers import fake_executable, progress_blob
+
+convert_script = (
+    "import sys\n"
+    "out = sys.argv[sys.argv.index('-o') + 1]\n"
+    "if out.endswith('bad.mkv'):\n"
+    "    sys.exit(3)\n"
+    "open(out, 'wb').write(b'x' * 100)\n"
+    f"sys.stdout.write({progress_blob(0.5)!r})\n"
+    f"sys.stdout.write({progress_blob(1, 'WORKDONE')!r})\n"
+)
+
+
+def test_convert_records_metrics(tmp_path: Path):
+    metrics = Metrics()
+    h = HandBrake(
+        fake_executable(tmp_path / "HandBrakeCLI", convert_script), metrics=metrics
+    )
+    progress: list[Progress] = []
+    rates: list[dict[str, float]] = []
+
+    def handler(p: Progress):
+        progress.append(p)
+        rates.append(metrics.snapshot().job_fps)
+
+    h.convert_title("in", tmp_path / "good.mkv", 1, progress_handler=handler)
+    with pytest.raises(HandBrakeError):
+        h.convert_title("in", tmp_path / "bad.mkv", 1)
+
+    assert [p.state for p in progress] == ["WORKING", "WORKDONE"]
+    assert rates[0] == {str(tmp_path / "good.mkv"): 30.0}
+    s = metrics.snapshot()
+    assert s.jobs_started == 2
+    assert s.jobs_completed == 1
+    assert s.failures == {3: 1}
+    assert s.bytes_written == 100
+    assert s.job_fps == {} and s.fps == 0
+    assert sum(s.duration_buckets) == 2
+
+
+@pytest.mark.asyncio
+async def test_convert_async_records_metrics(tmp_path: Path):
+    metrics = Metrics()
+    h = HandBrake(
+        fake_executable(tmp_path / "HandBrakeCLI", convert_script), metrics=metrics
+    )
+    await h.convert_title_async("in", tmp_path / "good.mkv", 1)
+    s = metrics.snapshot()
+    assert s.jobs_completed == 1
+    assert s.bytes_written == 100
+
+
+def test_track_outcomes(tmp_path: Path):
+    metrics = Metrics()
+    with pytest.raises(CancelledError):
+        with metrics.track(tmp_path / "a.mkv", None):
+            raise CancelledError()
+    with pytest.raises(ValueError):
+        with metrics.track(tmp_path / "b.mkv", None):
+            raise ValueError()
+    s = metrics.snapshot()
+    assert s.jobs_cancelled == 1
+    assert s.failures == {None: 1}
+    assert s.jobs_completed == 0
+
+
+def test_render_and_export(tmp_path: Path):
+    metrics = Metrics()
+    with pytest.raises(HandBrakeError):
+        with metrics.track(tmp_path / "a.mkv", None):
+            raise HandBrakeError(2)
+    with JobQueue(tmp_path / "jobs.db") as queue:
+        queue.enqueue("in", "out.mkv", 1)
+        metrics.watch_queue(queue)
+        text = metrics.render()
+        assert 'handbrake_jobs_failed_total{return_code="2"} 1' in text
+        assert 'handbrake_job_duration_seconds_bucket{le="+Inf"} 1' in text
+        assert "handbrake_job_duration_seconds_count 1" in text
+        assert f'queue="{tmp_path / "jobs.db"}",state="queued"}} 1' in text
+        assert 'state="running"} 0' in text
+
+        metrics.write(tmp_path / "metrics.prom")
+        assert (tmp_path / "metrics.prom").read_text() == text
+
+        server = metrics.serve(0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url) as response:
+                assert response.read().decode() == text
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from handbrake.errors import CancelledError
+from handbrake.mock import MockHandBrake
+from handbrake.models.progress import Progress
+from handbrake.pool import HandBrakePool
+
+
+class CountingHandBrake(MockHandBrake):
+    """Records the highest number of conversions running at once"""
+
+    running = 0
+    peak = 0
+
+    async def convert_title_async(self, *args, **kwargs):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await super().convert_title_async(*args, **kwargs)
+        finally:
+            self.running -= 1
+
+
+@pytest.mark.asyncio
+async def test_pool_limits_concurrency():
+    h = CountingHandBrake([1, 1], convert_factor=0.0001)
+    async with HandBrakePool(h, max_concurrency=2) as pool:
+        jobs = [pool.submit_convert("in", f"out{i}", 1) for i in range(6)]
+        await asyncio.gather(*jobs)
+    assert h.peak == 2
+    assert all(job.done() for job in jobs)
+
+
+@pytest.mark.asyncio
+async def test_pool_scan_and_progress():
+    h = MockHandBrake([2, 3], scan_factor=0.0001)
+    async with HandBrakePool(h, max_concurrency=1) as pool:
+        job = pool.submit_scan("in", "all")
+        progress: list[Progress] = [p async for p in job.progress()]
+        title_set = await job
+    assert len(title_set.title_list) == 2
+    assert len(progress) > 0
+    assert all(p.state == "SCANNING" for p in progress)
+
+
+@pytest.mark.asyncio
+async def test_pool_shutdown_cancels_jobs():
+    h = MockHandBrake([60], convert_factor=0.01)
+    pool = HandBrakePool(h, max_concurrency=1)
+    jobs = [pool.submit_convert("in", f"out{i}", 1) for i in range(3)]
+    await asyncio.sleep(0.05)
+    await asyncio.wait_for(pool.shutdown(cancel=True), 5)
+    for job in jobs:
+        with pytest.raises(CancelledError):
+            await job
+    with pytest.raises(RuntimeError):
+        pool.submit_convert("in", "out", 1)
+
+
+@pytest.mark.asyncio
+async def test_pool_wait_for_timeout_cancels_job():
+    h = MockHandBrake([60], convert_factor=0.01)
+    async with HandBrakePool(h, max_concurrency=1) as pool:
+        job = pool.submit_convert("in", "out", 1)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(job, 0.05)
+        assert job.canceller.is_cancelled()
+    assert job.future.cancelled()
+    assert pool.jobs == []
+
+
+@pytest.mark.asyncio
+async def test_pool_task_cancelled_resolves_job():
+    h = MockHandBrake([60], convert_factor=0.01)
+    pool = HandBrakePool(h, max_concurrency=1)
+    job = pool.submit_convert("in", "out", 1)
+    await asyncio.sleep(0.05)
+    assert job._task is not None
+    job._task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await job
+    assert job.canceller.is_cancelled()
+    await asyncio.wait_for(pool.shutdown(), 5)
@@ -1,4 +1,14 @@
+import sys
+from pathlib import Path
+
+import pytest
+
 from handbrake import HandBrake
+from handbrake.catalog import PresetCatalog
+from handbrake.mock import MockHandBrake
+from handbrake.models.preset import Preset, PresetGroup, PresetInfo
+
+from .helpers import fake_executable, sample_preset
 
 
 def test_presets():
@@ -10,3 +20,110 @@ def test_presets():
             preset = h.get_preset(info.name)
             assert len(preset.preset_list) == 1
             return
+
+
+class CountingMockHandBrake(MockHandBrake):
+    def __init__(self):
+        super().__init__([1])
+        self.calls: list[str] = []
+
+    def list_presets(self, *args, **kwargs) -> list[PresetGroup]:
+        self.calls.append("-z")
+        return [
+            PresetGroup(
+                name="General",
+                presets=[
+                    PresetInfo(name="Fast 1080p30", description="fast"),
+                    PresetInfo(name="HQ 1080p30 Surround", description="hq"),
+                ],
+            )
+        ]
+
+    def get_preset(self, name: str, *args, **kwargs) -> Preset:
+        self.calls.append(name)
+        preset = super().get_preset(name)
+        preset.preset_list.append({"PresetName": name})
+        return preset
+
+
+def test_preset_catalog(tmp_path: Path):
+    h = CountingMockHandBrake()
+    catalog = PresetCatalog(h, cache_dir=tmp_path)
+    assert catalog.names() == ["Fast 1080p30", "HQ 1080p30 Surround"]
+    presets = catalog.get_presets(catalog.names())
+    assert presets["Fast 1080p30"].preset_list == [{"PresetName": "Fast 1080p30"}]
+    catalog.get_preset("Fast 1080p30")
+    catalog.list_presets()
+    assert sorted(h.calls) == ["-z", "Fast 1080p30", "HQ 1080p30 Surround"]
+
+    # a new catalog loads from disk without running HandBrakeCLI
+    h.calls.clear()
+    catalog = PresetCatalog(h, cache_dir=tmp_path)
+    assert catalog.get_presets(catalog.names()) == presets
+    assert h.calls == []
+
+    catalog.clear()
+    catalog.get_preset("Fast 1080p30")
+    assert h.calls == ["Fast 1080p30"]
+
+
+preset_list_script = """
+import sys, time
+out = [
+    "General/\\n",
+    "    Very Fast 1080p30\\n",
+    "        Small H.264 video (up to 1080p30) and AAC stereo audio, in an MP4\\n",
+    "        container.\\n",
+    "    Fast 1080p30\\n",
+    "        H.264 video\\n",
+    "Web/\\n",
+    "    Creator 1080p60\\n",
+    "        H.264 video\\n",
+]
+for line in out:
+    # write in uneven pieces to split lines across reads
+    for piece in (line[:5], line[5:]):
+        sys.stderr.write(piece)
+        sys.stderr.flush()
+        time.sleep(0.001)
+"""
+
+expected_groups = [
+    PresetGroup(
+        name="General",
+        presets=[
+            PresetInfo(
+                name="Very Fast 1080p30",
+                description="Small H.264 video (up to 1080p30) and AAC stereo "
+                "audio, in an MP4 container.",
+            ),
+            PresetInfo(name="Fast 1080p30", description="H.264 video"),
+        ],
+    ),
+    PresetGroup(
+        name="Web",
+        presets=[PresetInfo(name="Creator 1080p60", description="H.264 video")],
+    ),
+]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a shebang script")
+def test_list_presets_streamed(tmp_path: Path):
+    h = HandBrake(fake_executable(tmp_path / "HandBrakeCLI", preset_list_script))
+    assert h.list_presets() == expected_groups
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a shebang script")
+async def test_list_presets_async(tmp_path: Path):
+    h = HandBrake(fake_executable(tmp_path / "HandBrakeCLI", preset_list_script))
+    assert await h.list_presets_async() == expected_groups
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a shebang script")
+async def test_preset_file_async(tmp_path: Path):
+    h = HandBrake(fake_executable(tmp_path / "HandBrakeCLI", preset_list_script))
+    await h.save_preset_to_file_async(tmp_path / "preset.json", sample_preset)
+    preset = await h.load_preset_from_file_async(tmp_path / "preset.json")
+    assert preset == sample_preset
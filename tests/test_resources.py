@@ -0,0 +1,126 @@
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from handbrake import HandBrake
+from handbrake.fakecli import FakeConfig, write_launcher
+from handbrake.models.progress import Progress
+from handbrake.resources import apply_resources
+
+pytestmark = pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="requires Linux"
+)
+
+
+def children() -> list[int]:
+    """The ids of the child processes of this process"""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the parent id follows the state, after the parenthesised name
+        if int(stat.rsplit(")", 1)[1].split()[1]) == os.getpid():
+            pids.append(int(entry))
+    return pids
+
+
+def test_apply_resources(tmp_path: Path):
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        cpu = min(os.sched_getaffinity(0))
+        apply_resources(
+            proc.pid,
+            {
+                "cpu_affinity": [cpu],
+                "nice": 5,
+                "cgroup": tmp_path,
+                "cpu_quota": 1.5,
+            },
+        )
+        assert os.sched_getaffinity(proc.pid) == {cpu}
+        assert os.getpriority(os.PRIO_PROCESS, proc.pid) == 5
+        assert (tmp_path / "cpu.max").read_text() == "150000 100000"
+        assert (tmp_path / "cgroup.procs").read_text() == str(proc.pid)
+        if shutil.which("ionice") is not None:
+            apply_resources(proc.pid, {"ionice": "idle"})
+            out = subprocess.run(
+                ["ionice", "-p", str(proc.pid)], capture_output=True, text=True
+            ).stdout
+            assert out.strip() == "idle"
+        with pytest.raises(ValueError):
+            apply_resources(proc.pid, {"cpu_quota": 1})
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def test_apply_resources_unsupported(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(shutil, "which", lambda name: None)
+    monkeypatch.delattr(os, "setpriority")
+    with pytest.raises(OSError, match="ionice"):
+        apply_resources(os.getpid(), {"ionice": "idle"})
+    with pytest.raises(OSError, match="nice"):
+        apply_resources(os.getpid(), {"nice": 5})
+
+
+def recorder(seen: list[tuple[set[int], int]]):
+    """A progress handler recording the affinity and niceness of the
+    running command"""
+
+    def handler(p: Progress):
+        # the process may already have exited by the final update
+        for pid in children():
+            seen.append(
+                (os.sched_getaffinity(pid), os.getpriority(os.PRIO_PROCESS, pid))
+            )
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_commands_with_resources(tmp_path: Path):
+    h = HandBrake(
+        write_launcher(
+            tmp_path / "HandBrakeCLI",
+            FakeConfig(progress_updates=3, progress_interval=0.1, scan_interval=0.1),
+        )
+    )
+    cpu = min(os.sched_getaffinity(0))
+    seen: list[tuple[set[int], int]] = []
+    h.convert_title(
+        "disc",
+        tmp_path / "out.mkv",
+        1,
+        progress_handler=recorder(seen),
+        resources={"cpu_affinity": [cpu], "nice": 4},
+    )
+    assert seen and all(s == ({cpu}, 4) for s in seen)
+
+    seen.clear()
+    await h.convert_title_async(
+        "disc",
+        tmp_path / "out.mkv",
+        1,
+        progress_handler=recorder(seen),
+        resources={"nice": 2},
+    )
+    assert seen and all(s[1] == 2 for s in seen)
+
+    seen.clear()
+    h.scan_titles("disc", "all", progress_handler=recorder(seen), resources={"nice": 6})
+    assert seen and all(s[1] == 6 for s in seen)
+
+    seen.clear()
+    await h.scan_titles_async(
+        "disc", "all", progress_handler=recorder(seen), resources={"nice": 8}
+    )
+    assert seen and all(s[1] == 8 for s in seen)
@@ -0,0 +1,231 @@
+import asyncio
+import io
+import sys
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from handbrake.canceller import Canceller
+from handbrake.errors import (
+    CancelledError,
+    HandBrakeError,
+    OutputTooLargeError,
+    TimeoutError,
+)
+from handbrake.mock import MockTitle
+from handbrake.models.progress import FastProgress, Progress
+from handbrake.models.title import TitleSet, TitleSetSummary
+from handbrake.profiling import ProfileCollector
+from handbrake.runner import (
+    CapabilitiesCommandRunner,
+    ConvertCommandRunner,
+    ScanCommandRunner,
+)
+
+from .helpers import echo_command, progress_blob, python_command
+
+
+@pytest.mark.asyncio
+async def test_aprocess_chunk_boundaries():
+    output = "".join(progress_blob(i / 10) for i in range(10))
+    output += progress_blob(1, "WORKDONE")
+    # a tiny chunk size splits lines and objects across reads
+    runner = ConvertCommandRunner(chunk_size=7)
+    progress = [p async for p in runner.aprocess(*echo_command(output))]
+    assert len(progress) == 11
+    assert all(isinstance(p, Progress) for p in progress)
+    assert progress[-1].state == "WORKDONE"
+
+
+@pytest.mark.asyncio
+async def test_aprocess_error():
+    runner = ConvertCommandRunner()
+    with pytest.raises(HandBrakeError) as e:
+        async for _ in runner.aprocess(*echo_command(progress_blob(0.5), 3)):
+            pass
+    assert e.value.return_code == 3
+
+
+@pytest.mark.asyncio
+async def test_aprocess_cancel():
+    cancel = Canceller()
+    runner = ConvertCommandRunner()
+    cmd = python_command("import time; time.sleep(30)")
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.2, cancel.cancel)
+    start = time.monotonic()
+    with pytest.raises(CancelledError):
+        async for _ in runner.aprocess(*cmd, cancel=cancel):
+            pass
+    assert time.monotonic() - start < 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(sys.platform == "win32", reason="requires SIGTERM")
+async def test_aprocess_cancel_escalates_to_kill():
+    cancel = Canceller()
+    runner = ConvertCommandRunner(grace_period=0.2)
+    cmd = python_command(
+        "import signal, sys, time\n"
+        "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+        "print('ready', flush=True)\n"
+        "time.sleep(30)"
+    )
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.5, cancel.cancel)
+    start = time.monotonic()
+    with pytest.raises(CancelledError):
+        async for _ in runner.aprocess(*cmd, cancel=cancel):
+            pass
+    assert time.monotonic() - start < 5
+
+
+def test_process_progress_interval():
+    output = "".join(progress_blob(i / 100) for i in range(100))
+    output += progress_blob(1, "WORKDONE")
+    runner = ConvertCommandRunner(progress_interval=60)
+    progress = list(runner.process(*echo_command(output)))
+    # only the first update and the final WORKDONE are parsed
+    assert [p.state for p in progress] == ["WORKING", "WORKDONE"]
+
+
+def test_process_fast_progress():
+    output = progress_blob(0.25) + progress_blob(1, "WORKDONE")
+    runner = ConvertCommandRunner(fast_progress=True)
+    progress = list(runner.process(*echo_command(output)))
+    assert all(isinstance(p, FastProgress) for p in progress)
+    working, done = progress
+    assert working.state == "WORKING"
+    assert working.percent == 25
+    assert working.rate_avg == 25.0
+    assert working.eta_seconds == 10
+    assert done.percent == 100
+    model = working.to_model()
+    assert isinstance(model, Progress)
+    assert model.percent == working.percent
+    assert working.to_model() is model
+
+
+def test_process_cancel():
+    cancel = Canceller()
+    runner = ConvertCommandRunner()
+    cmd = python_command("import time; time.sleep(30)")
+    threading.Timer(0.2, cancel.cancel).start()
+    start = time.monotonic()
+    with pytest.raises(CancelledError):
+        for _ in runner.process(*cmd, cancel=cancel):
+            pass
+    assert time.monotonic() - start < 2
+
+
+def test_process_timeout():
+    runner = ConvertCommandRunner()
+    cmd = python_command(
+        f"import sys, time; sys.stdout.write({progress_blob(0.5)!r}); "
+        "sys.stdout.flush(); time.sleep(30)"
+    )
+    progress = []
+    with pytest.raises(TimeoutError):
+        for p in runner.process(*cmd, timeout=0.5):
+            progress.append(p)
+    assert len(progress) == 1
+
+
+def test_process_stderr_tail():
+    runner = ConvertCommandRunner(stderr_limit=16)
+    cmd = python_command(
+        "import sys\n"
+        "for i in range(10000): sys.stderr.write(f'log line {i}\\n')\n"
+        "sys.exit(2)"
+    )
+    with pytest.raises(HandBrakeError) as e:
+        for _ in runner.process(*cmd):
+            pass
+    assert e.value.return_code == 2
+    assert e.value.stderr == b"8\nlog line 9999\n"
+
+
+@pytest.mark.asyncio
+async def test_aprocess_stderr_tail():
+    runner = ConvertCommandRunner(stderr_limit=1024)
+    cmd = python_command(
+        f"import sys; sys.stdout.write({progress_blob(0.5)!r}); "
+        "sys.stderr.write('encode finished')"
+    )
+    progress = [p async for p in runner.aprocess(*cmd)]
+    assert len(progress) == 1
+    assert runner.stderr.getvalue() == b"encode finished"
+
+
+def test_process_capabilities():
+    runner = CapabilitiesCommandRunner(stderr_limit=64)
+    cmd = python_command(
+        "import sys\n"
+        "for i in range(10000): sys.stderr.write(f'log line {i}\\n')\n"
+        "print('   -e, --encoder <string>  Select video encoder:')\n"
+        "print('                               x264')\n"
+        "print('   --encoder-preset <string>')\n"
+    )
+    assert list(runner.process(*cmd)) == []
+    assert len(runner.stderr.getvalue()) == 64
+    caps = runner.finish()
+    assert caps.video_encoders == ["x264"]
+    assert caps.supports_option("--encoder-preset")
+
+
+def test_process_stream_titles():
+    titles = [MockTitle(i, timedelta(minutes=i)).get_title() for i in range(1, 4)]
+    title_set = TitleSet(main_feature=3, title_list=titles)
+    output = "JSON Title Set: " + title_set.model_dump_json(by_alias=True, indent=4)
+    runner = ScanCommandRunner(stream=True, chunk_size=7)
+    objects = list(runner.process(*echo_command(output + "\n")))
+    assert objects == [*titles, TitleSetSummary(main_feature=3)]
+    # only a title at a time is buffered
+    runner = ScanCommandRunner(stream=True, chunk_size=512, max_buffer=2048)
+    assert len(list(runner.process(*echo_command(output + "\n")))) == 4
+    runner = ScanCommandRunner(chunk_size=512, max_buffer=2048)
+    with pytest.raises(OutputTooLargeError):
+        list(runner.process(*echo_command(output + "\n")))
+
+
+def test_process_profiler():
+    output = "".join(progress_blob(i / 10) for i in range(10))
+    output += progress_blob(1, "WORKDONE")
+    collector = ProfileCollector()
+    runner = ConvertCommandRunner(progress_interval=60, profiler=collector)
+    for _ in runner.process(*echo_command(output)):
+        time.sleep(0.05)
+    with pytest.raises(HandBrakeError):
+        list(runner.process(*echo_command(output, 3)))
+    ok, failed = collector.profiles
+    assert ok.returncode == 0 and ok.error is None
+    assert failed.returncode == 3 and failed.error == "HandBrakeError"
+    assert ok.bytes == len(output)
+    assert ok.lines == output.count("\n")
+    assert ok.objects == {"Progress": 2}
+    assert ok.dropped == {"Progress": 9}
+    # the time spent by the consumer is kept apart from parsing
+    assert ok.consumer >= 0.1
+    assert ok.first_byte is not None
+    parts = ok.spawn + ok.first_byte + ok.read + ok.frame + ok.consumer + ok.wait
+    assert parts + sum(ok.convert.values()) <= ok.total
+    report = io.StringIO()
+    collector.report(report)
+    assert "convert Progress" in report.getvalue()
+    assert "Progress: 2 objects converted, 9 dropped" in report.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_aprocess_profiler():
+    titles = [MockTitle(i, timedelta(minutes=i)).get_title() for i in range(1, 4)]
+    title_set = TitleSet(main_feature=3, title_list=titles)
+    output = "JSON Title Set: " + title_set.model_dump_json(by_alias=True)
+    collector = ProfileCollector()
+    runner = ScanCommandRunner(stream=True, profiler=collector)
+    objects = [o async for o in runner.aprocess(*echo_command(output + "\n"))]
+    assert len(objects) == 4
+    (profile,) = collector.profiles
+    assert profile.returncode == 0
+    assert profile.objects == {"JSON Title Set element": 3, "JSON Title Set": 1}
@@ -3,6 +3,9 @@ from datetime import timedelta
 import pytest
 
 from handbrake import HandBrake
+from handbrake.errors import HandBrakeError
+from handbrake.mock import MockHandBrake
+from handbrake.models.title import TitleSet
 
 from .helpers import sample_video_path
 
@@ -28,3 +31,66 @@ async def test_scan_all_titles_async():
     assert title.video_codec == "h264"
     assert title.geometry.width == 480
     assert title.geometry.height == 360
+
+
+class FailingMockHandBrake(MockHandBrake):
+    def scan_titles(self, input, *args, **kwargs) -> TitleSet:
+        if input == "bad":
+            raise HandBrakeError(1)
+        return super().scan_titles(input, *args, **kwargs)
+
+    async def scan_titles_async(self, input, *args, **kwargs) -> TitleSet:
+        if input == "bad":
+            raise HandBrakeError(1)
+        return await super().scan_titles_async(input, *args, **kwargs)
+
+
+def test_scan_many():
+    h = FailingMockHandBrake([1, 2], scan_factor=0.0001)
+    inputs = ["a", "bad", "b", "c"]
+    results = dict(h.scan_many(inputs, "main", concurrency=2))
+    assert results.keys() == set(inputs)
+    assert isinstance(results["bad"], HandBrakeError)
+    for i in ["a", "b", "c"]:
+        assert isinstance(results[i], TitleSet)
+
+
+@pytest.mark.asyncio
+async def test_scan_many_async():
+    h = FailingMockHandBrake([1, 2], scan_factor=0.0001)
+    inputs = ["a", "bad", "b", "c"]
+    results = {i: r async for i, r in h.scan_many_async(inputs, "all", concurrency=2)}
+    assert results.keys() == set(inputs)
+    assert isinstance(results["bad"], HandBrakeError)
+    for i in ["a", "b", "c"]:
+        r = results[i]
+        assert isinstance(r, TitleSet)
+        assert len(r.title_list) == 2
+
+
+def test_scan_titles_lazy():
+    h = MockHandBrake([1, 2, 3], scan_factor=0.0001)
+    titles = h.scan_titles_lazy("a", "all")
+    assert titles.main_feature == h.main_title + 1
+    assert [t.index for t in titles.headers] == [1, 2, 3]
+    assert titles.headers[1].duration.to_timedelta() == timedelta(minutes=2)
+    assert not titles.title_list.is_loaded(1)
+    assert titles.title_list[1] == h.titles[1].get_title()
+    assert titles.title_list.is_loaded(1)
+    assert not titles.title_list.is_loaded(0)
+    assert titles.to_title_set() == h.scan_titles("a", "all")
+
+
+def test_iter_titles():
+    h = MockHandBrake([1, 2, 3], scan_factor=0.0001)
+    titles = h.iter_titles("a", "all")
+    assert [t.index for t in titles] == [1, 2, 3]
+    assert titles.main_feature == 3
+
+
+@pytest.mark.asyncio
+async def test_iter_titles_async():
+    h = MockHandBrake([1, 2, 3], scan_factor=0.0001)
+    titles = h.iter_titles_async("a", "main")
+    assert [t.index async for t in titles] == [3]
+    assert titles.main_feature == 3
@@ -1,6 +1,14 @@
+import os
+import sys
+from pathlib import Path
+
 import pytest
 
-from handbrake import HandBrake
+from handbrake import HandBrake, probe
+from handbrake.canceller import Canceller
+from handbrake.errors import CancelledError
+
+from .helpers import fake_executable
 
 
 def test_version():
@@ -26,3 +34,98 @@ async def test_version_async():
     assert v.system != ""
     assert v.type != ""
     assert v.version_string != ""
+
+
+version_script = """
+import json, pathlib, sys
+calls = pathlib.Path(__file__).with_suffix(".calls")
+calls.write_text(calls.read_text() + "x" if calls.exists() else "x")
+if sys.argv[1:] == ["--help"]:
+    print("   -e, --encoder <string>  Select video encoder:")
+    print("                               x264")
+    print("                               x265")
+    print("   --encoder-preset <string>")
+    print("   -E, --aencoder <string> Select audio encoder(s):")
+    print("                               av_aac")
+    print("                               copy:ac3")
+    print('                           "copy:<type>" will pass through')
+    sys.exit(0)
+version = {
+    "Arch": "x86_64", "Name": "HandBrake", "Official": True,
+    "RepoDate": "2024-01-01", "RepoHash": "abc", "System": "Linux",
+    "Type": "release", "Version": {"Major": 1, "Minor": 7, "Point": 0},
+    "VersionString": "1.7.0",
+}
+print("Version: " + json.dumps(version, indent=4))
+"""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a shebang script")
+def test_version_cached(tmp_path: Path):
+    probe.clear()
+    exe = fake_executable(tmp_path / "HandBrakeCLI", version_script)
+    calls = tmp_path / "HandBrakeCLI.calls"
+    h = HandBrake(exe)
+    assert h.version().version_string == "1.7.0"
+    assert h.version().repo_hash == "abc"
+    assert calls.read_text() == "x"
+
+    # modifying the executable invalidates the cached version
+    st = os.stat(exe)
+    os.utime(exe, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+    h.version()
+    assert calls.read_text() == "xx"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a shebang script")
+def test_capabilities(tmp_path: Path):
+    probe.clear()
+    exe = fake_executable(tmp_path / "HandBrakeCLI", version_script)
+    h = HandBrake(exe)
+    caps = h.capabilities()
+    assert caps.video_encoders == ["x264", "x265"]
+    assert caps.audio_encoders == ["av_aac", "copy:ac3"]
+    assert caps.supports_option("--encoder-preset")
+    assert not caps.supports_option("--made-up")
+    assert h.capabilities() is caps
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a shebang script")
+@pytest.mark.asyncio
+async def test_capabilities_async(tmp_path: Path):
+    probe.clear()
+    exe = fake_executable(tmp_path / "HandBrakeCLI", version_script)
+    h = HandBrake(exe)
+    cancel = Canceller()
+    cancel.cancel()
+    with pytest.raises(CancelledError):
+        await h.capabilities_async(cancel=cancel)
+    caps = await h.capabilities_async()
+    assert caps.video_encoders == ["x264", "x265"]
+    assert h.capabilities() is caps
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a shebang script")
+def test_executable_resolved(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    exe = fake_executable(tmp_path / "HandBrakeCLI", version_script)
+    monkeypatch.chdir(tmp_path)
+    assert HandBrake("./HandBrakeCLI").executable == exe
+    monkeypatch.setenv("PATH", str(tmp_path))
+    assert HandBrake("HandBrakeCLI").executable == exe
+    with pytest.raises(FileNotFoundError):
+        HandBrake(str(tmp_path / "missing"))
+    os.chmod(exe, 0o644)
+    with pytest.raises(FileNotFoundError):
+        HandBrake(exe)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="requires a shebang script")
+@pytest.mark.asyncio
+async def test_version_posix_spawn(tmp_path: Path):
+    probe.clear()
+    exe = fake_executable(tmp_path / "HandBrakeCLI", version_script)
+    h = HandBrake(exe, spawn="posix_spawn")
+    assert h.version().version_string == "1.7.0"
+    probe.clear()
+    assert (await h.version_async()).version_string == "1.7.0"
+    assert h.capabilities().video_encoders == ["x264", "x265"]